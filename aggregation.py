@@ -0,0 +1,145 @@
+"""
+Fused aggregation planner for the page callbacks.
+
+A callback declares the named (group keys, metric, reducer) queries it needs
+as an AggregationPlan. The plan groups them so the selection is scanned once
+per *base grouping* (a key set that is not contained in another query's keys):
+every base pass computes the additive partials its queries need (row count
+plus sum, count, min and/or max per metric) and all coarser queries,
+including totals, are rolled up
+from those partials instead of re-grouping the rows. Brand x age_group, for
+example, also answers brand, age_group and the overall totals.
+
+Reducers: sum, count, mean (derived as sum / count), min, max, and size
+(number of rows per group; the metric is ignored).
+"""
+import pandas as pd
+
+import group_kernel
+import metrics
+import schema
+
+PARTIALS = ("sum", "count", "min", "max")
+ROWS = "_rows"
+
+# Partials each reducer is computed from
+NEEDS = {"sum": ("sum",), "count": ("count",), "mean": ("sum", "count"), "min": ("min",), "max": ("max",),
+         "size": ()}
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def partial_column(metric, partial):
+    return f"{metric}__{partial}"
+
+
+def _combine(column):
+    """How a partial column combines when cells are rolled up"""
+    if column.endswith("__min"):
+        return "min"
+    if column.endswith("__max"):
+        return "max"
+    return "sum"
+
+
+def combine(frame, keys, columns):
+    """Combine partial columns of frame (cube cells or finer partials) per keys, or into one row"""
+    if not keys:
+        return pd.DataFrame({c: [frame[c].agg(_combine(c))] for c in columns})
+    spec = {c: (frame[c], _combine(c)) for c in columns}
+    return group_kernel.aggregate([frame[k] for k in keys], spec, keys).frame()
+
+
+def rollup(partials, by):
+    """Roll partials indexed by finer keys up to the keys `by` (a subset of the index levels)"""
+    by = list(by)
+    if by == list(partials.index.names):
+        return partials
+    if not by:
+        return combine(partials, [], list(partials.columns))
+    spec = {c: (partials[c].to_numpy(), _combine(c)) for c in partials.columns}
+    return group_kernel.aggregate([partials.index.get_level_values(b) for b in by], spec, by).frame()
+
+
+def finalize(partials, by, metric, how):
+    """Turn rolled-up partials into the query result.
+
+    Totals (no keys) return a scalar for one metric and a Series indexed by
+    metric name for several. Grouped queries return a Series named after the
+    metric (or a DataFrame for several metrics) indexed by the requested keys.
+    """
+    metrics = as_list(metric)
+    if how == "size":
+        result = partials[[ROWS]]
+        metrics = [metric if isinstance(metric, str) else ROWS]
+    elif how == "mean":
+        sums = partials[[partial_column(schema.resolve(m), "sum") for m in metrics]]
+        counts = partials[[partial_column(schema.resolve(m), "count") for m in metrics]]
+        result = sums / counts.to_numpy()
+    else:
+        result = partials[[partial_column(schema.resolve(m), how) for m in metrics]]
+    result.columns = metrics
+
+    by = as_list(by)
+    if not by:
+        totals = result.iloc[0]
+        return totals.iloc[0] if isinstance(metric, str) or how == "size" else totals
+    result.index = result.index.set_names(by if len(by) > 1 else by[0])
+    return result[metrics[0]] if isinstance(metric, str) or how == "size" else result
+
+
+class AggregationPlan:
+    """Named (by, metric, how) queries computed from the fewest selection passes"""
+
+    def __init__(self, queries):
+        self.queries = {}
+        for name, (by, metric, how) in queries.items():
+            by = tuple(as_list(by))
+            self.queries[name] = (by, metric, how)
+
+        key_sets = {}
+        for by, _, _ in self.queries.values():
+            physical = tuple(schema.resolve(b) for b in by)
+            key_sets.setdefault(frozenset(physical), physical)
+        # Base groupings: key sets not strictly contained in another query's key set
+        self.bases = [keys for group, keys in key_sets.items()
+                      if not any(group < other for other in key_sets)]
+
+        self.assignment = {}
+        self.metrics = {base: {} for base in self.bases}
+        for name, (by, metric, how) in self.queries.items():
+            wanted = frozenset(schema.resolve(b) for b in by)
+            # The coarsest base that still contains the query keys
+            base = min((b for b in self.bases if wanted <= frozenset(b)), key=len)
+            self.assignment[name] = base
+            for m in (as_list(metric) if how != "size" else []):
+                needs = self.metrics[base].setdefault(schema.resolve(m), [])
+                needs.extend(p for p in NEEDS[how] if p not in needs)
+
+    def passes(self):
+        """(keys, {metric: partials}) of every pass over the selection"""
+        return [(list(base), self.metrics[base]) for base in self.bases]
+
+    def execute(self, selection):
+        """Run the plan against a selection exposing partials(keys, metrics, needs)"""
+        with metrics.phase("aggregate"):
+            return self._execute(selection)
+
+    def _execute(self, selection):
+        results = {}
+        for base in self.bases:
+            needs = self.metrics[base]
+            partials = selection.partials(list(base), list(needs), needs)
+            rolled = {}
+            for name, (by, metric, how) in self.queries.items():
+                if self.assignment[name] != base:
+                    continue
+                physical = tuple(schema.resolve(b) for b in by)
+                if physical not in rolled:
+                    rolled[physical] = rollup(partials, physical)
+                results[name] = finalize(rolled[physical], by, metric, how)
+        return results
@@ -1,17 +1,53 @@
+import functools
+import importlib
+import os
+import time
+
 import dash
 from dash import dcc, html, Input, Output
 import dash_bootstrap_components as dbc
-import plotly.express as px
-import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
-import random
 from threading import Lock
+from data_generator import generate_comprehensive_data
+import approx
+import background
+import bitmap_index
+import cube
+import excel_ingest
+import hot_reload
+import metrics
+import schema
+import snapshot
+import warmup
 
 # Thread lock for safe data loading
 _data_lock = Lock()
 _df_cache = None
 
+def build_dataset():
+    """Generate the dataset in the compact schema (categoricals, downcast numerics, no stored aliases)"""
+    return schema.compact(generate_comprehensive_data())
+
+def load_dataset():
+    """Build or open the configured dataset, versioned by its content hash"""
+    start = time.perf_counter()
+    if snapshot.SNAPSHOT_PATH:
+        # Prebuilt (e.g. load-test scale) snapshot
+        df = snapshot.load_snapshot(snapshot.SNAPSHOT_PATH)
+    elif excel_ingest.EXCEL_PATH:
+        # Real workbook, parsed once into a columnar cache keyed by its size, mtime and hash
+        df, timings = excel_ingest.load(excel_ingest.EXCEL_PATH)
+        print(f"[INFO] Loaded {excel_ingest.EXCEL_PATH}: {timings}")
+    elif snapshot.SNAPSHOT_ENABLED:
+        # Shared memory-mapped snapshot: built once, opened by every worker
+        df = snapshot.load_or_build(build_dataset)
+    else:
+        df = build_dataset()
+    # Caches and indexes derived from the data are keyed on this version
+    df.attrs["dataset_version"] = snapshot.content_version(df)
+    metrics.DATASET_BUILD_SECONDS.set(time.perf_counter() - start)
+    return df
+
 def get_data():
     """Thread-safe lazy load data - generate only once when first accessed"""
     global _df_cache
@@ -26,7 +62,7 @@ def get_data():
         if _df_cache is None:
             print("[INFO] Generating vaccine market data...")
             try:
-                _df_cache = generate_comprehensive_data()
+                _df_cache = load_dataset()
                 print(f"[OK] Generated {len(_df_cache):,} records across {_df_cache['year'].nunique()} years")
             except Exception as e:
                 print(f"[ERROR] Failed to generate data: {e}")
@@ -34,6 +70,16 @@ def get_data():
                 _df_cache = pd.DataFrame()
         return _df_cache
 
+def swap_data(df):
+    """Publish df as the live dataset and drop cache entries of older versions.
+
+    Callbacks already running keep the dataset they pinned (hot_reload.pin).
+    """
+    global _df_cache
+    with _data_lock:
+        _df_cache = df
+    hot_reload.invalidate(df.attrs.get("dataset_version"))
+
 # Initialize Dash app with modern theme
 app = dash.Dash(
     __name__, 
@@ -42,6 +88,8 @@ app = dash.Dash(
         'https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap'
     ],
     suppress_callback_exceptions=True,
+    # Page callbacks run as cancellable background jobs when diskcache is installed
+    background_callback_manager=background.app_manager(),
     meta_tags=[
         {"name": "viewport", "content": "width=device-width, initial-scale=1.0"},
         {"name": "description", "content": "Global Vaccine Market Analytics Dashboard"},
@@ -50,159 +98,10 @@ app = dash.Dash(
 )
 server = app.server
 
-# Generate comprehensive vaccine market data based on Data-Vaccine.xlsx structure
-def generate_comprehensive_data():
-    """Generate vaccine market data matching Excel file structure"""
-    
-    np.random.seed(42)
-    years = list(range(2021, 2036))
-    regions = ["North America", "Europe", "APAC", "Latin America", "Middle East", "Africa"]
-    
-    # Diseases/Markets from actual Excel data
-    diseases = ["HBV", "Herpes", "TCV", "HPV", "Influenza", "Pneumococcal", "MMR", "Rotavirus", 
-                "Meningococcal", "Varicella"]
-    
-    # Brands by disease (from actual data + extensions)
-    brand_map = {
-        "HBV": ["Engerix-B", "Heplisav-B", "Recombivax HB", "Twinrix"],
-        "Herpes": ["Shingrix", "Zostavax"],
-        "TCV": ["Typbar TCV", "Typhim Vi", "Vivotif"],
-        "HPV": ["Gardasil 9", "Cervarix"],
-        "Influenza": ["Fluzone", "Flucelvax", "FluMist", "Fluad"],
-        "Pneumococcal": ["Prevnar 13", "Prevnar 20", "Pneumovax 23", "Synflorix"],
-        "MMR": ["M-M-R II", "Priorix"],
-        "Rotavirus": ["RotaTeq", "Rotarix"],
-        "Meningococcal": ["Bexsero", "Trumenba", "MenACWY"],
-        "Varicella": ["Varivax", "ProQuad"]
-    }
-    
-    # Companies
-    companies = ["Pfizer", "GSK", "Merck", "Sanofi", "AstraZeneca", "Moderna", "Bharat Biotech", 
-                 "Serum Institute"]
-    
-    # Income classification with countries (from Excel structure)
-    country_income_map = {
-        "North America": {
-            "USA": "High Income", "Canada": "High Income", "Mexico": "Middle Income"
-        },
-        "Europe": {
-            "Germany": "High Income", "UK": "High Income", "France": "High Income", 
-            "Spain": "High Income", "Italy": "High Income", "Poland": "Middle Income",
-            "Romania": "Middle Income"
-        },
-        "APAC": {
-            "Japan": "High Income", "Australia": "High Income", "Singapore": "High Income",
-            "China": "Middle Income", "India": "Middle Income", "Thailand": "Middle Income",
-            "Pakistan": "Low Income", "Bangladesh": "Low Income", "Nepal": "Low Income"
-        },
-        "Latin America": {
-            "Brazil": "Middle Income", "Argentina": "Middle Income", "Chile": "Middle Income", 
-            "Colombia": "Middle Income", "Peru": "Middle Income"
-        },
-        "Middle East": {
-            "UAE": "High Income", "Saudi Arabia": "High Income", "Israel": "High Income", 
-            "Egypt": "Middle Income", "Iraq": "Middle Income"
-        },
-        "Africa": {
-            "South Africa": "Middle Income", "Nigeria": "Low Income", "Kenya": "Low Income", 
-            "Ethiopia": "Low Income", "Ghana": "Low Income"
-        }
-    }
-    
-    # Additional fields from Excel
-    age_groups = ["Pediatric", "Adult", "Elderly", "All Ages"]
-    genders = ["Male", "Female", "All"]
-    segments = ["Gender", "Brand", "Age", "ROA", "FDF"]
-    roa_types = ["IM", "SC", "Oral", "Intranasal"]  # IM from Excel
-    fdf_types = ["Vial", "Prefilled Syringe", "Multi-dose Vial", "Oral Solution"]
-    procurement_types = ["UNICEF", "GAVI", "PAHO", "Hospital", "Private Clinic", "Government"]
-    
-    data = []
-    record_id = 100000
-    
-    for year in years:
-        for region in regions:
-            for country, income_type in country_income_map[region].items():
-                for disease in diseases:
-                    brands = brand_map[disease]
-                    for brand in brands:
-                        for age_group in age_groups:
-                            for gender in ["Male", "Female"]:
-                                # Base values with variation
-                                prevalence = random.randint(10000, 500000) * (1 + (year - 2021) * 0.05)
-                                incidence = random.randint(20000, 800000) * (1 + (year - 2021) * 0.03)
-                                vaccination_rate = random.uniform(5, 95)
-                                price = random.uniform(2, 150)
-                                price_elasticity = random.uniform(5, 50)
-                                volume_units = random.randint(1000, 2000000)
-                                revenue = price * volume_units
-                                market_value_usd = revenue * random.uniform(0.8, 1.2)
-                                market_share_pct = random.uniform(1, 25)
-                                cagr = random.uniform(-2, 15)
-                                yoy_growth = random.uniform(-5, 20)
-                                qty = random.randint(100, 100000)
-                                
-                                roa = random.choice(roa_types)
-                                fdf = random.choice(fdf_types)
-                                procurement = random.choice(procurement_types)
-                                segment_by = random.choice(["male", "female", brand, age_group])
-                                
-                                record = {
-                                    "record_id": record_id,
-                                    "year": year,
-                                    "region": region,
-                                    "country": country,
-                                    "income_type": income_type,
-                                    "disease": disease,
-                                    "market": disease,  # Same as disease
-                                    "brand": brand,
-                                    "company": random.choice(companies),
-                                    "age_group": age_group,
-                                    "gender": gender,
-                                    "segment": random.choice(segments),
-                                    "segment_by": segment_by,
-                                    "roa": roa,
-                                    "fdf": fdf,
-                                    "formulation": fdf,  # Alias
-                                    "procurement": procurement,
-                                    "public_private": "Public" if procurement in ["UNICEF", "GAVI", "PAHO", "Government"] else "Private",
-                                    # Epidemiology metrics
-                                    "prevalence": int(prevalence),
-                                    "incidence": int(incidence),
-                                    # Vaccination metrics
-                                    "vaccination_rate": round(vaccination_rate, 2),
-                                    "coverage_rate": round(vaccination_rate * random.uniform(0.8, 1.1), 2),
-                                    # Pricing metrics
-                                    "price": round(price, 2),
-                                    "price_elasticity": round(price_elasticity, 2),
-                                    "price_class": "Premium" if price > 50 else ("Standard" if price > 20 else "Budget"),
-                                    # Volume and Value metrics
-                                    "volume_units": int(volume_units),
-                                    "qty": int(qty),
-                                    "revenue": round(revenue, 2),
-                                    "market_value_usd": round(market_value_usd, 2),
-                                    "value": round(market_value_usd, 2),  # Alias
-                                    # Market share metrics
-                                    "market_share_pct": round(market_share_pct, 2),
-                                    "share": round(market_share_pct, 2),  # Alias
-                                    # Growth metrics
-                                    "cagr": round(cagr, 2),
-                                    "yoy_growth": round(yoy_growth, 2),
-                                    "yoy": round(yoy_growth, 2),  # Alias
-                                    # Additional metrics
-                                    "efficacy_pct": round(random.uniform(60, 98), 2),
-                                }
-                                
-                                data.append(record)
-                                record_id += 1
-    
-    df = pd.DataFrame(data)
-    return df
-
 # Quick startup - data will be generated on first page load
 print("=" * 60)
 print("[START] Dashboard Initializing - Ready for HTTP requests")
-print("[INFO] Data will be generated on first page access")
+print("[INFO] Data is built by the warm-up; /healthz reports liveness, /readyz readiness")
 print("=" * 60)
 
 
@@ -212,7 +111,28 @@ app.layout = html.Div([
     html.Div(id='page-content')
 ])
 
+# Page layouts per (dataset version, pathname): revisiting a page re-sends the built tree
+_layout_lock = Lock()
+_layout_cache = {}
+
+def cached_layout(df, pathname, build):
+    """Layout of an analysis page, built once per dataset version"""
+    key = (df.attrs.get("dataset_version"), pathname)
+    layout = _layout_cache.get(key)
+    if layout is None:
+        layout = build(df)
+        with _layout_lock:
+            layout = _layout_cache.setdefault(key, layout)
+    return layout
+
+def drop_layouts(stale):
+    """Drop layouts of stale dataset versions (registered with hot_reload.on_swap)"""
+    with _layout_lock:
+        for key in [k for k in _layout_cache if stale(k[0])]:
+            del _layout_cache[key]
+
 # Landing Page Layout - Updated with actual Excel sheet names
+@functools.lru_cache(maxsize=None)
 def landing_page():
     return html.Div([
         # Header
@@ -233,7 +153,7 @@ def landing_page():
             
             dbc.Row([
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #667eea 0%, #764ba2 100%)",
@@ -243,11 +163,11 @@ def landing_page():
                         }, children="EP"),
                         html.Div("Epidemiology", className="analysis-name"),
                         html.P("Disease prevalence and incidence analysis", className="analysis-desc")
-                    ], className="analysis-button", id="btn-epidemiology")
+                    ], className="analysis-button", id="btn-epidemiology"), href="/epidemiology", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #f093fb 0%, #f5576c 100%)",
@@ -257,11 +177,11 @@ def landing_page():
                         }, children="VR"),
                         html.Div("Vaccination Rate", className="analysis-name"),
                         html.P("Coverage and vaccination rate tracking", className="analysis-desc")
-                    ], className="analysis-button", id="btn-vaccination-rate")
+                    ], className="analysis-button", id="btn-vaccination-rate"), href="/vaccination-rate", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #4facfe 0%, #00f2fe 100%)",
@@ -271,11 +191,11 @@ def landing_page():
                         }, children="PR"),
                         html.Div("Pricing Analysis", className="analysis-name"),
                         html.P("Price trends and elasticity insights", className="analysis-desc")
-                    ], className="analysis-button", id="btn-pricing")
+                    ], className="analysis-button", id="btn-pricing"), href="/pricing", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #43e97b 0%, #38f9d7 100%)",
@@ -285,13 +205,13 @@ def landing_page():
                         }, children="CG"),
                         html.Div("CAGR Analysis", className="analysis-name"),
                         html.P("Growth rates by segments", className="analysis-desc")
-                    ], className="analysis-button", id="btn-cagr")
+                    ], className="analysis-button", id="btn-cagr"), href="/cagr", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4")
             ]),
             
             dbc.Row([
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #fa709a 0%, #fee140 100%)",
@@ -301,11 +221,11 @@ def landing_page():
                         }, children="MC"),
                         html.Div("MSA Comparison", className="analysis-name"),
                         html.P("Market share comparative analysis", className="analysis-desc")
-                    ], className="analysis-button", id="btn-msa-comparison")
+                    ], className="analysis-button", id="btn-msa-comparison"), href="/msa-comparison", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #30cfd0 0%, #330867 100%)",
@@ -315,11 +235,11 @@ def landing_page():
                         }, children="PC"),
                         html.Div("Procurement Analysis", className="analysis-name"),
                         html.P("Public and private procurement tracking", className="analysis-desc")
-                    ], className="analysis-button", id="btn-procurement")
+                    ], className="analysis-button", id="btn-procurement"), href="/procurement", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #a8edea 0%, #fed6e3 100%)",
@@ -329,11 +249,11 @@ def landing_page():
                         }, children="BD"),
                         html.Div("Brand-Demographic", className="analysis-name"),
                         html.P("Brand performance by demographics", className="analysis-desc")
-                    ], className="analysis-button", id="btn-brand-demographic")
+                    ], className="analysis-button", id="btn-brand-demographic"), href="/brand-demographic", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4"),
                 
                 dbc.Col([
-                    html.Div([
+                    dcc.Link(html.Div([
                         html.Div(className="icon-placeholder", style={
                             "width": "64px", "height": "64px", "margin": "0 auto 16px",
                             "background": "linear-gradient(135deg, #ff9a56 0%, #ff6a88 100%)",
@@ -343,7 +263,7 @@ def landing_page():
                         }, children="FD"),
                         html.Div("FDF Analysis", className="analysis-name"),
                         html.P("Formulation and ROA performance", className="analysis-desc")
-                    ], className="analysis-button", id="btn-fdf")
+                    ], className="analysis-button", id="btn-fdf"), href="/fdf", className="analysis-link")
                 ], lg=3, md=4, sm=6, xs=12, className="mb-4")
             ])
         ], className="landing-container"),
@@ -357,77 +277,96 @@ def landing_page():
         ], className="footer")
     ])
 
-# Callback for navigation
+# Analysis routes: pathname -> (module, layout function). Only these routes load the dataset.
+ROUTES = {
+    '/epidemiology': ('pages', 'epidemiology_page'),
+    '/vaccination-rate': ('pages', 'vaccination_rate_page'),
+    '/pricing': ('pages', 'pricing_page'),
+    '/cagr': ('pages', 'cagr_page'),
+    '/msa-comparison': ('pages', 'msa_comparison_page'),
+    '/procurement': ('pages', 'procurement_page'),
+    '/brand-demographic': ('pages', 'brand_demographic_page'),
+    '/fdf': ('pages', 'fdf_page'),
+}
+
+@functools.lru_cache(maxsize=None)
+def page_builder(pathname):
+    """Layout function of an analysis route, its module imported on first use"""
+    module, name = ROUTES[pathname]
+    return getattr(importlib.import_module(module), name)
+
+# Callback for navigation: the landing cards are dcc.Links, so only the pathname triggers it
 @app.callback(Output('page-content', 'children'),
               [Input('url', 'pathname')])
 def display_page(pathname):
-    df = get_data()  # Lazy load data on first access
-    if pathname == '/epidemiology':
-        from pages import epidemiology_page
-        return epidemiology_page(df)
-    elif pathname == '/vaccination-rate':
-        from pages import vaccination_rate_page
-        return vaccination_rate_page(df)
-    elif pathname == '/pricing':
-        from pages import pricing_page
-        return pricing_page(df)
-    elif pathname == '/cagr':
-        from pages import cagr_page
-        return cagr_page(df)
-    elif pathname == '/msa-comparison':
-        from pages import msa_comparison_page
-        return msa_comparison_page(df)
-    elif pathname == '/procurement':
-        from pages import procurement_page
-        return procurement_page(df)
-    elif pathname == '/brand-demographic':
-        from pages import brand_demographic_page
-        return brand_demographic_page(df)
-    elif pathname == '/fdf':
-        from pages import fdf_page
-        return fdf_page(df)
-    else:
-        return landing_page()
-
-# Navigation callbacks for buttons
-@app.callback(Output('url', 'pathname'),
-              [Input('btn-epidemiology', 'n_clicks'),
-               Input('btn-vaccination-rate', 'n_clicks'),
-               Input('btn-pricing', 'n_clicks'),
-               Input('btn-cagr', 'n_clicks'),
-               Input('btn-msa-comparison', 'n_clicks'),
-               Input('btn-procurement', 'n_clicks'),
-               Input('btn-brand-demographic', 'n_clicks'),
-               Input('btn-fdf', 'n_clicks')])
-def navigate_to_page(*args):
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return '/'
-    
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    
-    navigation_map = {
-        'btn-epidemiology': '/epidemiology',
-        'btn-vaccination-rate': '/vaccination-rate',
-        'btn-pricing': '/pricing',
-        'btn-cagr': '/cagr',
-        'btn-msa-comparison': '/msa-comparison',
-        'btn-procurement': '/procurement',
-        'btn-brand-demographic': '/brand-demographic',
-        'btn-fdf': '/fdf'
-    }
-    
-    return navigation_map.get(button_id, '/')
+    if pathname in ROUTES:
+        df = get_data()  # Lazy load data on first analysis page access
+        return cached_layout(df, pathname, page_builder(pathname))
+    return landing_page()
 
 # Import and register all callbacks
-from callbacks import register_all_callbacks
+from callbacks import register_all_callbacks, build_cubes, warm_results, drop_client_stores, RESULT_CACHE
+from mask_cache import MASK_CACHE
 register_all_callbacks(app, get_data)  # Pass the getter function, not the data itself
 
+# Caches keyed on the dataset version drop older versions when a reload swaps the dataset
+for drop in (RESULT_CACHE.drop_versions, MASK_CACHE.drop_versions, bitmap_index.drop_versions,
+             cube.drop_versions, approx.drop_versions, drop_client_stores, drop_layouts):
+    hot_reload.on_swap(drop)
+
+# Prometheus-format /metrics: callback phase latencies, rows, payload bytes, caches, RSS
+metrics.add_cache_gauges({"result": RESULT_CACHE, "selection": MASK_CACHE})
+metrics.add_metrics_route(server)
+
+# Background jobs run in forked processes: merge their cache entries and metrics into this worker
+background.share(RESULT_CACHE, MASK_CACHE, metrics)
+
+def warm_sample(df):
+    """Approximate-mode sample of a large dataset"""
+    if approx.active(df):
+        approx.sample_for(df)
+
+def warm_dataset():
+    global _df_cache
+    if get_data().empty:
+        # Forget the failed load so the warm-up's retry loads the dataset again
+        with _data_lock:
+            if _df_cache is not None and _df_cache.empty:
+                _df_cache = None
+        raise RuntimeError("dataset is empty")
+
+# Warm-up: build the data, indexes and caches ahead of the first analysis request
+WARM_UP = warmup.WarmUp([
+    ("dataset", warm_dataset),
+    ("bitmap_index", lambda: bitmap_index.index_for(get_data())),
+    ("cubes", lambda: build_cubes(get_data())),
+    ("approx_sample", lambda: warm_sample(get_data())),
+    ("layouts", lambda: [cached_layout(get_data(), path, page_builder(path)) for path in ROUTES]),
+    ("reload_watch", lambda: RELOADER.watch()),
+])
+warmup.add_health_routes(server, WARM_UP)
+
+def prepare_dataset(df):
+    """Build a new dataset's index, cubes, layouts and default page results before it goes live"""
+    bitmap_index.index_for(df)
+    build_cubes(df)
+    warm_sample(df)
+    for path in ROUTES:
+        cached_layout(df, path, page_builder(path))
+    warm_results(df)
+
+# Hot reload: POST /admin/reload or a change of the source files swaps in a new dataset
+RELOADER = hot_reload.Reloader(load_dataset, prepare_dataset, swap_data, get_data,
+                               sources=[snapshot.SNAPSHOT_PATH and os.path.join(snapshot.SNAPSHOT_PATH, snapshot.MANIFEST),
+                                        excel_ingest.EXCEL_PATH])
+hot_reload.add_reload_route(server, RELOADER)
+
 # Run the app
 if __name__ == "__main__":
     print("=" * 60)
     print("[START] Global Vaccine Market Analytics Dashboard")
     print("[INFO] Server starting on http://0.0.0.0:8050")
-    print("[INFO] Data will be generated on first page access")
+    print("[INFO] Warming up data and caches in the background (see /readyz)")
     print("=" * 60)
+    WARM_UP.start()
     app.run_server(debug=True, host="0.0.0.0", port=8050)
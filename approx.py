@@ -0,0 +1,261 @@
+"""
+Progressive approximate results for very large datasets (APPROX_MODE).
+
+On a dataset of at least APPROX_MIN_ROWS rows, a dropdown change first
+answers from a precomputed stratified sample and then refines to the exact
+result:
+
+1. The page callback runs against the sample (APPROX_SAMPLE_FRACTION of the
+   rows of every year x region stratum, at least APPROX_STRATUM_MIN_ROWS,
+   drawn once per dataset version with a fixed seed). Each sample row
+   carries the weight N_h / n_h of its stratum, so sums, counts and row
+   counts are scaled to the full dataset (Horvitz-Thompson estimates) and
+   means come out as ratio estimates; min, max and distinct counts are
+   those of the sample. The page shows an "approximate ±x%" badge: the 95%
+   margin of error of the page's metric totals under the filters
+   (stratified domain estimator, largest over the metrics).
+2. The outputs also write the filter values to the page's `<prefix>-exact`
+   store, which runs the page callback on the full dataset, replaces the
+   figures with dash.Patch updates and clears the badge.
+
+Filter values whose exact result is already cached skip the approximate
+pass. Smaller datasets and client-side pages always answer exactly.
+"""
+import functools
+import os
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+from dash import Input, Output, dcc, html, no_update
+
+import aggregation
+import cube
+import group_kernel
+import hot_reload
+import schema
+from filtered_view import filter_view
+
+APPROX_MODE = os.environ.get("APPROX_MODE", "1").lower() in ("1", "true", "yes")
+# Datasets with fewer rows always answer exactly
+APPROX_MIN_ROWS = int(os.environ.get("APPROX_MIN_ROWS", "2000000"))
+APPROX_SAMPLE_FRACTION = float(os.environ.get("APPROX_SAMPLE_FRACTION", "0.01"))
+APPROX_STRATUM_MIN_ROWS = int(os.environ.get("APPROX_STRATUM_MIN_ROWS", "50"))
+
+STRATA = ("year", "region")
+WEIGHT = "_weight"
+STRATUM = "_stratum"
+SEED = 0
+# Two-sided 95% normal quantile of the margin of error
+Z = 1.96
+
+ROWS = cube.ROWS
+
+
+# 1. STRATIFIED SAMPLE
+class Sample:
+    """Sample rows of a dataset (with WEIGHT and STRATUM columns) and the size of every stratum"""
+
+    def __init__(self, frame, population, sampled):
+        self.frame = frame
+        self.population = population
+        self.sampled = sampled
+
+
+def build_sample(df, fraction=APPROX_SAMPLE_FRACTION, min_rows=APPROX_STRATUM_MIN_ROWS, seed=SEED):
+    """Stratified sample of df by year x region, without replacement"""
+    strata, _, _ = group_kernel.group_codes([df[s] for s in STRATA])
+    # Rows with a missing stratum key fall into one more stratum
+    strata = np.where(strata < 0, strata.max() + 1, strata)
+    population = np.bincount(strata)
+    sampled = np.minimum(population, np.maximum(min_rows, np.ceil(fraction * population).astype(np.int64)))
+    rng = np.random.default_rng(seed)
+    order = np.argsort(strata, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(population)[:-1]])
+    positions = np.sort(np.concatenate([
+        order[start + rng.choice(size, n, replace=False)]
+        for start, size, n in zip(starts, population, sampled) if n > 0]))
+
+    frame = df.take(positions)
+    frame.reset_index(drop=True, inplace=True)
+    frame[STRATUM] = strata[positions]
+    frame[WEIGHT] = (population / np.maximum(sampled, 1))[strata[positions]]
+    frame.attrs["dataset_version"] = f"{df.attrs.get('dataset_version')}#sample"
+    frame.attrs["approx_sample"] = True
+    return Sample(frame, population, sampled)
+
+
+_sample_lock = Lock()
+_samples = {}
+
+
+def active(df):
+    """True when df is large enough for approximate answers"""
+    return APPROX_MODE and len(df) >= APPROX_MIN_ROWS
+
+
+def sample_for(df):
+    """The Sample of df, built once per dataset version"""
+    version = df.attrs.get("dataset_version")
+    sample = _samples.get(version)
+    if sample is not None:
+        return sample
+    with _sample_lock:
+        if version not in _samples:
+            _samples[version] = build_sample(df)
+            print(f"[OK] Approximate-mode sample: {len(_samples[version].frame):,} of {len(df):,} rows")
+        return _samples[version]
+
+
+def drop_versions(stale):
+    """Drop the samples of dataset versions for which stale(version) is true"""
+    with _sample_lock:
+        for version in [v for v in _samples if stale(v)]:
+            del _samples[version]
+
+
+def is_sample(df):
+    return bool(df.attrs.get("approx_sample"))
+
+
+# 2. WEIGHTED QUERIES
+class SampleSelection(cube.Selection):
+    """Query interface over filtered sample rows with sums, counts and row counts scaled by the weights"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def __len__(self):
+        """Selected sample rows"""
+        return len(self._view)
+
+    @property
+    def empty(self):
+        return self._view.empty
+
+    def rows(self):
+        """Estimated rows of the full dataset"""
+        return float(self._view[WEIGHT].sum())
+
+    def nunique(self, dim):
+        return self._view[schema.resolve(dim)].nunique()
+
+    def _columns(self, metrics, needs):
+        weight = self._view[WEIGHT].to_numpy()
+        columns = {ROWS: (weight, "sum")}
+        for m in metrics:
+            values = self._view[m].to_numpy(dtype=np.float64)
+            for how in (aggregation.PARTIALS if needs is None else needs[m]):
+                if how == "sum":
+                    column = (values * weight, "sum")
+                elif how == "count":
+                    column = (np.where(np.isnan(values), np.nan, weight), "sum")
+                else:
+                    column = (values, how)
+                columns[aggregation.partial_column(m, how)] = column
+        return columns
+
+    def partials(self, keys, metrics, needs=None):
+        """Estimated row count plus the partials of each metric per keys"""
+        columns = self._columns(metrics, needs)
+        if not keys:
+            # One group holding every row; no rows leaves zero sums and missing extrema
+            totals = group_kernel.aggregate([np.zeros(len(self._view), dtype=np.intp)], columns, ["_all"])
+            if len(totals):
+                return totals.frame().reset_index(drop=True)
+            return pd.DataFrame({c: [0.0 if how == "sum" else np.nan] for c, (_, how) in columns.items()})
+        return group_kernel.aggregate([self._view[k] for k in keys], columns, keys).frame()
+
+
+def select(df, filters, dims, metric_names):
+    """SampleSelection over the sample rows (df is a Sample's frame) matching filters"""
+    columns = [schema.resolve(c) for c in dims + metric_names] + [WEIGHT]
+    return SampleSelection(filter_view(df, filters, columns))
+
+
+def margin(sample, filters, metric_names):
+    """Largest relative 95% margin of error of the metrics' estimated totals under filters (NaN without rows).
+
+    Stratified domain estimator: rows outside the filters count as zeros of
+    their stratum, so the variance also covers the uncertain domain size.
+    """
+    names = list(dict.fromkeys(schema.resolve(m) for m in metric_names))
+    view = filter_view(sample.frame, filters, names + [STRATUM])
+    if view.empty:
+        return float("nan")
+    strata = view[STRATUM].to_numpy()
+    size = len(sample.population)
+    sampled = sample.sampled > 0
+    n, population = sample.sampled[sampled].astype(np.float64), sample.population[sampled].astype(np.float64)
+    worst = 0.0
+    for m in names:
+        values = np.nan_to_num(view[m].to_numpy(dtype=np.float64))
+        sums = np.bincount(strata, weights=values, minlength=size)[sampled]
+        squares = np.bincount(strata, weights=values * values, minlength=size)[sampled]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = np.where(n > 1, (squares - sums * sums / n) / (n - 1), 0.0)
+            total = float(np.sum(population / n * sums))
+            error = Z * np.sqrt(np.sum(population ** 2 * (1 - n / population) * variance / n))
+        if total != 0:
+            worst = max(worst, float(error / abs(total)))
+    return worst
+
+
+# 3. PROGRESSIVE CALLBACKS
+def badge_text(relative):
+    if np.isnan(relative):
+        return "approximate"
+    return f"approximate ±{relative * 100:.1f}%"
+
+
+def filter_field(prefix, component_id):
+    """'cagr-income_type-filter' -> 'income_type'"""
+    return component_id[len(prefix) + 1:-len("-filter")]
+
+
+def components(prefix):
+    """Layout components of a page in approximate mode: the badge and the exact-pass store (none otherwise)"""
+    if not APPROX_MODE:
+        return []
+    return [html.Span(id=f"{prefix}-approx", className="approx-badge"), dcc.Store(id=f"{prefix}-exact")]
+
+
+def register(app, outputs, inputs, func, get_live, metric_names, options=None):
+    """Register a page callback answering approximately first, then exactly.
+
+    func is the page callback (full figures on the first render, patches
+    after); it runs against the sample when pinned to it. The exact pass
+    always sends patches: the approximate pass has already rendered the
+    figures in full. options(cancel=inputs) returns extra app.callback
+    arguments (see background.options); a dropdown change cancels the
+    running exact pass.
+    """
+    options = options or (lambda cancel=(): {})
+    prefix = outputs[0].component_id.rsplit("-", 2)[0]  # "<prefix>-kpi-1"
+    fields = [filter_field(prefix, i.component_id) for i in inputs]
+    is_cached = getattr(func, "is_cached", None)
+
+    @functools.wraps(func)
+    def progressive(*values):
+        df = get_live()
+        if not active(df) or (is_cached is not None and is_cached(*values)):
+            return tuple(func(*values)) + ("", no_update)
+        sample = sample_for(df)
+        with hot_reload.use(sample.frame):
+            result = func(*values)
+        relative = margin(sample, dict(zip(fields, values)), metric_names)
+        return tuple(result) + (badge_text(relative), {"values": list(values)})
+
+    def exact(query):
+        return tuple(func(*query["values"])) + ("",)
+
+    if is_cached is not None:
+        exact.is_cached = lambda query: is_cached(*query["values"])
+
+    app.callback(outputs + [Output(f"{prefix}-approx", "children"), Output(f"{prefix}-exact", "data")],
+                 inputs, **options())(progressive)
+    duplicates = [Output(o.component_id, o.component_property, allow_duplicate=True)
+                  for o in outputs + [Output(f"{prefix}-approx", "children")]]
+    app.callback(duplicates, Input(f"{prefix}-exact", "data"), prevent_initial_call=True,
+                 **options(cancel=inputs))(exact)
+    return progressive
@@ -0,0 +1,225 @@
+/*
+ * Client-side page callbacks for CLIENTSIDE_MODE=1 (see clientside.py).
+ *
+ * A page store holds the page's cube cells column-encoded: per filter field
+ * the sorted labels and one label code per cell, and one array per partial
+ * column (_rows, <metric>__sum, <metric>__count). Each callback selects the
+ * cells matching the dropdowns, rolls the partials up and returns the same
+ * KPI strings and figure dicts as its server callback in callbacks.py, with
+ * the figures laid out like figures.py builds them. Without a store it
+ * forwards the filter values to the server callback through the page's
+ * query store.
+ */
+(function () {
+    const HEIGHT = 350;
+    const PLOT_BGCOLOR = "white";
+    const XAXIS = {anchor: "y", domain: [0.0, 1.0]};
+    const YAXIS = {anchor: "x", domain: [0.0, 1.0]};
+
+    // Python's f"{num:.{digits}f}"
+    function fixed(num, digits) {
+        return Number.isNaN(num) ? "nan" : num.toFixed(digits);
+    }
+
+    // callbacks.format_number
+    function formatNumber(num) {
+        if (num >= 1e9) return fixed(num / 1e9, 2) + "B";
+        if (num >= 1e6) return fixed(num / 1e6, 2) + "M";
+        if (num >= 1e3) return fixed(num / 1e3, 2) + "K";
+        return fixed(num, 0);
+    }
+
+    // Positions of the cells matching every non-empty filter (field -> selected labels)
+    function select(store, filters) {
+        const tests = [];
+        Object.keys(filters).forEach(function (field) {
+            const values = filters[field];
+            if (!values || !values.length) return;
+            const dim = store.dims[field];
+            const wanted = new Uint8Array(dim.labels.length);
+            values.forEach(function (value) {
+                const code = dim.labels.indexOf(value);
+                if (code >= 0) wanted[code] = 1;
+            });
+            tests.push([dim.codes, wanted]);
+        });
+        const cells = [];
+        for (let cell = 0; cell < store.cells; cell++) {
+            let match = true;
+            for (let t = 0; t < tests.length && match; t++) {
+                match = tests[t][1][tests[t][0][cell]] === 1;
+            }
+            if (match) cells.push(cell);
+        }
+        return cells;
+    }
+
+    function total(store, cells, column) {
+        const values = store.columns[column];
+        let sum = 0;
+        cells.forEach(function (cell) { sum += values[cell]; });
+        return sum;
+    }
+
+    // Observed groups of one field in label order: {labels, sums: {column: [...]}}
+    function group(store, cells, field, columns) {
+        const dim = store.dims[field];
+        const rows = new Float64Array(dim.labels.length);
+        const sums = columns.map(function () { return new Float64Array(dim.labels.length); });
+        cells.forEach(function (cell) {
+            const code = dim.codes[cell];
+            rows[code] += store.columns._rows[cell];
+            columns.forEach(function (column, j) { sums[j][code] += store.columns[column][cell]; });
+        });
+        const out = {labels: [], sums: {}};
+        columns.forEach(function (column) { out.sums[column] = []; });
+        rows.forEach(function (count, code) {
+            if (count === 0) return;
+            out.labels.push(dim.labels[code]);
+            columns.forEach(function (column, j) { out.sums[column].push(sums[j][code]); });
+        });
+        return out;
+    }
+
+    function sums(grouped, metric) {
+        return grouped.sums[metric + "__sum"];
+    }
+
+    function means(grouped, metric) {
+        const counts = grouped.sums[metric + "__count"];
+        return sums(grouped, metric).map(function (sum, i) { return sum / counts[i]; });
+    }
+
+    // Label of the first largest value (pandas idxmax)
+    function idxmax(labels, values) {
+        let best = 0;
+        values.forEach(function (value, i) { if (value > values[best]) best = i; });
+        return labels[best];
+    }
+
+    // Figure builders mirroring figures.py
+    function color(store, i) {
+        const colorway = store.template.layout.colorway;
+        return colorway[i % colorway.length];
+    }
+
+    function cartesianLayout(store, title, x, y, legendTitle, extra) {
+        const layout = {
+            template: store.template,
+            xaxis: Object.assign({}, XAXIS, {title: {text: x}}),
+            yaxis: Object.assign({}, YAXIS, {title: {text: y}}),
+            legend: legendTitle === null ? {tracegroupgap: 0} : {title: {text: legendTitle}, tracegroupgap: 0},
+            title: {text: title}
+        };
+        return Object.assign(layout, extra);
+    }
+
+    function barByCategory(store, labels, values, x, y, title) {
+        const hover = x + "=%{x}<br>" + y + "=%{y}<extra></extra>";
+        const data = labels.map(function (label, i) {
+            return {alignmentgroup: "True", hovertemplate: hover, legendgroup: label,
+                    marker: {color: color(store, i), pattern: {shape: ""}}, name: label, offsetgroup: label,
+                    orientation: "v", showlegend: true, textposition: "auto", x: [label], xaxis: "x",
+                    y: [values[i]], yaxis: "y", type: "bar"};
+        });
+        const layout = cartesianLayout(store, title, x, y, labels.length ? x : null,
+                                       {barmode: "relative", showlegend: false, plot_bgcolor: PLOT_BGCOLOR,
+                                        height: HEIGHT});
+        Object.assign(layout.xaxis, {categoryorder: "array", categoryarray: labels.slice()});
+        return {data: data, layout: layout};
+    }
+
+    function line(store, xValues, yValues, x, y, title) {
+        const trace = {hovertemplate: x + "=%{x}<br>" + y + "=%{y}<extra></extra>", legendgroup: "",
+                       line: {color: color(store, 0), dash: "solid"}, marker: {symbol: "circle"},
+                       mode: "lines+markers", name: "", orientation: "v", showlegend: false, x: xValues,
+                       xaxis: "x", y: yValues, yaxis: "y", type: "scatter"};
+        return {data: [trace],
+                layout: cartesianLayout(store, title, x, y, null, {plot_bgcolor: PLOT_BGCOLOR, height: HEIGHT})};
+    }
+
+    function lines(store, xValues, series, title) {
+        const data = series.map(function (s) {
+            return {mode: "lines+markers", name: s[0], x: xValues, y: s[1], type: "scatter"};
+        });
+        return {data: data, layout: {template: store.template, title: {text: title}, plot_bgcolor: PLOT_BGCOLOR,
+                                     height: HEIGHT}};
+    }
+
+    function pie(store, labels, values, title, pull) {
+        const trace = {hole: 0.4, labels: labels};
+        if (pull !== undefined) trace.pull = pull;
+        Object.assign(trace, {values: values, type: "pie"});
+        return {data: [trace], layout: {template: store.template, title: {text: title}, height: HEIGHT}};
+    }
+
+    // Page renderers: (store, filters) -> callback outputs, as update_<page> in callbacks.py
+    function epidemiology(store, filters) {
+        const cells = select(store, filters);
+        if (!cells.length) return ["0", "0", "N/A", "0", {}, {}, {}];
+
+        const byDisease = group(store, cells, "disease", ["prevalence__sum"]);
+        const byRegion = group(store, cells, "region", ["incidence__sum"]);
+        const trend = group(store, cells, "year", ["prevalence__sum", "incidence__sum"]);
+        const prevByDisease = sums(byDisease, "prevalence");
+        const incByRegion = sums(byRegion, "incidence");
+        return [
+            formatNumber(total(store, cells, "prevalence__sum")),
+            formatNumber(total(store, cells, "incidence__sum")),
+            idxmax(byDisease.labels, prevByDisease),
+            formatNumber(total(store, cells, "incidence__sum") / total(store, cells, "incidence__count")),
+            barByCategory(store, byDisease.labels, prevByDisease, "disease", "prevalence", "Prevalence by Disease"),
+            pie(store, byRegion.labels, incByRegion, "Incidence Distribution by Region",
+                incByRegion.map(function () { return 0.05; })),
+            lines(store, trend.labels, [["Prevalence", sums(trend, "prevalence")],
+                                        ["Incidence", sums(trend, "incidence")]], "Prevalence & Incidence Trend")
+        ];
+    }
+
+    function vaccination_rate(store, filters) {
+        const cells = select(store, filters);
+        const rate = ["vaccination_rate__sum", "vaccination_rate__count"];
+        const byRegion = group(store, cells, "region", rate);
+        const byDisease = group(store, cells, "disease", rate);
+        const byCountry = group(store, cells, "country", []);
+        const trend = group(store, cells, "year", rate);
+        const vaxByRegion = means(byRegion, "vaccination_rate");
+        return [
+            fixed(total(store, cells, "vaccination_rate__sum") / total(store, cells, "vaccination_rate__count"), 1) + "%",
+            fixed(total(store, cells, "coverage_rate__sum") / total(store, cells, "coverage_rate__count"), 1) + "%",
+            cells.length ? idxmax(byRegion.labels, vaxByRegion) : "N/A",
+            byCountry.labels.length,
+            barByCategory(store, byRegion.labels, vaxByRegion, "region", "vaccination_rate",
+                          "Avg Vaccination Rate by Region"),
+            pie(store, byDisease.labels, means(byDisease, "vaccination_rate"), "Vaccination Rate by Disease"),
+            line(store, trend.labels, means(trend, "vaccination_rate"), "year", "vaccination_rate",
+                 "Vaccination Rate Trend")
+        ];
+    }
+
+    // Clientside callback of a page: (filter values..., store) -> 4 KPIs, 3 figures, server fallback query
+    const PAGE_OUTPUTS = 7;
+
+    function pageCallback(render, fields) {
+        return function () {
+            const dc = window.dash_clientside;
+            const values = Array.prototype.slice.call(arguments, 0, fields.length);
+            const store = arguments[fields.length];
+            if (!store) {
+                const first = !dc.callback_context || !dc.callback_context.triggered.length;
+                return new Array(PAGE_OUTPUTS).fill(dc.no_update).concat([{values: values, first: first}]);
+            }
+            const filters = {};
+            fields.forEach(function (field, i) { filters[field] = values[i]; });
+            return render(store, filters).concat([dc.no_update]);
+        };
+    }
+
+    const FIELDS = ["year", "disease", "region", "income_type", "country"];
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        dashboard: {
+            epidemiology: pageCallback(epidemiology, FIELDS),
+            vaccination_rate: pageCallback(vaccination_rate, FIELDS)
+        }
+    });
+})();
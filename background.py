@@ -0,0 +1,215 @@
+"""
+Background page callbacks with cancellation (BACKGROUND_CALLBACKS).
+
+The update_* page callbacks run as Dash background callbacks through a
+DiskcacheManager: every uncached call runs as a job in its own forked
+process (which shares the dataset, indexes and cubes of the worker
+copy-on-write), and the browser polls for the result every
+BACKGROUND_POLL_MS. This keeps the worker's request threads free while a
+page recomputes, and lets superseded work be stopped:
+
+    same callback   when a dropdown changes while the page's job is still
+                    running, the browser sends the old job with the new
+                    request and Dash terminates it
+    exact pass      in approximate mode, a dropdown change also cancels the
+                    page's running exact job (see approx.py)
+    navigation      leaving the page (url pathname) cancels its jobs
+
+While a job runs, the page's `<prefix>-running` badge shows "Updating…".
+Job results are kept in the DiskCache under BACKGROUND_CACHE_DIR for
+BACKGROUND_EXPIRE_SECONDS, keyed by page, dataset version, inputs and
+whether the call is a first render (full figures) or a later one (dash.Patch
+updates), so they are shared by every worker.
+
+Jobs must not lose what they compute in process memory. A call whose result
+is in the DiskCache, or in the worker's result cache, is answered in the
+request process without a job (the browser collects it at its first poll).
+A job sends its new result- and selection-cache entries, cache counters and
+metric increments along with its result, and the worker merges them when
+the result is collected (see share()).
+
+The manager needs the diskcache, multiprocess and psutil packages, which
+requirements.txt installs through dash[diskcache]. Without them (or with
+BACKGROUND_CALLBACKS=0) the callbacks run in the request thread as before,
+and the app logs an error at startup when background callbacks were asked for.
+"""
+import hashlib
+import inspect
+import os
+import tempfile
+
+from dash import Input, Output, callback_context, html
+from dash.exceptions import PreventUpdate
+from flask import g
+
+import metrics
+
+BACKGROUND_CALLBACKS = os.environ.get("BACKGROUND_CALLBACKS", "1").lower() in ("1", "true", "yes")
+BACKGROUND_CACHE_DIR = os.environ.get("BACKGROUND_CACHE_DIR",
+                                      os.path.join(tempfile.gettempdir(), "vaccine-dashboard-callbacks"))
+BACKGROUND_POLL_MS = int(os.environ.get("BACKGROUND_POLL_MS", "200"))
+BACKGROUND_EXPIRE_SECONDS = int(os.environ.get("BACKGROUND_EXPIRE_SECONDS", "600"))
+
+RUNNING_TEXT = "Updating…"
+
+try:
+    import diskcache
+    import multiprocess  # noqa: F401 - DiskcacheManager's job processes
+    import psutil  # noqa: F401 - DiskcacheManager's job termination
+    from dash import DiskcacheManager
+except ImportError:
+    diskcache = None
+    DiskcacheManager = object  # never instantiated: enabled() is False
+
+_cache = None
+
+# Job id of a call answered without a job; Dash terminates and polls job ids, so it must never be a pid
+ANSWERED = -1
+NO_UPDATE = {"_dash_no_update": "_dash_no_update"}
+
+# Process state a job changes (result and selection caches, metrics), each with
+# snapshot(), changes(snapshot) and merge(changes); see share()
+SHARED = []
+
+
+def share(*states):
+    """Merge what jobs change in these states back into the worker that collects their results"""
+    SHARED.extend(states)
+
+
+class PageJobManager(DiskcacheManager):
+    """DiskcacheManager that keeps the worker's in-process caches and metrics in use.
+
+    A call whose callback's is_cached(*args) is true (result_cache.memoize),
+    or whose result is already in the DiskCache, is answered in the request
+    process without forking a job. A job sends what it changed in
+    the SHARED states along with its result, and the worker merges it when
+    the browser collects the result.
+    """
+
+    def __init__(self, cache, callback=None, **kwargs):
+        super().__init__(cache, **kwargs)
+        self.callback = callback
+
+    def build_cache_key(self, fn, args, cache_args_to_ignore):
+        # Dash hashes fn's source, which inspect resolves to the page function through every
+        # functools.wraps wrapper; the wrapper's own code keeps e.g. the approximate pass and
+        # the plain callback (different outputs) apart
+        key = super().build_cache_key(fn, args, cache_args_to_ignore)
+        return hashlib.sha1((inspect.getsource(fn.__code__) + key).encode("utf-8")).hexdigest()
+
+    def _changes_key(self, key, job):
+        return f"{key}-changes-{job}"
+
+    def make_job_fn(self, fn, progress, key=None):
+        handle, expire, changes_key = self.handle, self.expire, self._changes_key
+        job = {}
+
+        def collected(*args, **kwargs):
+            before = [state.snapshot() for state in SHARED]
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                # Stored before Dash stores the result, so the worker finds it with the result
+                changes = [state.changes(b) for state, b in zip(SHARED, before)]
+                handle.set(changes_key(job["key"], os.getpid()), changes, expire=expire)
+
+        run = super().make_job_fn(collected, progress, key)
+
+        def job_fn(result_key, progress_key, args, context):
+            job["key"] = result_key
+            run(result_key, progress_key, args, context)
+
+        job_fn.callback = fn
+        return job_fn
+
+    def call_job_fn(self, key, job_fn, args, context):
+        is_cached = getattr(job_fn.callback, "is_cached", None)
+        if is_cached is not None and is_cached(*args):
+            try:
+                result = job_fn.callback(*args)
+            except PreventUpdate:
+                result = NO_UPDATE
+            self.handle.set(key, result)
+            g.pop("metrics_callback", None)  # recorded on the response that carries the result
+        elif not self.result_ready(key):
+            return super().call_job_fn(key, job_fn, args, context)
+        return ANSWERED
+
+    def get_result(self, key, job):
+        result = super().get_result(key, job)
+        if result is not self.UNDEFINED:
+            changes = self.handle.pop(self._changes_key(key, job), None)
+            if changes is not None:
+                for state, change in zip(SHARED, changes):
+                    state.merge(change)
+            if self.callback is not None:
+                metrics.mark_response(self.callback)
+        return result
+
+    def terminate_job(self, job):
+        if job is not None and int(job) > 0:
+            super().terminate_job(job)
+
+    def job_running(self, job):
+        return job is not None and int(job) > 0 and super().job_running(job)
+
+
+def enabled():
+    """True when page callbacks run as background jobs"""
+    return BACKGROUND_CALLBACKS and diskcache is not None
+
+
+def _disk_cache():
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(BACKGROUND_CACHE_DIR)
+    return _cache
+
+
+def app_manager():
+    """Manager for dash.Dash(background_callback_manager=...), which runs the cancel callbacks; None when disabled"""
+    if BACKGROUND_CALLBACKS and diskcache is None:
+        print("[ERROR] BACKGROUND_CALLBACKS needs `pip install \"dash[diskcache]\"`; running callbacks in-process")
+    return PageJobManager(_disk_cache()) if enabled() else None
+
+
+def first_render():
+    """True on a callback's initial call for a freshly rendered page"""
+    return callback_context.triggered_id is None
+
+
+def page_manager(page, callback, get_version):
+    """Manager of one page's jobs (callback: its metrics name), caching results per page, dataset
+    version, render kind and inputs"""
+    # Page callbacks share their wrapper's source, so the page name keeps their cache keys apart;
+    # a first render gets full figures and later calls dash.Patch updates, so neither replays the other
+    return PageJobManager(_disk_cache(), callback, cache_by=[lambda: page, get_version, first_render],
+                          expire=BACKGROUND_EXPIRE_SECONDS)
+
+
+def prefix_of(outputs):
+    return outputs[0].component_id.rsplit("-", 2)[0]  # "<prefix>-kpi-1"
+
+
+def options(page, callback, outputs, get_version, cancel=()):
+    """app.callback keyword arguments running a page callback in the background ({} when disabled).
+
+    The job is cancelled when the page is left or any of the `cancel` inputs change.
+    """
+    if not enabled():
+        return {}
+    return {
+        "background": True,
+        "manager": page_manager(page, callback, get_version),
+        "interval": BACKGROUND_POLL_MS,
+        "running": [(Output(f"{prefix_of(outputs)}-running", "children"), RUNNING_TEXT, "")],
+        "cancel": [Input("url", "pathname")] + [Input(i.component_id, i.component_property) for i in cancel],
+    }
+
+
+def components(prefix):
+    """Layout components of a page with background callbacks: the running badge (none otherwise)"""
+    if not enabled():
+        return []
+    return [html.Span(id=f"{prefix}-running", className="running-badge")]
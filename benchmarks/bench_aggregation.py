@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark the fused aggregation plans against answering every query of a
+page separately (one grouping per query), on the cube or raw selection the
+page would use
+
+Usage: python benchmarks/bench_aggregation.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema
+from callbacks import PAGE_PLANS, select_page
+from data_generator import generate_comprehensive_data
+
+FILTERS = {"year": [2025, 2026], "region": ["Europe", "APAC"], "income_type": ["High Income"]}
+
+
+def separate(plan, selection):
+    """Every query of the plan as its own total/grouping, like the callbacks did before"""
+    results = {}
+    for name, (by, metric, how) in plan.queries.items():
+        if how == "size":
+            results[name] = selection.rows() if not by else selection.group(by, [], "size")
+        elif by:
+            results[name] = selection.group(list(by), metric, how)
+        else:
+            results[name] = selection.total(metric, how)
+    return results
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = schema.compact(generate_comprehensive_data())
+    df.attrs["dataset_version"] = "bench"
+
+    print("=" * 60)
+    print(f"[BENCH] Fused plans vs one grouping per query over {len(df):,} rows")
+    print("=" * 60)
+    print(f"{'page':20}{'queries':>8}{'passes':>8}{'separate ms':>13}{'fused ms':>10}")
+    for page, plan in PAGE_PLANS.items():
+        select_page(df, page, FILTERS)  # build the page cube outside the timing
+        separate_ms = best_of(lambda: separate(plan, select_page(df, page, FILTERS)), args.repeat)
+        fused_ms = best_of(lambda: plan.execute(select_page(df, page, FILTERS)), args.repeat)
+        print(f"{page:20}{len(plan.queries):>8}{len(plan.passes()):>8}{separate_ms:>13.1f}{fused_ms:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Parity and latency of the query backends (pandas, duckdb) on the update_* callbacks
+
+Every callback runs over the bench_callbacks filter corpus on each backend,
+with the result cache cleared before every call. Outputs are compared with
+the pandas backend's (numbers to a relative 1e-9, scatter density grids
+and stratified samples included) and p50 latencies are reported per callback.
+Exits non-zero on any mismatch. --scale tiles the dataset to compare the
+engines on more rows.
+
+Usage: python benchmarks/bench_backends.py [--backends pandas,duckdb] [--scale N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import callbacks
+import query_backend
+from bench_callbacks import call, corpus_args, page_callbacks, scaled
+
+
+def run(funcs, df, repeat):
+    """{(callback, case): outputs} and {callback: p50 ms} on the current backend"""
+    outputs, latency = {}, {}
+    for name, func, fields in funcs:
+        cases = corpus_args(fields, df)
+        call(func, cases[0][1])  # builds this version's index, cubes and selections
+        times = []
+        for _ in range(repeat):
+            for label, args in cases:
+                start = time.perf_counter()
+                outputs[(name, label)] = call(func, args)
+                times.append((time.perf_counter() - start) * 1000)
+        latency[name] = float(np.percentile(times, 50))
+    return outputs, latency
+
+
+def run_backends(df, names, repeat):
+    """({backend: outputs}, {backend: latencies}) of every callback on df; None when a backend is missing"""
+    funcs = page_callbacks()
+    runs, latencies = {}, {}
+    try:
+        for name in names:
+            backend = query_backend.backend_for(name)
+            if backend.name != name:
+                print(f"[ERROR] Backend '{name}' is not available")
+                return None
+            callbacks.BACKEND = backend
+            runs[name], latencies[name] = run(funcs, df, repeat)
+    finally:
+        callbacks.BACKEND = query_backend.backend_for(query_backend.QUERY_BACKEND)
+    return runs, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default="pandas,duckdb")
+    parser.add_argument("--scale", type=int, default=1, help="tile the dataset this many times")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    names = args.backends.split(",")
+
+    base = app.get_data()
+    if base.empty:
+        print("[ERROR] Dataset could not be generated")
+        return 1
+    df = scaled(base, args.scale) if args.scale > 1 else base
+    app.swap_data(df)
+
+    print("=" * 60)
+    print(f"[BENCH] Query backends {names} on {len(df):,} rows")
+    print("=" * 60)
+    result = run_backends(df, names, args.repeat)
+    app.swap_data(base)
+    if result is None:
+        return 1
+    runs, latencies = result
+
+    print(f"{'callback':28}" + "".join(f"{name + ' ms':>14}" for name in names))
+    for callback in latencies[names[0]]:
+        print(f"{callback:28}" + "".join(f"{latencies[name][callback]:>14.2f}" for name in names))
+
+    mismatches = query_backend.verify(runs, reference=names[0])
+    for callback, case, output, backend in mismatches:
+        print(f"[ERROR] {backend} differs from {names[0]}: {callback} output {output} ({case})")
+    if mismatches:
+        return 1
+    print(f"[OK] {len(next(iter(runs.values()))):,} callback calls identical across {', '.join(names)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark the eight update_* page callbacks in process at several dataset
+scales, with a fixed corpus of filter combinations from empty to highly
+selective; reports p50/p95 latency, allocations and peak memory as JSON
+
+Each scale tiles the generated dataset N times (a new dataset version, so
+cubes, indexes and caches are rebuilt for it). Callbacks are called
+directly, below Dash, with the result cache cleared before every call so
+each call computes its outputs; the selection cache stays warm as it would
+in production. Memory is measured in a separate tracemalloc pass so it does
+not inflate the latencies.
+
+Usage: python benchmarks/bench_callbacks.py [--scales 1,10,100] [--repeat N] [--output FILE]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import bitmap_index
+import callbacks
+import metrics
+from bench_payload import filter_field
+
+# Filter combinations from the whole dataset down to a handful of rows;
+# None marks "first dictionary value of every other filter on the page"
+CORPUS = [
+    ("all", {}),
+    ("one year", {"year": [2025]}),
+    ("one region", {"region": ["Europe"]}),
+    ("years x regions", {"year": [2025, 2026], "region": ["Europe", "APAC"]}),
+    ("year x region x income", {"year": [2030], "region": ["Europe"], "income_type": ["High Income"]}),
+    ("every filter", {"year": [2030], "country": ["Germany"], None: "first"}),
+]
+
+
+def page_callbacks():
+    """(name, function below Dash, filter fields in input order) of every update_* callback"""
+    found = []
+    for callback in app.app.callback_map.values():
+        func = callback["callback"]
+        if not func.__name__.startswith("update_"):
+            continue
+        fields = [filter_field(i["id"]) for i in callback["inputs"]]
+        found.append((func.__name__, func.__wrapped__, fields))
+    return sorted(found)
+
+
+def corpus_args(fields, df):
+    """Positional callback arguments of every corpus entry for a callback's fields"""
+    index = bitmap_index.index_for(df)
+    cases = []
+    for label, filters in CORPUS:
+        values = dict(filters)
+        if values.pop(None, None) == "first":
+            for field in fields:
+                values.setdefault(field, [index.values(field)[0]])
+        cases.append((label, [values.get(field) for field in fields]))
+    return cases
+
+
+def scaled(df, factor):
+    """df tiled factor times, as a new dataset version"""
+    if factor == 1:
+        out = df.copy()
+    else:
+        out = df.iloc[np.tile(np.arange(len(df)), factor)].reset_index(drop=True)
+    out.attrs["dataset_version"] = f"{df.attrs.get('dataset_version')}-x{factor}"
+    return out
+
+
+def call(func, args):
+    callbacks.RESULT_CACHE.clear()
+    return func(*args)
+
+
+def measure(func, cases, repeat):
+    """Latency percentiles over repeat rounds of the corpus, then a tracemalloc pass"""
+    times = []
+    for _ in range(repeat):
+        for _, args in cases:
+            start = time.perf_counter()
+            call(func, args)
+            times.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    blocks = retained = peak = 0
+    for _, args in cases:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        call(func, args)
+        current, top = tracemalloc.get_traced_memory()
+        # Blocks still allocated after the call (the cached result among them)
+        blocks += sum(d.count_diff for d in tracemalloc.take_snapshot().compare_to(before, "filename")
+                      if d.count_diff > 0)
+        retained += current - base
+        peak = max(peak, top - base)
+    tracemalloc.stop()
+    return {
+        "p50_ms": round(float(np.percentile(times, 50)), 3),
+        "p95_ms": round(float(np.percentile(times, 95)), 3),
+        "mean_ms": round(float(np.mean(times)), 3),
+        "calls": len(times),
+        "allocated_blocks": int(blocks),
+        "allocated_kb": round(retained / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated dataset scale factors")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the JSON report to this file (default: stdout only)")
+    args = parser.parse_args()
+    scales = [int(s) for s in args.scales.split(",")]
+
+    base = app.get_data()
+    if base.empty:
+        print("[ERROR] Dataset could not be generated")
+        return 1
+    report = {"python": platform.python_version(), "repeat": args.repeat,
+              "corpus": [label for label, _ in CORPUS], "scales": {}}
+
+    print("=" * 60)
+    print(f"[BENCH] update_* callbacks at scales {scales} ({len(CORPUS)} filter sets x {args.repeat})")
+    print("=" * 60)
+    for factor in scales:
+        start = time.perf_counter()
+        df = scaled(base, factor)
+        app.swap_data(df)
+        results = {}
+        for name, func, fields in page_callbacks():
+            cases = corpus_args(fields, df)
+            call(func, cases[0][1])  # builds this version's index, cubes and selections
+            results[name] = measure(func, cases, args.repeat)
+        report["scales"][str(factor)] = {"rows": len(df), "rss_mb": round(metrics.resident_bytes() / 2 ** 20, 1),
+                                         "seconds": round(time.perf_counter() - start, 1), "callbacks": results}
+        print(f"\nscale {factor}x: {len(df):,} rows")
+        print(f"{'callback':28}{'p50 ms':>9}{'p95 ms':>9}{'blocks':>9}{'peak KB':>11}")
+        for name, r in results.items():
+            print(f"{name:28}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['allocated_blocks']:>9}{r['peak_kb']:>11.1f}")
+    app.swap_data(base)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"\n[OK] Wrote {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark and verify the OLAP cube: build time, cell counts, query time
+against the raw-scan path, and randomized cube-vs-raw verification
+
+Usage: python benchmarks/bench_cube.py [--trials N] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cube
+import schema
+from callbacks import PAGE_SPECS
+from data_generator import generate_comprehensive_data
+
+FILTERS = {"year": [2025, 2026], "region": ["Europe", "APAC"], "income_type": ["High Income"]}
+
+
+def run_queries(selection, spec):
+    """Every total and one-dimension grouping of every metric, like a page would request"""
+    for metric in spec["metrics"]:
+        for how in ("sum", "mean", "min", "max"):
+            selection.total(metric, how)
+            for dim in spec["dims"][:3]:
+                selection.group(dim, metric, how)
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trials", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = schema.compact(generate_comprehensive_data())
+    df.attrs["dataset_version"] = "bench"
+
+    print("=" * 60)
+    print(f"[BENCH] Cube vs raw scan over {len(df):,} rows")
+    print("=" * 60)
+    print(f"{'page':24}{'cells':>9}{'build ms':>10}{'raw ms':>9}{'cube ms':>9}{'verify':>9}")
+    failed = False
+    for page, spec in PAGE_SPECS.items():
+        start = time.perf_counter()
+        page_cube = cube.Cube(df, page, spec["dims"], spec["metrics"])
+        build_ms = (time.perf_counter() - start) * 1000
+        raw_ms = best_of(lambda: run_queries(cube.raw_selection(df, FILTERS, spec["dims"] + spec["metrics"]), spec),
+                         args.repeat)
+        cube_ms = best_of(lambda: run_queries(page_cube.select(FILTERS), spec), args.repeat)
+        mismatches = cube.verify(df, page_cube, trials=args.trials)
+        failed = failed or bool(mismatches)
+        kept = "" if len(page_cube.cells) <= cube.MAX_CELL_RATIO * len(df) else " (raw)"
+        print(f"{page + kept:24}{len(page_cube.cells):>9,}{build_ms:>10.1f}{raw_ms:>9.1f}{cube_ms:>9.1f}"
+              f"{'OK' if not mismatches else len(mismatches):>9}")
+    print("[ERROR] Cube answers differ from raw rows" if failed else "[OK] Cube answers match raw rows")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
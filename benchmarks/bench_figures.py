@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark the figure factory against plotly express / graph_objects: build
+time per figure style, and a check that both serialize to the same JSON
+
+Usage: python benchmarks/bench_figures.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import figures
+import schema
+from data_generator import generate_comprehensive_data
+
+
+def decoded(frame):
+    """Categorical columns as object, as plotly express needs them"""
+    return frame.astype({c: object for c in frame.columns if isinstance(frame[c].dtype, pd.CategoricalDtype)})
+
+
+def cases(df):
+    """(style, plotly builder, factory builder) for every figure style the pages use"""
+    by_disease = df.groupby("disease", observed=True)["prevalence"].sum()
+    by_brand = df.groupby("brand", observed=True)["price"].mean().sort_values(ascending=False).head(10)
+    trend = df.groupby("year")[["prevalence", "incidence"]].sum()
+    by_region = df.groupby("region", observed=True)["incidence"].sum()
+    stacked = decoded(df.groupby(["brand", "age_group"], observed=True)["revenue"].sum().reset_index())
+    by_type = decoded(df.groupby(["year", "public_private"], observed=True)["qty"].sum().reset_index())
+    points = decoded(df[["price", "price_elasticity", "price_class", "volume_units"]].sample(100, random_state=0))
+
+    def px_bar_category():
+        frame = decoded(by_disease.reset_index())
+        fig = px.bar(frame, x="disease", y="prevalence", title="Prevalence by Disease", color="disease")
+        return fig.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+
+    def px_bar_continuous():
+        frame = decoded(by_brand.reset_index())
+        fig = px.bar(frame, x="brand", y="price", title="Top 10 Brands by Price", color="price")
+        return fig.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+
+    def px_bar_color():
+        fig = px.bar(stacked, x="brand", y="revenue", color="age_group", title="Top Brands", barmode="stack")
+        return fig.update_layout(plot_bgcolor="white", height=350)
+
+    def px_line():
+        fig = px.line(trend.reset_index(), x="year", y="prevalence", title="Trend", markers=True)
+        return fig.update_layout(plot_bgcolor="white", height=350)
+
+    def px_line_color():
+        fig = px.line(by_type, x="year", y="qty", color="public_private", title="Procurement Trend", markers=True)
+        return fig.update_layout(plot_bgcolor="white", height=350)
+
+    def go_lines():
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=trend.index, y=trend["prevalence"], name="Prevalence", mode="lines+markers"))
+        fig.add_trace(go.Scatter(x=trend.index, y=trend["incidence"], name="Incidence", mode="lines+markers"))
+        return fig.update_layout(title="Prevalence & Incidence Trend", plot_bgcolor="white", height=350)
+
+    def go_pie():
+        fig = go.Figure(data=[go.Pie(labels=decoded(by_region.reset_index())["region"], values=by_region.to_numpy(),
+                                     hole=0.4, pull=[0.05] * len(by_region))])
+        return fig.update_layout(title="Incidence by Region", height=350)
+
+    def px_scatter():
+        fig = px.scatter(points, x="price", y="price_elasticity", color="price_class", title="Price vs Elasticity",
+                         size="volume_units")
+        return fig.update_layout(plot_bgcolor="white", height=350)
+
+    return [
+        ("bar by category", px_bar_category,
+         lambda: figures.bar_by_category(by_disease.index, by_disease, "disease", "prevalence", "Prevalence by Disease")),
+        ("bar continuous", px_bar_continuous,
+         lambda: figures.bar_continuous(by_brand.index, by_brand, "brand", "price", "Top 10 Brands by Price")),
+        ("bar by color", px_bar_color,
+         lambda: figures.bar_by_color(stacked, "brand", "revenue", "age_group", "Top Brands", barmode="stack")),
+        ("line", px_line,
+         lambda: figures.line(trend.index, trend["prevalence"], "year", "prevalence", "Trend")),
+        ("line by color", px_line_color,
+         lambda: figures.line_by_color(by_type, "year", "qty", "public_private", "Procurement Trend")),
+        ("lines", go_lines,
+         lambda: figures.lines(trend.index, [("Prevalence", trend["prevalence"]), ("Incidence", trend["incidence"])],
+                               "Prevalence & Incidence Trend")),
+        ("pie", go_pie,
+         lambda: figures.pie(by_region.index, by_region, "Incidence by Region", pull=[0.05] * len(by_region))),
+        ("scatter", px_scatter,
+         lambda: figures.scatter(points, "price", "price_elasticity", "price_class", "volume_units",
+                                 "Price vs Elasticity")),
+    ]
+
+
+def normalized(fig):
+    """Figure JSON with trace modes as sets: px joins line modes from a set, so its order varies by process"""
+    fig = json.loads(to_json_plotly(fig))
+    for trace in fig["data"]:
+        if "mode" in trace:
+            trace["mode"] = sorted(trace["mode"].split("+"))
+    return fig
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    df = schema.compact(generate_comprehensive_data())
+
+    print("=" * 60)
+    print("[BENCH] Figure factory vs plotly express / graph_objects")
+    print("=" * 60)
+    print(f"{'figure':18}{'plotly ms':>11}{'factory ms':>12}{'speedup':>9}{'same':>6}")
+    failed = False
+    for style, plotly_build, factory_build in cases(df):
+        same = normalized(plotly_build()) == normalized(factory_build())
+        failed = failed or not same
+        plotly_ms = best_of(plotly_build, args.repeat)
+        factory_ms = best_of(factory_build, args.repeat)
+        print(f"{style:18}{plotly_ms:>11.2f}{factory_ms:>12.3f}{plotly_ms / factory_ms:>8.0f}x{'OK' if same else 'DIFF':>6}")
+    print("[ERROR] Factory figures differ from plotly" if failed else "[OK] Factory figures match plotly")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
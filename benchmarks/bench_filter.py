@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: chained isin filtering vs the inverted bitmap index and
+lazy projected views (time and peak traced allocations per request)
+
+Usage: python benchmarks/bench_filter.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema
+from bitmap_index import BitmapIndex
+from filtered_view import filter_view
+from data_generator import generate_comprehensive_data
+
+# Empty to highly selective, using the fields the analysis pages filter on
+CORPUS = [
+    {},
+    {"year": [2025]},
+    {"market": ["HPV", "Influenza"], "region": ["Europe"]},
+    {"year": [2021, 2022, 2023], "income_type": ["High Income"], "gender": ["Female"]},
+    {"year": [2030], "market": ["HBV"], "region": ["APAC"], "country": ["India", "China"],
+     "brand": ["Engerix-B"], "price_class": ["Premium"]},
+    {"year": [2024], "market": ["Pneumococcal"], "region": ["Europe"], "income_type": ["High Income"],
+     "country": ["Germany"], "age_group": ["Elderly"], "gender": ["Male"], "brand": ["Prevnar 20"]},
+]
+
+
+def isin_chain(df, filters):
+    """The previous filter_dataframe: full copy, then one isin pass per field"""
+    filtered = df.copy()
+    for field, values in filters.items():
+        if values:
+            filtered = filtered[filtered[schema.resolve(field)].isin(values)]
+    return filtered
+
+
+def bitmap_filter(index, df, filters):
+    positions = index.select(filters)
+    return df.take(positions) if positions is not None else df.copy()
+
+
+# Columns update_pricing declares
+PRICING_COLUMNS = ["price", "price_elasticity", "brand", "market", "year", "price_class", "volume_units"]
+
+
+def projected_view(df, filters):
+    """filter_view plus materializing the declared projection, as a callback would"""
+    return filter_view(df, filters, PRICING_COLUMNS).frame()
+
+
+def peak_kb(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    df = schema.compact(generate_comprehensive_data())
+    start = time.perf_counter()
+    index = BitmapIndex(df)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print("=" * 60)
+    print(f"[BENCH] Filtering {len(df):,} rows | index built in {build_ms:.1f} ms "
+          f"({index.nbytes() / 1024 / 1024:.2f} MB)")
+    print("=" * 60)
+    print(f"{'fields':>6}{'rows':>10}{'isin (ms)':>12}{'bitmap (ms)':>13}{'view (ms)':>11}"
+          f"{'isin peak KB':>14}{'view peak KB':>14}")
+    for filters in CORPUS:
+        expected = isin_chain(df, filters)
+        actual = bitmap_filter(index, df, filters)
+        view = projected_view(df, filters)
+        assert np.array_equal(expected.index.to_numpy(), actual.index.to_numpy()), filters
+        assert np.array_equal(expected.index.to_numpy(), view.index.to_numpy()), filters
+        isin_ms = best_of(lambda: isin_chain(df, filters), args.repeat)
+        bitmap_ms = best_of(lambda: bitmap_filter(index, df, filters), args.repeat)
+        view_ms = best_of(lambda: projected_view(df, filters), args.repeat)
+        isin_kb = peak_kb(lambda: isin_chain(df, filters))
+        view_kb = peak_kb(lambda: projected_view(df, filters))
+        print(f"{len(filters):>6}{len(actual):>10,}{isin_ms:>12.2f}{bitmap_ms:>13.2f}{view_ms:>11.2f}"
+              f"{isin_kb:>14,.0f}{view_kb:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark: legacy row-by-row generator vs vectorized data_generator
+
+Also times chunked_generator at a replication factor with 1 and N worker
+processes and checks the written snapshots are byte-identical.
+
+Usage: python benchmarks/bench_generator.py [--repeat N] [--replication N] [--workers N]
+"""
+import argparse
+import filecmp
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chunked_generator
+import data_generator as dg
+
+
+def legacy_generate_comprehensive_data():
+    """Original nested-loop generator (list of dicts + pd.DataFrame), kept for comparison"""
+    np.random.seed(42)
+    data = []
+    record_id = 100000
+    for year in dg.YEARS:
+        for region in dg.REGIONS:
+            for country, income_type in dg.COUNTRY_INCOME_MAP[region].items():
+                for disease in dg.DISEASES:
+                    for brand in dg.BRAND_MAP[disease]:
+                        for age_group in dg.AGE_GROUPS:
+                            for gender in dg.GENDERS:
+                                prevalence = random.randint(10000, 500000) * (1 + (year - 2021) * 0.05)
+                                incidence = random.randint(20000, 800000) * (1 + (year - 2021) * 0.03)
+                                vaccination_rate = random.uniform(5, 95)
+                                price = random.uniform(2, 150)
+                                price_elasticity = random.uniform(5, 50)
+                                volume_units = random.randint(1000, 2000000)
+                                revenue = price * volume_units
+                                market_value_usd = revenue * random.uniform(0.8, 1.2)
+                                market_share_pct = random.uniform(1, 25)
+                                cagr = random.uniform(-2, 15)
+                                yoy_growth = random.uniform(-5, 20)
+                                qty = random.randint(100, 100000)
+                                roa = random.choice(dg.ROA_TYPES)
+                                fdf = random.choice(dg.FDF_TYPES)
+                                procurement = random.choice(dg.PROCUREMENT_TYPES)
+                                segment_by = random.choice(["male", "female", brand, age_group])
+                                data.append({
+                                    "record_id": record_id,
+                                    "year": year,
+                                    "region": region,
+                                    "country": country,
+                                    "income_type": income_type,
+                                    "disease": disease,
+                                    "market": disease,
+                                    "brand": brand,
+                                    "company": random.choice(dg.COMPANIES),
+                                    "age_group": age_group,
+                                    "gender": gender,
+                                    "segment": random.choice(dg.SEGMENTS),
+                                    "segment_by": segment_by,
+                                    "roa": roa,
+                                    "fdf": fdf,
+                                    "formulation": fdf,
+                                    "procurement": procurement,
+                                    "public_private": "Public" if procurement in dg.PUBLIC_PROCUREMENT else "Private",
+                                    "prevalence": int(prevalence),
+                                    "incidence": int(incidence),
+                                    "vaccination_rate": round(vaccination_rate, 2),
+                                    "coverage_rate": round(vaccination_rate * random.uniform(0.8, 1.1), 2),
+                                    "price": round(price, 2),
+                                    "price_elasticity": round(price_elasticity, 2),
+                                    "price_class": "Premium" if price > 50 else ("Standard" if price > 20 else "Budget"),
+                                    "volume_units": int(volume_units),
+                                    "qty": int(qty),
+                                    "revenue": round(revenue, 2),
+                                    "market_value_usd": round(market_value_usd, 2),
+                                    "value": round(market_value_usd, 2),
+                                    "market_share_pct": round(market_share_pct, 2),
+                                    "share": round(market_share_pct, 2),
+                                    "cagr": round(cagr, 2),
+                                    "yoy_growth": round(yoy_growth, 2),
+                                    "yoy": round(yoy_growth, 2),
+                                    "efficacy_pct": round(random.uniform(60, 98), 2),
+                                })
+                                record_id += 1
+    return pd.DataFrame(data)
+
+
+def measure(func, repeat):
+    """Return (best wall time in seconds, peak traced memory in MB, result)"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    # Peak memory is measured on a separate run so tracing overhead does not skew timings
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024, result
+
+
+def chunked_identical(replication, workers):
+    """Generate with 1 and with `workers` processes; return (seconds per run, rows, files identical)"""
+    root = tempfile.mkdtemp(prefix="bench-generator-")
+    try:
+        seconds = []
+        for n in (1, workers):
+            start = time.perf_counter()
+            manifest = chunked_generator.generate(os.path.join(root, str(n)), replication=replication, workers=n)
+            seconds.append(time.perf_counter() - start)
+        files = sorted(os.listdir(os.path.join(root, "1")))
+        _, mismatch, errors = filecmp.cmpfiles(os.path.join(root, "1"), os.path.join(root, str(workers)),
+                                               files, shallow=False)
+        return seconds, manifest["rows"], not mismatch and not errors
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--replication", type=int, default=4, help="chunked generator replication factor")
+    parser.add_argument("--workers", type=int, default=4, help="chunked generator worker processes")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("[BENCH] Data generator: legacy loops vs vectorized")
+    print("=" * 60)
+
+    legacy_time, legacy_peak, legacy_df = measure(legacy_generate_comprehensive_data, args.repeat)
+    new_time, new_peak, new_df = measure(dg.generate_comprehensive_data, args.repeat)
+
+    assert list(legacy_df.columns) == list(new_df.columns), "column layout differs"
+    assert len(legacy_df) == len(new_df), "row count differs"
+    assert new_df.equals(dg.generate_comprehensive_data()), "vectorized generator is not deterministic"
+
+    print(f"{'':12}{'time (s)':>12}{'peak (MB)':>12}")
+    print(f"{'legacy':12}{legacy_time:12.3f}{legacy_peak:12.1f}")
+    print(f"{'vectorized':12}{new_time:12.3f}{new_peak:12.1f}")
+    print(f"[OK] {len(new_df):,} rows | {legacy_time / new_time:.1f}x faster | "
+          f"{legacy_peak / new_peak:.1f}x less peak memory")
+
+    (serial, parallel), rows, identical = chunked_identical(args.replication, args.workers)
+    print(f"\nchunked x{args.replication}: {rows:,} rows | 1 worker {serial:.2f}s | "
+          f"{args.workers} workers {parallel:.2f}s")
+    if not identical:
+        print("[ERROR] Chunked output differs between worker counts")
+        return 1
+    print(f"[OK] Chunked output is byte-identical for 1 and {args.workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark the bincount aggregation kernel against pandas groupby for the
+groupings the dashboard uses, and check both give the same results
+
+Usage: python benchmarks/bench_kernel.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import group_kernel
+import schema
+from data_generator import generate_comprehensive_data
+
+GROUPINGS = [["region"], ["disease"], ["age_group"], ["gender"], ["year"],
+             ["brand", "age_group"], ["year", "public_private"], ["fdf", "roa"]]
+METRICS = ["revenue", "qty", "price"]
+REDUCERS = ("sum", "count", "min", "max")
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    df = schema.compact(generate_comprehensive_data())
+    wide = df.astype({m: np.float64 for m in METRICS if df[m].dtype.kind == "f"})
+
+    print("=" * 60)
+    print(f"[BENCH] bincount kernel vs pandas groupby over {len(df):,} rows")
+    print("=" * 60)
+    print(f"{'keys':24}{'groups':>8}{'pandas ms':>11}{'kernel ms':>11}{'speedup':>9}{'check':>7}")
+    failed = False
+    for keys in GROUPINGS:
+        grouped = lambda: wide.groupby(keys, observed=True)[METRICS].agg(list(REDUCERS))
+        columns = {f"{m}__{how}": (df[m], how) for m in METRICS for how in REDUCERS}
+        kernel = lambda: group_kernel.aggregate([df[k] for k in keys], columns, keys)
+        pandas_ms = best_of(grouped, args.repeat)
+        kernel_ms = best_of(kernel, args.repeat)
+        mismatches = group_kernel.verify(df, keys, METRICS, REDUCERS)
+        failed = failed or bool(mismatches)
+        print(f"{'+'.join(keys):24}{len(kernel()):>8}{pandas_ms:>11.2f}{kernel_ms:>11.2f}"
+              f"{pandas_ms / kernel_ms:>8.1f}x{'OK' if not mismatches else len(mismatches):>7}")
+    print("[ERROR] Kernel results differ from pandas" if failed else "[OK] Kernel results match pandas")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
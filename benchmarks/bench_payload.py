@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Measure the response bytes of every page callback per filter interaction:
+the full outputs sent at first render against the dash.Patch updates sent
+for later filter changes, through Dash's own /_dash-update-component route
+(background callbacks are polled until their job returns the outputs)
+
+The scatter pages must not grow with the data: at every scale the largest
+response of the callbacks in PAYLOAD_BUDGETS has to stay within its byte
+budget, or the run exits non-zero. --scales tiles the dataset N times.
+
+Usage: python benchmarks/bench_payload.py [--scales 1,10]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+import schema
+
+# Successive dropdown states of one interaction sequence (field -> values)
+INTERACTIONS = [
+    {"year": [2025]},
+    {"year": [2025, 2026], "region": ["Europe"]},
+    {"region": ["APAC", "Africa"]},
+    {},
+]
+
+# Largest response bytes of the density scatter pages at any dataset scale
+PAYLOAD_BUDGETS = {"update_cagr": 48_000, "update_pricing": 40_000}
+
+
+def filter_field(component_id):
+    """Filter field of a '<page>-<field>-filter' component id"""
+    fields = list(schema.DIMENSIONS) + ["year"] + list(schema.ALIASES)
+    for field in sorted(fields, key=len, reverse=True):
+        if component_id.endswith(f"-{field}-filter"):
+            return field
+    return component_id
+
+
+def request_body(output_key, callback, values, changed):
+    return {
+        "output": output_key,
+        "outputs": [{"id": k.split(".")[0], "property": k.split(".")[1]} for k in output_key.strip(".").split("...")],
+        "inputs": [{"id": i["id"], "property": i["property"], "value": values.get(filter_field(i["id"]))}
+                   for i in callback["inputs"]],
+        "changedPropIds": changed,
+        "state": [],
+    }
+
+
+def respond(client, body):
+    """Final response of one callback request, polling a background callback's job"""
+    response = client.post("/_dash-update-component", json=body)
+    stub = response.get_json() if response.status_code == 200 else None
+    if not stub or "cacheKey" not in stub:
+        return response
+    url = f"/_dash-update-component?cacheKey={stub['cacheKey']}&job={stub['job']}"
+    while True:
+        response = client.post(url, json=body)
+        if response.status_code != 200 or "response" in response.get_json():
+            return response
+        time.sleep(0.02)
+
+
+def measure(client):
+    """{callback: (average full bytes, average patch bytes, largest response bytes)}"""
+    sizes = {}
+    for output_key, callback in sorted(app.app.callback_map.items(), key=lambda item: item[1]["callback"].__name__):
+        name = callback["callback"].__name__
+        if not name.startswith("update_"):
+            continue
+        full, patched = [], []
+        for values in INTERACTIONS:
+            first = respond(client, request_body(output_key, callback, values, []))
+            full.append(len(first.data))
+            changed = [f"{callback['inputs'][0]['id']}.value"]
+            update = respond(client, request_body(output_key, callback, values, changed))
+            assert update.status_code == 200 and "__dash_patch_update" in update.get_data(as_text=True), name
+            patched.append(len(update.data))
+        sizes[name] = (sum(full) / len(full), sum(patched) / len(patched), max(full + patched))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="1", help="comma-separated dataset scale factors")
+    args = parser.parse_args()
+    # Imported here: bench_callbacks imports filter_field from this module
+    from bench_callbacks import scaled
+
+    base = app.get_data()
+    client = app.server.test_client()
+    over = []
+    for scale in [int(s) for s in args.scales.split(",")]:
+        df = scaled(base, scale) if scale > 1 else base
+        app.swap_data(df)
+        print("=" * 60)
+        print(f"[BENCH] Page callback response bytes on {len(df):,} rows: first render vs patched updates")
+        print("=" * 60)
+        print(f"{'callback':28}{'full bytes':>12}{'patch bytes':>13}{'saved':>8}")
+        for name, (avg_full, avg_patch, largest) in measure(client).items():
+            print(f"{name:28}{avg_full:>12,.0f}{avg_patch:>13,.0f}{1 - avg_patch / avg_full:>8.0%}")
+            if largest > PAYLOAD_BUDGETS.get(name, float("inf")):
+                over.append((name, scale, largest))
+    app.swap_data(base)
+
+    for name, scale, largest in over:
+        print(f"[ERROR] {name} sent {largest:,} bytes at scale {scale}, over its {PAYLOAD_BUDGETS[name]:,}-byte budget")
+    if over:
+        return 1
+    print(f"[OK] {', '.join(PAYLOAD_BUDGETS)} within their byte budgets at scales {args.scales}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Memory report: generated frame vs compact schema (categoricals, downcasting, virtual aliases)
+
+Usage: python benchmarks/bench_schema.py
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import schema
+from data_generator import generate_comprehensive_data
+
+
+def main():
+    raw = generate_comprehensive_data()
+    compacted = schema.compact(raw)
+    report = schema.memory_report(raw, compacted)
+
+    print("=" * 60)
+    print("[BENCH] Per-column memory, generated vs compact schema")
+    print("=" * 60)
+    with pd.option_context("display.width", 120, "display.max_rows", None):
+        print(report.to_string(index=False))
+    total = report.iloc[-1]
+    print(f"[OK] {total['bytes_before'] / 1024 / 1024:.1f} MB -> "
+          f"{total['bytes_after'] / 1024 / 1024:.1f} MB ({total['ratio']:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
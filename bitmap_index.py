@@ -0,0 +1,137 @@
+"""
+Inverted bitmap index over the dimension columns of the dataset.
+
+For every dimension value the index keeps a packed row bitmap (NumPy
+uint64 words, bit i = row i). A filter ORs the bitmaps of the selected
+values within a field, ANDs the result across fields and converts the
+final bitmap to row positions once, instead of running isin over the
+whole frame for every field.
+"""
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+import schema
+
+WORD_BITS = 64
+
+
+def pack_mask(mask):
+    """Pack a boolean row mask into little-endian uint64 words"""
+    packed = np.packbits(mask, bitorder="little")
+    pad = (-packed.size) % 8
+    if pad:
+        packed = np.concatenate([packed, np.zeros(pad, dtype=np.uint8)])
+    return packed.view(np.uint64)
+
+
+def unpack_words(words, n_rows):
+    """Inverse of pack_mask: boolean mask of length n_rows"""
+    return np.unpackbits(words.view(np.uint8), count=n_rows, bitorder="little").view(bool)
+
+
+def popcount(words):
+    """Number of set bits in a packed bitmap"""
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class BitmapIndex:
+    """Per-dimension value -> packed row bitmap index for one dataset version"""
+
+    def __init__(self, df, fields=None):
+        self.n_rows = len(df)
+        self.n_words = -(-self.n_rows // WORD_BITS)
+        self.version = df.attrs.get("dataset_version")
+        if fields is None:
+            fields = [c for c in df.columns
+                      if isinstance(df[c].dtype, pd.CategoricalDtype) or c == "year"]
+        self._values = {}
+        self._bitmaps = {}
+        self._observed = {}
+        for field in fields:
+            self._add_field(field, df[field])
+
+    def _add_field(self, field, series):
+        """Build the (n_values, n_words) bitmap matrix for one column"""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            values = list(series.cat.categories)
+            codes = series.cat.codes.to_numpy()
+        else:
+            codes, uniques = pd.factorize(series, sort=True)
+            values = list(uniques)
+        matrix = np.zeros((len(values), self.n_words), dtype=np.uint64)
+        for code in range(len(values)):
+            matrix[code] = pack_mask(codes == code)
+        self._values[field] = {value: code for code, value in enumerate(values)}
+        self._bitmaps[field] = matrix
+        self._observed[field] = sorted(v for v, row in zip(values, matrix.any(axis=1)) if row)
+
+    def values(self, field):
+        """Sorted values of a field that occur in the data (its dimension dictionary)"""
+        return self._observed[schema.resolve(field)]
+
+    def covers(self, field):
+        return schema.resolve(field) in self._bitmaps
+
+    def field_bitmap(self, field, values):
+        """OR of the bitmaps of the selected values of one field (unknown values match nothing)"""
+        field = schema.resolve(field)
+        lookup = self._values[field]
+        codes = [lookup[v] for v in values if v in lookup]
+        if not codes:
+            return np.zeros(self.n_words, dtype=np.uint64)
+        return np.bitwise_or.reduce(self._bitmaps[field][codes], axis=0)
+
+    def select_words(self, filters):
+        """AND of the per-field bitmaps for all non-empty filters, or None when nothing is filtered"""
+        words = None
+        for field, values in filters.items():
+            if not values:
+                continue
+            bitmap = self.field_bitmap(field, values)
+            words = bitmap if words is None else np.bitwise_and(words, bitmap, out=words)
+        return words
+
+    def select(self, filters):
+        """Row positions matching all filters, or None when nothing is filtered"""
+        words = self.select_words(filters)
+        if words is None:
+            return None
+        return np.flatnonzero(unpack_words(words, self.n_rows))
+
+    def nbytes(self):
+        return sum(m.nbytes for m in self._bitmaps.values())
+
+
+# Indexes are kept per dataset version (the dataset and each cube have their own)
+MAX_INDEXES = 16
+
+_index_lock = Lock()
+_index_cache = OrderedDict()
+
+
+def index_for(df):
+    """Return the BitmapIndex for df, building it once per dataset version"""
+    version = df.attrs.get("dataset_version")
+    index = _index_cache.get(version)
+    if index is not None and index.n_rows == len(df):
+        return index
+    with _index_lock:
+        index = _index_cache.get(version)
+        if index is None or index.n_rows != len(df):
+            index = BitmapIndex(df)
+            _index_cache[version] = index
+            while len(_index_cache) > MAX_INDEXES:
+                _index_cache.popitem(last=False)
+        else:
+            _index_cache.move_to_end(version)
+        return index
+
+
+def drop_versions(stale):
+    """Drop the indexes of dataset versions for which stale(version) is true"""
+    with _index_lock:
+        for version in [v for v in _index_cache if stale(v)]:
+            del _index_cache[version]
@@ -1,8 +1,19 @@
-from dash import Input, Output
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
-import numpy as np
+import functools
+
+from dash import Input, Output, callback_context
+from dash.exceptions import MissingCallbackContextException
+import aggregation
+import approx
+import background
+import clientside
+import cube
+import density
+import figures
+import filtered_view
+import hot_reload
+import metrics
+import query_backend
+import result_cache
 
 def format_number(num):
     """Format numbers with K, M, B suffixes"""
@@ -15,24 +26,231 @@ def format_number(num):
     else:
         return f"{num:.0f}"
 
-def filter_dataframe(df, filters):
-    """Apply filters to dataframe"""
-    filtered = df.copy()
-    for field, values in filters.items():
-        if values:
-            filtered = filtered[filtered[field].isin(values)]
-    return filtered
+def filter_dataframe(df, filters, columns=None):
+    """Apply filters to dataframe (filter fields may be alias names such as 'market').
+
+    Returns a lazy FilteredView: rows are selected with one combined mask and
+    only the declared columns are materialized (all columns when None).
+    """
+    with metrics.phase("filter"):
+        return filtered_view.filter_view(df, filters, columns)
+
+# Dimensions each page filters/groups on and the metrics it aggregates.
+# Pages whose cube compresses the data are answered from pre-aggregated cells.
+PAGE_SPECS = {
+    "epidemiology": {"dims": ["year", "disease", "region", "income_type", "country"],
+                     "metrics": ["prevalence", "incidence"]},
+    "vaccination_rate": {"dims": ["year", "disease", "region", "income_type", "country"],
+                         "metrics": ["vaccination_rate", "coverage_rate"]},
+    "pricing": {"dims": ["year", "market", "region", "income_type", "country", "brand", "price_class"],
+                "metrics": ["price", "price_elasticity"]},
+    "cagr": {"dims": ["year", "market", "region", "income_type", "country", "segment", "gender"],
+             "metrics": ["cagr"]},
+    "msa": {"dims": ["year", "market", "region", "income_type", "country", "segment", "gender", "brand"],
+            "metrics": ["value", "volume_units", "share", "yoy"]},
+    "procurement": {"dims": ["year", "market", "region", "income_type", "country", "public_private",
+                             "brand", "procurement"],
+                    "metrics": ["qty"]},
+    "brand_demographic": {"dims": ["year", "market", "region", "income_type", "country", "age_group",
+                                   "gender", "brand"],
+                          "metrics": ["revenue"]},
+    "fdf": {"dims": ["year", "market", "region", "income_type", "country", "brand", "fdf", "roa"],
+            "metrics": ["revenue"]},
+}
+
+# Named (group keys, metric, reducer) queries behind each page's KPIs and charts.
+# A plan scans the selection once per base grouping and rolls the coarser
+# queries (and totals) up from it, see aggregation.AggregationPlan.
+PAGE_PLANS = {
+    "epidemiology": aggregation.AggregationPlan({
+        "prevalence": ((), "prevalence", "sum"),
+        "incidence": ((), "incidence", "sum"),
+        "avg_incidence": ((), "incidence", "mean"),
+        "prev_by_disease": ("disease", "prevalence", "sum"),
+        "inc_by_region": ("region", "incidence", "sum"),
+        "trend": ("year", ["prevalence", "incidence"], "sum"),
+    }),
+    "vaccination_rate": aggregation.AggregationPlan({
+        "vaccination_rate": ((), "vaccination_rate", "mean"),
+        "coverage_rate": ((), "coverage_rate", "mean"),
+        "rows_by_country": ("country", None, "size"),
+        "vax_by_region": ("region", "vaccination_rate", "mean"),
+        "vax_by_disease": ("disease", "vaccination_rate", "mean"),
+        "trend": ("year", "vaccination_rate", "mean"),
+    }),
+    "pricing": aggregation.AggregationPlan({
+        "price": ((), "price", "mean"),
+        "elasticity": ((), "price_elasticity", "mean"),
+        "min_price": ((), "price", "min"),
+        "max_price": ((), "price", "max"),
+        "price_by_brand": ("brand", "price", "mean"),
+        "trend": ("year", "price", "mean"),
+    }),
+    "cagr": aggregation.AggregationPlan({
+        "cagr": ((), "cagr", "mean"),
+        "max_cagr": ((), "cagr", "max"),
+        "min_cagr": ((), "cagr", "min"),
+        "cagr_by_segment": ("segment", "cagr", "mean"),
+        "cagr_by_region": ("region", "cagr", "mean"),
+    }),
+    "msa": aggregation.AggregationPlan({
+        "value": ((), "value", "sum"),
+        "volume": ((), "volume_units", "sum"),
+        "share": ((), "share", "mean"),
+        "yoy": ((), "yoy", "mean"),
+        "value_by_market": ("market", "value", "sum"),
+        "share_by_brand": ("brand", "share", "mean"),
+        "trend": ("year", "yoy", "mean"),
+    }),
+    "procurement": aggregation.AggregationPlan({
+        "qty": ((), "qty", "sum"),
+        "rows": ((), None, "size"),
+        "rows_by_type": ("public_private", None, "size"),
+        "qty_by_proc": ("procurement", "qty", "sum"),
+        "qty_by_type": ("public_private", "qty", "sum"),
+        "trend": (["year", "public_private"], "qty", "sum"),
+    }),
+    "brand_demographic": aggregation.AggregationPlan({
+        "revenue": ((), "revenue", "sum"),
+        "rev_by_brand": ("brand", "revenue", "sum"),
+        "rev_by_age": ("age_group", "revenue", "sum"),
+        "rev_by_gender": ("gender", "revenue", "sum"),
+        "brand_perf": (["brand", "age_group"], "revenue", "sum"),
+    }),
+    "fdf": aggregation.AggregationPlan({
+        "revenue": ((), "revenue", "sum"),
+        "rev_by_fdf": ("fdf", "revenue", "sum"),
+        "rev_by_roa": ("roa", "revenue", "sum"),
+        "matrix": (["fdf", "roa"], "revenue", "sum"),
+    }),
+}
+
+# Filter + group + aggregate engine behind every page callback (QUERY_BACKEND)
+BACKEND = query_backend.backend_for(query_backend.QUERY_BACKEND)
+
+# Shared LRU cache for the page callback outputs (see result_cache.stats())
+RESULT_CACHE = result_cache.ResultCache()
+
+def first_render():
+    """True on a callback's initial call for a freshly rendered page (and outside Dash)"""
+    try:
+        return callback_context.triggered_id is None
+    except MissingCallbackContextException:
+        return True
+
+def send_patches(func):
+    """Send figure outputs as dash.Patch updates once the page has rendered them in full"""
+    @functools.wraps(func)
+    def wrapper(*args):
+        outputs = func(*args)
+        return outputs if first_render() else figures.patch_outputs(outputs)
+    return wrapper
+
+def cube_metrics(dims):
+    """Metrics of every page with these dimensions, so those pages share one cube"""
+    metrics = [m for spec in PAGE_SPECS.values() if spec["dims"] == dims for m in spec["metrics"]]
+    return list(dict.fromkeys(metrics))
+
+def select_page(df, page, filters):
+    """Selection for a page from the query backend (pandas: cube cells when the page has a cube),
+    or the weighted sample rows when the callback runs on an approximate-mode sample"""
+    spec = PAGE_SPECS[page]
+    with metrics.phase("filter"):
+        if approx.is_sample(df):
+            selection = approx.select(df, filters, spec["dims"], cube_metrics(spec["dims"]))
+            metrics.record_rows(len(df), len(selection), "sample")
+            return selection
+        return BACKEND.select(df, filters, spec["dims"], cube_metrics(spec["dims"]))
 
-def register_all_callbacks(app, get_data_func):
+def scatter_figure(df, filters, x, y, color, size, title):
+    """Scatter chart of the selected rows: density-binned, or a stratified sample (SCATTER_MODE)"""
+    if density.SCATTER_MODE == "sample":
+        with metrics.phase("filter"):
+            points = BACKEND.stratified_sample(df, filters, [x, y, color, size], color,
+                                               density.SCATTER_SAMPLE_ROWS)
+        return figures.scatter(points, x, y, color, size, title)
+    with metrics.phase("aggregate"):
+        grid = density.fit(BACKEND.density(df, filters, x, y, color, size, density.SCATTER_BINS))
+    return figures.density(grid, x, y, color, size, title, density.SCATTER_MODE)
+
+def build_cubes(df):
+    """Build the cube of every page for this dataset version (skipped cubes are remembered too)"""
+    for spec in PAGE_SPECS.values():
+        cube.cube_for(df, spec["dims"], cube_metrics(spec["dims"]))
+
+# Client-side store payloads per (dataset version, page)
+_CLIENT_STORES = {}
+
+def client_store(df, page):
+    """Column-encoded cube cells a page's clientside callback answers from; None when it cannot"""
+    key = (df.attrs.get("dataset_version"), page)
+    if key not in _CLIENT_STORES:
+        spec = PAGE_SPECS[page]
+        page_cube = None if df.empty else cube.cube_for(df, spec["dims"], cube_metrics(spec["dims"]))
+        data = None
+        if page_cube is not None and len(page_cube.cells) <= clientside.MAX_CELLS:
+            columns = [aggregation.ROWS] + [aggregation.partial_column(m, how)
+                                            for _, needs in PAGE_PLANS[page].passes()
+                                            for m, partials in needs.items() for how in partials]
+            data = clientside.encode(page_cube.cells, spec["dims"], list(dict.fromkeys(columns)))
+        _CLIENT_STORES[key] = data
+    return _CLIENT_STORES[key]
+
+def drop_client_stores(stale):
+    """Drop the store payloads of dataset versions for which stale(version) is true"""
+    for key in [k for k in _CLIENT_STORES if stale(k[0])]:
+        _CLIENT_STORES.pop(key, None)
+
+def client_stores(prefix, page, df):
+    """Store components of a page in client-side mode (none otherwise)"""
+    if not clientside.handles(page):
+        return []
+    return clientside.stores(prefix, client_store(df, page))
+
+# Memoized page callbacks and their input counts, for warm_results
+_PAGE_CALLBACKS = {}
+
+def warm_results(df):
+    """Compute every page's default (unfiltered) outputs for df into the result cache"""
+    with hot_reload.use(df):
+        for func, n_inputs in _PAGE_CALLBACKS.values():
+            func(*[None] * n_inputs)
+
+def register_all_callbacks(app, get_live_data):
     """
     Register all callbacks for the dashboard.
     Args:
         app: Dash app instance
-        get_data_func: Function that returns the dataframe (lazy loading)
+        get_live_data: Function that returns the live dataframe (lazy loading)
     """
+    def get_data_func():
+        # The dataset the running callback pinned, so a reload never swaps it mid-callback
+        return hot_reload.current(get_live_data)
+
+    def dataset_version():
+        return get_data_func().attrs.get("dataset_version")
+
+    # Page callbacks are memoized on their canonical inputs and the dataset version;
+    # the cache holds full figures, send_patches trims them after the first render
+    cached = result_cache.memoize(RESULT_CACHE, dataset_version)
+
+    def page_callback(page, outputs, inputs):
+        """Register a page callback on its filter dropdowns (approximate first on large datasets,
+        as a background job when enabled), or behind its client-side store"""
+        def register(func):
+            _PAGE_CALLBACKS[page] = (func, len(inputs))
+            timed = metrics.instrument(hot_reload.pin(get_live_data)(func))
+            if clientside.handles(page):
+                return clientside.register(app, page, outputs, inputs, timed)
+            options = functools.partial(background.options, page, func.__name__, outputs, dataset_version)
+            if approx.APPROX_MODE:
+                return approx.register(app, outputs, inputs, send_patches(timed), get_live_data,
+                                       PAGE_SPECS[page]["metrics"], options)
+            return app.callback(outputs, inputs, **options())(send_patches(timed))
+        return register
     
     # 1. EPIDEMIOLOGY CALLBACKS
-    @app.callback(
+    @page_callback("epidemiology",
         [Output("epi-kpi-1", "children"),
          Output("epi-kpi-2", "children"),
          Output("epi-kpi-3", "children"),
@@ -46,6 +264,7 @@ def register_all_callbacks(app, get_data_func):
          Input("epi-income_type-filter", "value"),
          Input("epi-country-filter", "value")]
     )
+    @cached
     def update_epidemiology(years, diseases, regions, incomes, countries):
         try:
             df = get_data_func()  # Get data on demand
@@ -55,35 +274,32 @@ def register_all_callbacks(app, get_data_func):
                 return "No data", "No data", "No data", "No data", {}, {}, {}
             
             filters = {"year": years, "disease": diseases, "region": regions, "income_type": incomes, "country": countries}
-            filtered = filter_dataframe(df, filters)
+            sel = select_page(df, "epidemiology", filters)
             
             # Check if filtered data is empty
-            if filtered.empty:
+            if sel.empty:
                 return "0", "0", "N/A", "0", {}, {}, {}
             
-            total_prev = format_number(filtered["prevalence"].sum())
-            total_inc = format_number(filtered["incidence"].sum())
-            top_disease = filtered.groupby("disease")["prevalence"].sum().idxmax() if len(filtered) > 0 else "N/A"
-            avg_inc_rate = format_number(filtered["incidence"].mean())
+            res = PAGE_PLANS["epidemiology"].execute(sel)
+            total_prev = format_number(res["prevalence"])
+            total_inc = format_number(res["incidence"])
+            top_disease = res["prev_by_disease"].idxmax() if not sel.empty else "N/A"
+            avg_inc_rate = format_number(res["avg_incidence"])
             
             # Chart 1: Prevalence by Disease
-            prev_by_disease = filtered.groupby("disease")["prevalence"].sum().reset_index()
-            fig1 = px.bar(prev_by_disease, x="disease", y="prevalence", title="Prevalence by Disease",
-                          color="disease")
-            fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+            prev_by_disease = res["prev_by_disease"]
+            fig1 = figures.bar_by_category(prev_by_disease.index, prev_by_disease, "disease", "prevalence",
+                                           "Prevalence by Disease")
             
             # Chart 2: Incidence by Region
-            inc_by_region = filtered.groupby("region")["incidence"].sum().reset_index()
-            fig2 = go.Figure(data=[go.Pie(labels=inc_by_region["region"], values=inc_by_region["incidence"],
-                                           hole=0.4, pull=[0.05]*len(inc_by_region))])
-            fig2.update_layout(title="Incidence Distribution by Region", height=350)
+            inc_by_region = res["inc_by_region"]
+            fig2 = figures.pie(inc_by_region.index, inc_by_region, "Incidence Distribution by Region",
+                               pull=[0.05]*len(inc_by_region))
             
             # Chart 3: Trend over years
-            trend = filtered.groupby("year")[["prevalence", "incidence"]].sum().reset_index()
-            fig3 = go.Figure()
-            fig3.add_trace(go.Scatter(x=trend["year"], y=trend["prevalence"], name="Prevalence", mode='lines+markers'))
-            fig3.add_trace(go.Scatter(x=trend["year"], y=trend["incidence"], name="Incidence", mode='lines+markers'))
-            fig3.update_layout(title="Prevalence & Incidence Trend", plot_bgcolor="white", height=350)
+            trend = res["trend"]
+            fig3 = figures.lines(trend.index, [("Prevalence", trend["prevalence"]), ("Incidence", trend["incidence"])],
+                                 "Prevalence & Incidence Trend")
             
             return total_prev, total_inc, top_disease, avg_inc_rate, fig1, fig2, fig3
         
@@ -92,7 +308,7 @@ def register_all_callbacks(app, get_data_func):
             return "Error", "Error", "Error", "Error", {}, {}, {}
     
     # 2. VACCINATION RATE CALLBACKS
-    @app.callback(
+    @page_callback("vaccination_rate",
         [Output("vax-kpi-1", "children"),
          Output("vax-kpi-2", "children"),
          Output("vax-kpi-3", "children"),
@@ -106,37 +322,35 @@ def register_all_callbacks(app, get_data_func):
          Input("vax-income_type-filter", "value"),
          Input("vax-country-filter", "value")]
     )
+    @cached
     def update_vaccination_rate(years, diseases, regions, incomes, countries):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "disease": diseases, "region": regions, "income_type": incomes, "country": countries}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "vaccination_rate", filters)
         
-        avg_vax_rate = f"{filtered['vaccination_rate'].mean():.1f}%"
-        avg_cov_rate = f"{filtered['coverage_rate'].mean():.1f}%"
-        top_region = filtered.groupby("region")["vaccination_rate"].mean().idxmax() if len(filtered) > 0 else "N/A"
-        num_countries = filtered["country"].nunique()
+        res = PAGE_PLANS["vaccination_rate"].execute(sel)
+        avg_vax_rate = f"{res['vaccination_rate']:.1f}%"
+        avg_cov_rate = f"{res['coverage_rate']:.1f}%"
+        top_region = res["vax_by_region"].idxmax() if not sel.empty else "N/A"
+        num_countries = len(res["rows_by_country"])
         
         # Chart 1: Vaccination Rate by Region
-        vax_by_region = filtered.groupby("region")["vaccination_rate"].mean().reset_index()
-        fig1 = px.bar(vax_by_region, x="region", y="vaccination_rate", title="Avg Vaccination Rate by Region",
-                      color="region")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        vax_by_region = res["vax_by_region"]
+        fig1 = figures.bar_by_category(vax_by_region.index, vax_by_region, "region", "vaccination_rate",
+                                       "Avg Vaccination Rate by Region")
         
         # Chart 2: Distribution by Disease
-        vax_by_disease = filtered.groupby("disease")["vaccination_rate"].mean().reset_index()
-        fig2 = go.Figure(data=[go.Pie(labels=vax_by_disease["disease"], values=vax_by_disease["vaccination_rate"],
-                                       hole=0.4)])
-        fig2.update_layout(title="Vaccination Rate by Disease", height=350)
+        vax_by_disease = res["vax_by_disease"]
+        fig2 = figures.pie(vax_by_disease.index, vax_by_disease, "Vaccination Rate by Disease")
         
         # Chart 3: Trend
-        trend = filtered.groupby("year")["vaccination_rate"].mean().reset_index()
-        fig3 = px.line(trend, x="year", y="vaccination_rate", title="Vaccination Rate Trend", markers=True)
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        trend = res["trend"]
+        fig3 = figures.line(trend.index, trend, "year", "vaccination_rate", "Vaccination Rate Trend")
         
         return avg_vax_rate, avg_cov_rate, top_region, num_countries, fig1, fig2, fig3
     
     # 3. PRICING ANALYSIS CALLBACKS
-    @app.callback(
+    @page_callback("pricing",
         [Output("price-kpi-1", "children"),
          Output("price-kpi-2", "children"),
          Output("price-kpi-3", "children"),
@@ -152,37 +366,35 @@ def register_all_callbacks(app, get_data_func):
          Input("price-brand-filter", "value"),
          Input("price-price_class-filter", "value")]
     )
+    @cached
     def update_pricing(years, markets, regions, incomes, countries, brands, price_classes):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "brand": brands, "price_class": price_classes}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "pricing", filters)
         
-        avg_price = f"${filtered['price'].mean():.2f}"
-        avg_elasticity = f"{filtered['price_elasticity'].mean():.1f}"
-        top_brand = filtered.groupby("brand")["price"].mean().idxmax() if len(filtered) > 0 else "N/A"
-        price_range = f"${filtered['price'].min():.0f} - ${filtered['price'].max():.0f}"
+        res = PAGE_PLANS["pricing"].execute(sel)
+        avg_price = f"${res['price']:.2f}"
+        avg_elasticity = f"{res['elasticity']:.1f}"
+        top_brand = res["price_by_brand"].idxmax() if not sel.empty else "N/A"
+        price_range = f"${res['min_price']:.0f} - ${res['max_price']:.0f}"
         
         # Chart 1: Price by Brand
-        price_by_brand = filtered.groupby("brand")["price"].mean().reset_index().sort_values("price", ascending=False).head(10)
-        fig1 = px.bar(price_by_brand, x="brand", y="price", title="Top 10 Brands by Price", color="price")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        price_by_brand = res["price_by_brand"].sort_values(ascending=False).head(10)
+        fig1 = figures.bar_continuous(price_by_brand.index, price_by_brand, "brand", "price", "Top 10 Brands by Price")
         
         # Chart 2: Price Elasticity
-        elasticity_data = filtered.groupby("market")["price_elasticity"].mean().reset_index()
-        fig2 = px.scatter(filtered.sample(min(100, len(filtered))), x="price", y="price_elasticity", 
-                          color="price_class", title="Price vs Elasticity", size="volume_units")
-        fig2.update_layout(plot_bgcolor="white", height=350)
+        fig2 = scatter_figure(df, filters, "price", "price_elasticity", "price_class", "volume_units",
+                              "Price vs Elasticity")
         
         # Chart 3: Price Trend
-        trend = filtered.groupby("year")["price"].mean().reset_index()
-        fig3 = px.line(trend, x="year", y="price", title="Average Price Trend", markers=True)
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        trend = res["trend"]
+        fig3 = figures.line(trend.index, trend, "year", "price", "Average Price Trend")
         
         return avg_price, avg_elasticity, top_brand, price_range, fig1, fig2, fig3
     
     # 4. CAGR ANALYSIS CALLBACKS
-    @app.callback(
+    @page_callback("cagr",
         [Output("cagr-kpi-1", "children"),
          Output("cagr-kpi-2", "children"),
          Output("cagr-kpi-3", "children"),
@@ -198,37 +410,34 @@ def register_all_callbacks(app, get_data_func):
          Input("cagr-segment-filter", "value"),
          Input("cagr-gender-filter", "value")]
     )
+    @cached
     def update_cagr(years, markets, regions, incomes, countries, segments, genders):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "segment": segments, "gender": genders}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "cagr", filters)
         
-        avg_cagr = f"{filtered['cagr'].mean():.2f}%"
-        top_segment = filtered.groupby("segment")["cagr"].mean().idxmax() if len(filtered) > 0 else "N/A"
-        max_cagr = f"{filtered['cagr'].max():.2f}%"
-        min_cagr = f"{filtered['cagr'].min():.2f}%"
+        res = PAGE_PLANS["cagr"].execute(sel)
+        avg_cagr = f"{res['cagr']:.2f}%"
+        top_segment = res["cagr_by_segment"].idxmax() if not sel.empty else "N/A"
+        max_cagr = f"{res['max_cagr']:.2f}%"
+        min_cagr = f"{res['min_cagr']:.2f}%"
         
         # Chart 1: CAGR by Segment
-        cagr_by_segment = filtered.groupby("segment")["cagr"].mean().reset_index()
-        fig1 = px.bar(cagr_by_segment, x="segment", y="cagr", title="CAGR by Segment", color="cagr")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        cagr_by_segment = res["cagr_by_segment"]
+        fig1 = figures.bar_continuous(cagr_by_segment.index, cagr_by_segment, "segment", "cagr", "CAGR by Segment")
         
         # Chart 2: CAGR by Region
-        cagr_by_region = filtered.groupby("region")["cagr"].mean().reset_index()
-        fig2 = go.Figure(data=[go.Pie(labels=cagr_by_region["region"], values=cagr_by_region["cagr"], hole=0.4)])
-        fig2.update_layout(title="CAGR Distribution by Region", height=350)
+        cagr_by_region = res["cagr_by_region"]
+        fig2 = figures.pie(cagr_by_region.index, cagr_by_region, "CAGR Distribution by Region")
         
         # Chart 3: CAGR vs Volume
-        sample_data = filtered.sample(min(100, len(filtered)))
-        fig3 = px.scatter(sample_data, x="volume_units", y="cagr", color="market", 
-                          title="CAGR vs Volume", size="market_value_usd")
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        fig3 = scatter_figure(df, filters, "volume_units", "cagr", "market", "market_value_usd", "CAGR vs Volume")
         
         return avg_cagr, top_segment, max_cagr, min_cagr, fig1, fig2, fig3
     
     # 5. MSA COMPARISON CALLBACKS
-    @app.callback(
+    @page_callback("msa",
         [Output("msa-kpi-1", "children"),
          Output("msa-kpi-2", "children"),
          Output("msa-kpi-3", "children"),
@@ -244,37 +453,36 @@ def register_all_callbacks(app, get_data_func):
          Input("msa-segment-filter", "value"),
          Input("msa-gender-filter", "value")]
     )
+    @cached
     def update_msa(years, markets, regions, incomes, countries, segments, genders):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "segment": segments, "gender": genders}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "msa", filters)
         
-        total_value = format_number(filtered["value"].sum())
-        total_volume = format_number(filtered["volume_units"].sum())
-        avg_share = f"{filtered['share'].mean():.1f}%"
-        avg_yoy = f"{filtered['yoy'].mean():.1f}%"
+        res = PAGE_PLANS["msa"].execute(sel)
+        total_value = format_number(res["value"])
+        total_volume = format_number(res["volume"])
+        avg_share = f"{res['share']:.1f}%"
+        avg_yoy = f"{res['yoy']:.1f}%"
         
         # Chart 1: Value by Market
-        value_by_market = filtered.groupby("market")["value"].sum().reset_index().sort_values("value", ascending=False).head(10)
-        fig1 = px.bar(value_by_market, x="market", y="value", title="Top Markets by Value", color="value")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        value_by_market = res["value_by_market"].sort_values(ascending=False).head(10)
+        fig1 = figures.bar_continuous(value_by_market.index, value_by_market, "market", "value", "Top Markets by Value")
         
         # Chart 2: Market Share
-        share_data = filtered.groupby("brand")["share"].mean().reset_index().sort_values("share", ascending=False).head(8)
-        fig2 = go.Figure(data=[go.Pie(labels=share_data["brand"], values=share_data["share"], hole=0.4,
-                                       pull=[0.06 if i == 0 else 0.01 for i in range(len(share_data))])])
-        fig2.update_layout(title="Market Share by Brand", height=350, clickmode='event+select')
+        share_data = res["share_by_brand"].sort_values(ascending=False).head(8)
+        fig2 = figures.pie(share_data.index, share_data, "Market Share by Brand",
+                           pull=[0.06 if i == 0 else 0.01 for i in range(len(share_data))], clickmode='event+select')
         
         # Chart 3: YoY Growth Trend
-        trend = filtered.groupby("year")["yoy"].mean().reset_index()
-        fig3 = px.line(trend, x="year", y="yoy", title="YoY Growth Trend", markers=True)
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        trend = res["trend"]
+        fig3 = figures.line(trend.index, trend, "year", "yoy", "YoY Growth Trend")
         
         return total_value, total_volume, avg_share, avg_yoy, fig1, fig2, fig3
     
     # 6. PROCUREMENT ANALYSIS CALLBACKS
-    @app.callback(
+    @page_callback("procurement",
         [Output("proc-kpi-1", "children"),
          Output("proc-kpi-2", "children"),
          Output("proc-kpi-3", "children"),
@@ -290,37 +498,37 @@ def register_all_callbacks(app, get_data_func):
          Input("proc-public_private-filter", "value"),
          Input("proc-brand-filter", "value")]
     )
+    @cached
     def update_procurement(years, markets, regions, incomes, countries, pub_priv, brands):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "public_private": pub_priv, "brand": brands}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "procurement", filters)
         
-        total_qty = format_number(filtered["qty"].sum())
-        public_pct = f"{(filtered[filtered['public_private']=='Public'].shape[0]/len(filtered)*100):.1f}%" if len(filtered) > 0 else "0%"
-        private_pct = f"{(filtered[filtered['public_private']=='Private'].shape[0]/len(filtered)*100):.1f}%" if len(filtered) > 0 else "0%"
-        top_proc = filtered.groupby("procurement")["qty"].sum().idxmax() if len(filtered) > 0 else "N/A"
+        res = PAGE_PLANS["procurement"].execute(sel)
+        total_qty = format_number(res["qty"])
+        rows_by_type = res["rows_by_type"]
+        public_pct = f"{(rows_by_type.get('Public', 0)/res['rows']*100):.1f}%" if not sel.empty else "0%"
+        private_pct = f"{(rows_by_type.get('Private', 0)/res['rows']*100):.1f}%" if not sel.empty else "0%"
+        top_proc = res["qty_by_proc"].idxmax() if not sel.empty else "N/A"
         
         # Chart 1: Qty by Procurement Type
-        qty_by_proc = filtered.groupby("procurement")["qty"].sum().reset_index()
-        fig1 = px.bar(qty_by_proc, x="procurement", y="qty", title="Quantity by Procurement Type", color="procurement")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        qty_by_proc = res["qty_by_proc"]
+        fig1 = figures.bar_by_category(qty_by_proc.index, qty_by_proc, "procurement", "qty",
+                                       "Quantity by Procurement Type")
         
         # Chart 2: Public vs Private
-        pub_priv_data = filtered.groupby("public_private")["qty"].sum().reset_index()
-        fig2 = go.Figure(data=[go.Pie(labels=pub_priv_data["public_private"], values=pub_priv_data["qty"],
-                                       hole=0.4, pull=[0.05, 0.05])])
-        fig2.update_layout(title="Public vs Private Procurement", height=350)
+        pub_priv_data = res["qty_by_type"]
+        fig2 = figures.pie(pub_priv_data.index, pub_priv_data, "Public vs Private Procurement", pull=[0.05, 0.05])
         
         # Chart 3: Procurement Trend
-        trend = filtered.groupby(["year", "public_private"])["qty"].sum().reset_index()
-        fig3 = px.line(trend, x="year", y="qty", color="public_private", title="Procurement Trend", markers=True)
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        trend = res["trend"].reset_index()
+        fig3 = figures.line_by_color(trend, "year", "qty", "public_private", "Procurement Trend")
         
         return total_qty, public_pct, private_pct, top_proc, fig1, fig2, fig3
     
     # 7. BRAND-DEMOGRAPHIC ANALYSIS CALLBACKS
-    @app.callback(
+    @page_callback("brand_demographic",
         [Output("brand-demo-kpi-1", "children"),
          Output("brand-demo-kpi-2", "children"),
          Output("brand-demo-kpi-3", "children"),
@@ -337,39 +545,38 @@ def register_all_callbacks(app, get_data_func):
          Input("brand-demo-gender-filter", "value"),
          Input("brand-demo-brand-filter", "value")]
     )
+    @cached
     def update_brand_demographic(years, markets, regions, incomes, countries, ages, genders, brands):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "age_group": ages, "gender": genders, "brand": brands}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "brand_demographic", filters)
         
-        total_revenue = format_number(filtered["revenue"].sum())
-        top_brand = filtered.groupby("brand")["revenue"].sum().idxmax() if len(filtered) > 0 else "N/A"
-        top_age = filtered.groupby("age_group")["revenue"].sum().idxmax() if len(filtered) > 0 else "N/A"
-        avg_revenue = format_number(filtered.groupby("brand")["revenue"].sum().mean())
+        res = PAGE_PLANS["brand_demographic"].execute(sel)
+        total_revenue = format_number(res["revenue"])
+        top_brand = res["rev_by_brand"].idxmax() if not sel.empty else "N/A"
+        top_age = res["rev_by_age"].idxmax() if not sel.empty else "N/A"
+        avg_revenue = format_number(res["rev_by_brand"].mean())
         
         # Chart 1: Revenue by Age Group
-        rev_by_age = filtered.groupby("age_group")["revenue"].sum().reset_index()
-        fig1 = px.bar(rev_by_age, x="age_group", y="revenue", title="Revenue by Age Group", color="age_group")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        rev_by_age = res["rev_by_age"]
+        fig1 = figures.bar_by_category(rev_by_age.index, rev_by_age, "age_group", "revenue", "Revenue by Age Group")
         
         # Chart 2: Revenue by Gender
-        rev_by_gender = filtered.groupby("gender")["revenue"].sum().reset_index()
-        fig2 = go.Figure(data=[go.Pie(labels=rev_by_gender["gender"], values=rev_by_gender["revenue"], hole=0.4)])
-        fig2.update_layout(title="Revenue Distribution by Gender", height=350)
+        rev_by_gender = res["rev_by_gender"]
+        fig2 = figures.pie(rev_by_gender.index, rev_by_gender, "Revenue Distribution by Gender")
         
         # Chart 3: Brand Performance
-        brand_perf = filtered.groupby(["brand", "age_group"])["revenue"].sum().reset_index()
-        top_brands = brand_perf.groupby("brand")["revenue"].sum().nlargest(10).index
+        brand_perf = res["brand_perf"].reset_index()
+        top_brands = res["rev_by_brand"].nlargest(10).index
         brand_perf = brand_perf[brand_perf["brand"].isin(top_brands)]
-        fig3 = px.bar(brand_perf, x="brand", y="revenue", color="age_group", 
-                      title="Top 10 Brands by Age Group", barmode="stack")
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        fig3 = figures.bar_by_color(brand_perf, "brand", "revenue", "age_group", "Top 10 Brands by Age Group",
+                                    barmode="stack")
         
         return total_revenue, top_brand, top_age, avg_revenue, fig1, fig2, fig3
     
     # 8. FDF ANALYSIS CALLBACKS
-    @app.callback(
+    @page_callback("fdf",
         [Output("fdf-kpi-1", "children"),
          Output("fdf-kpi-2", "children"),
          Output("fdf-kpi-3", "children"),
@@ -386,32 +593,30 @@ def register_all_callbacks(app, get_data_func):
          Input("fdf-fdf-filter", "value"),
          Input("fdf-roa-filter", "value")]
     )
+    @cached
     def update_fdf(years, markets, regions, incomes, countries, brands, fdfs, roas):
         df = get_data_func()  # Get data on demand
         filters = {"year": years, "market": markets, "region": regions, "income_type": incomes, 
                    "country": countries, "brand": brands, "fdf": fdfs, "roa": roas}
-        filtered = filter_dataframe(df, filters)
+        sel = select_page(df, "fdf", filters)
         
-        total_revenue = format_number(filtered["revenue"].sum())
-        top_fdf = filtered.groupby("fdf")["revenue"].sum().idxmax() if len(filtered) > 0 else "N/A"
-        top_roa = filtered.groupby("roa")["revenue"].sum().idxmax() if len(filtered) > 0 else "N/A"
-        avg_revenue = format_number(filtered.groupby("fdf")["revenue"].sum().mean())
+        res = PAGE_PLANS["fdf"].execute(sel)
+        total_revenue = format_number(res["revenue"])
+        top_fdf = res["rev_by_fdf"].idxmax() if not sel.empty else "N/A"
+        top_roa = res["rev_by_roa"].idxmax() if not sel.empty else "N/A"
+        avg_revenue = format_number(res["rev_by_fdf"].mean())
         
         # Chart 1: Revenue by FDF
-        rev_by_fdf = filtered.groupby("fdf")["revenue"].sum().reset_index()
-        fig1 = px.bar(rev_by_fdf, x="fdf", y="revenue", title="Revenue by Formulation", color="fdf")
-        fig1.update_layout(showlegend=False, plot_bgcolor="white", height=350)
+        rev_by_fdf = res["rev_by_fdf"]
+        fig1 = figures.bar_by_category(rev_by_fdf.index, rev_by_fdf, "fdf", "revenue", "Revenue by Formulation")
         
         # Chart 2: Revenue by ROA
-        rev_by_roa = filtered.groupby("roa")["revenue"].sum().reset_index()
-        fig2 = go.Figure(data=[go.Pie(labels=rev_by_roa["roa"], values=rev_by_roa["revenue"], 
-                                       hole=0.4, pull=[0.05]*len(rev_by_roa))])
-        fig2.update_layout(title="Revenue Distribution by ROA", height=350, clickmode='event+select')
+        rev_by_roa = res["rev_by_roa"]
+        fig2 = figures.pie(rev_by_roa.index, rev_by_roa, "Revenue Distribution by ROA",
+                           pull=[0.05]*len(rev_by_roa), clickmode='event+select')
         
         # Chart 3: FDF-ROA Matrix
-        matrix = filtered.groupby(["fdf", "roa"])["revenue"].sum().reset_index()
-        fig3 = px.bar(matrix, x="fdf", y="revenue", color="roa", 
-                      title="Revenue Matrix: FDF vs ROA", barmode="group")
-        fig3.update_layout(plot_bgcolor="white", height=350)
+        matrix = res["matrix"].reset_index()
+        fig3 = figures.bar_by_color(matrix, "fdf", "revenue", "roa", "Revenue Matrix: FDF vs ROA", barmode="group")
         
         return total_revenue, top_fdf, top_roa, avg_revenue, fig1, fig2, fig3
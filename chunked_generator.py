@@ -0,0 +1,220 @@
+"""
+Chunked, parallel synthetic data generator for load tests at 10M+ rows.
+
+The dataset is parameterized by a year range, a country list, a brand list
+and a replication factor (each country repeated as that many independent
+markets). Every (year, region, replica) unit draws its metrics from its own
+np.random.SeedSequence substream, spawn key (year, region, replica), so a
+unit's rows never depend on which chunk or worker produced it. Units are
+grouped into chunks of at most CHUNK_ROWS rows (one year and region per
+chunk), generated on a process pool and written by the workers straight
+into preallocated .npy column files at the chunk's row offset. The result
+is a snapshot directory (see snapshot.py) that snapshot.load_snapshot opens
+memory-mapped; it is bit-identical for any number of workers.
+
+Usage: python chunked_generator.py OUTPUT_DIR [--years 2021-2035] [--countries A,B]
+                                   [--brands A,B] [--replication N] [--workers N]
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_generator as dg
+import schema
+import snapshot
+
+# Upper bound on the rows one worker holds in memory at a time
+CHUNK_ROWS = int(os.environ.get("GENERATOR_CHUNK_ROWS", "250000"))
+
+# Stored dtype of every numeric column, fixed up front so each chunk is written
+# without looking at the others; matches schema.compact() of the generated data
+NUMERIC_DTYPES = {
+    "record_id": np.int32,
+    "year": np.int16,
+    "prevalence": np.int32,
+    "incidence": np.int32,
+    "vaccination_rate": np.float32,
+    "coverage_rate": np.float32,
+    "price": np.float32,
+    "price_elasticity": np.float32,
+    "volume_units": np.int32,
+    "qty": np.int32,
+    "revenue": np.float64,
+    "market_value_usd": np.float64,
+    "market_share_pct": np.float32,
+    "cagr": np.float32,
+    "yoy_growth": np.float32,
+    "efficacy_pct": np.float32,
+}
+
+
+def dimension_tables(countries=None, brands=None):
+    """data_generator.dimension_tables() restricted to the given country and brand names"""
+    country_table, brand_table = dg.dimension_tables()
+    for table, names, label in ((country_table, countries, "country"), (brand_table, brands, "brand")):
+        if names is None:
+            continue
+        unknown = sorted(set(names) - set(table[label]))
+        if unknown:
+            raise ValueError(f"Unknown {label} names: {', '.join(unknown)}")
+        keep = np.isin(table[label], list(names))
+        for key in table:
+            table[key] = table[key][keep]
+    return country_table, brand_table
+
+
+def plan_chunks(years, countries, brands, replication, chunk_rows=CHUNK_ROWS):
+    """Chunks in output order: (year, region index, first replica, replicas, row offset)"""
+    unit_rows = len(brands["brand"]) * len(dg.AGE_GROUPS) * len(dg.GENDERS)
+    chunks = []
+    offset = 0
+    for year in years:
+        for region_idx, region in enumerate(dg.REGIONS):
+            rows = int(np.count_nonzero(countries["region"] == region)) * unit_rows
+            if rows == 0:
+                continue
+            per_chunk = max(1, chunk_rows // rows)
+            for first in range(0, replication, per_chunk):
+                n = min(per_chunk, replication - first)
+                chunks.append((year, region_idx, first, n, offset))
+                offset += rows * n
+    return chunks, offset
+
+
+def column_layout(n_rows):
+    """Manifest entries of the sink columns, in schema.compact() column order"""
+    columns = []
+    for name in dg.column_names():
+        if name in schema.ALIASES:
+            continue
+        entry = {"name": name, "file": f"{len(columns):03d}.npy"}
+        if name in schema.DIMENSIONS:
+            categories = schema.DIMENSIONS[name]
+            entry.update(kind="categorical", categories=categories,
+                         dtype=np.dtype(snapshot._codes_dtype(len(categories))).str)
+        else:
+            dtype = NUMERIC_DTYPES[name]
+            if name == "record_id" and 100000 + n_rows > np.iinfo(dtype).max:
+                dtype = np.int64
+            entry.update(kind="numeric", dtype=np.dtype(dtype).str)
+        columns.append(entry)
+    return columns
+
+
+def unit_rng(seed, year, region_idx, replica):
+    """Independent generator of one (year, region, replica) unit"""
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(year, region_idx, replica)))
+
+
+def build_chunk(chunk, countries, brands, seed=dg.SEED):
+    """Generate one chunk as a frame in the dashboard's generated (wide) schema"""
+    year, region_idx, first, replicas, offset = chunk
+    in_region = countries["region"] == dg.REGIONS[region_idx]
+    # Replicas of the region's countries, replica-major, so each replica's rows are contiguous
+    tiled = {key: np.tile(values[in_region], replicas) for key, values in countries.items()}
+    unit_rows = int(in_region.sum()) * len(brands["brand"]) * len(dg.AGE_GROUPS) * len(dg.GENDERS)
+    parts = [dg.draw_uniform_metrics(unit_rng(seed, year, region_idx, first + r), unit_rows)
+             for r in range(replicas)]
+    draws = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    return dg.build_frame([year], tiled, brands, draws, record_offset=offset)
+
+
+def write_chunk(path, columns, chunk, countries, brands, seed=dg.SEED):
+    """Generate a chunk and write it into the sink's column files at its row offset"""
+    df = build_chunk(chunk, countries, brands, seed)
+    start, stop = chunk[4], chunk[4] + len(df)
+    for column in columns:
+        values = df[column["name"]].to_numpy()
+        if column["kind"] == "categorical":
+            values = pd.Categorical(values, categories=column["categories"]).codes
+        target = np.load(os.path.join(path, column["file"]), mmap_mode="r+")
+        # No msync per chunk: the page cache is shared, the pages reach the disk on unmap or later
+        target[start:stop] = values.astype(column["dtype"])
+        del target
+    return len(df)
+
+
+def _write_chunk(args):
+    return write_chunk(*args)
+
+
+def generate(path, years=dg.YEARS, countries=None, brands=None, replication=1, workers=None,
+             seed=dg.SEED, chunk_rows=CHUNK_ROWS):
+    """Write the dataset to path as a snapshot directory and return its manifest.
+
+    workers=None uses every CPU, workers<=1 generates in this process; the
+    files are identical either way.
+    """
+    years = list(years)
+    country_table, brand_table = dimension_tables(countries, brands)
+    chunks, n_rows = plan_chunks(years, country_table, brand_table, replication, chunk_rows)
+    if n_rows == 0:
+        raise ValueError("The requested years, countries and brands select no rows")
+    columns = column_layout(n_rows)
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    for column in columns:
+        # Header plus a sparse, zero-filled body that the workers fill in place
+        np.lib.format.open_memmap(os.path.join(path, column["file"]), mode="w+",
+                                  dtype=column["dtype"], shape=(n_rows,))
+
+    tasks = [(path, columns, chunk, country_table, brand_table, seed) for chunk in chunks]
+    workers = os.cpu_count() if workers is None else workers
+    if workers <= 1:
+        written = sum(map(_write_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = sum(pool.map(_write_chunk, tasks))
+    assert written == n_rows, f"wrote {written} of {n_rows} rows"
+
+    version = (f"chunked-gen{dg.GENERATOR_VERSION}-seed{seed}-y{years[0]}-{years[-1]}"
+               f"-c{len(country_table['country'])}-b{len(brand_table['brand'])}-x{replication}")
+    manifest = {"version": version, "rows": n_rows, "chunks": len(chunks),
+                "columns": [{k: v for k, v in c.items() if k != "dtype"} for c in columns]}
+    # Manifest last: a directory without one is an incomplete write
+    with open(os.path.join(path, snapshot.MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _names(text):
+    return [name.strip() for name in text.split(",") if name.strip()] if text else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("output", help="snapshot directory to write (replaced if it exists)")
+    parser.add_argument("--years", default=f"{dg.YEARS[0]}-{dg.YEARS[-1]}", help="first-last year")
+    parser.add_argument("--countries", help="comma-separated country names (default: all)")
+    parser.add_argument("--brands", help="comma-separated brand names (default: all)")
+    parser.add_argument("--replication", type=int, default=1, help="independent copies of every country")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=dg.SEED)
+    args = parser.parse_args()
+    first, _, last = args.years.partition("-")
+    years = range(int(first), int(last or first) + 1)
+
+    print(f"[INFO] Generating {args.output} (replication {args.replication})...")
+    start = time.perf_counter()
+    try:
+        manifest = generate(args.output, years, _names(args.countries), _names(args.brands),
+                            args.replication, args.workers, args.seed)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"[OK] Wrote {manifest['rows']:,} rows in {manifest['chunks']} chunks in {elapsed:.1f}s "
+          f"({manifest['rows'] / elapsed:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+"""
+Optional client-side mode for the page callbacks (CLIENTSIDE_MODE=1).
+
+Pages whose KPIs and charts are answered from their OLAP cube ship the cube
+cells once with the page layout, in a dcc.Store, as a compact column-encoded
+table: one integer code array per filter field (indexing into that field's
+sorted labels) and one array per partial column (row count, sums, counts)
+the page's aggregation plan needs. A clientside_callback in
+assets/clientside.js filters the cells, rolls the partials up and builds
+the same KPI strings and figure dicts as the server callback, so dropdown
+changes never leave the browser.
+
+The server-side update_* callbacks stay as the fallback. Pages without a
+renderer in assets/clientside.js keep their server callback on the
+dropdowns; a page with a renderer whose store cannot answer it (no cube,
+too many cells, no data) gets an empty store, and the browser forwards the
+filter values through the page's `<prefix>-query` store to the server
+callback instead.
+"""
+import functools
+import os
+
+import pandas as pd
+from dash import ClientsideFunction, Input, Output, State, dcc
+
+import figures
+import group_kernel
+import schema
+
+CLIENTSIDE_MODE = os.environ.get("CLIENTSIDE_MODE", "0").lower() in ("1", "true", "yes")
+# Cubes with more cells than this are not shipped to the browser
+MAX_CELLS = int(os.environ.get("CLIENTSIDE_MAX_CELLS", "20000"))
+
+# Pages with a renderer in assets/clientside.js (window.dash_clientside.dashboard)
+PAGES = ("epidemiology", "vaccination_rate")
+
+
+def handles(page):
+    """True when the page is rendered in the browser in client-side mode"""
+    return CLIENTSIDE_MODE and page in PAGES
+
+
+def encode(cells, fields, columns):
+    """Column-encoded store payload of cube cells: codes + labels per filter field, one array per column"""
+    dims = {}
+    for field in fields:
+        codes, labels = group_kernel.key_codes(cells[schema.resolve(field)])
+        if isinstance(labels, pd.CategoricalDtype):
+            labels = labels.categories
+        dims[field] = {"labels": labels.tolist(), "codes": codes.tolist()}
+    return {
+        "cells": len(cells),
+        "dims": dims,
+        "columns": {c: cells[c].tolist() for c in columns},
+        "template": figures.TEMPLATE,
+    }
+
+
+def stores(prefix, data):
+    """Layout components of a client-side page: the cell store and the server fallback query"""
+    return [dcc.Store(id=f"{prefix}-store", data=data), dcc.Store(id=f"{prefix}-query")]
+
+
+def register(app, page, outputs, inputs, func):
+    """Register a page's clientside callback and its server fallback.
+
+    The clientside callback answers from the page store; when the store is
+    empty it writes {"values": [...], "first": bool} to the query store, which
+    runs func on the server (full figures for the page's first render,
+    dash.Patch updates afterwards).
+    """
+    prefix = outputs[0].component_id.rsplit("-", 2)[0]  # "<prefix>-kpi-1"
+    app.clientside_callback(
+        ClientsideFunction(namespace="dashboard", function_name=page),
+        outputs + [Output(f"{prefix}-query", "data")],
+        inputs + [State(f"{prefix}-store", "data")],
+    )
+
+    @functools.wraps(func)
+    def fallback(query):
+        result = func(*query["values"])
+        return result if query["first"] else figures.patch_outputs(result)
+
+    duplicates = [Output(o.component_id, o.component_property, allow_duplicate=True) for o in outputs]
+    app.callback(duplicates, Input(f"{prefix}-query", "data"), prevent_initial_call=True)(fallback)
+    return fallback
@@ -0,0 +1,261 @@
+"""
+Pre-aggregated OLAP cube for the dashboard KPIs and charts.
+
+A Cube groups the dataset once per dataset version over the dimensions a
+page filters and groups on, and stores additive partials per cell: row
+count plus sum, count, min and max of every metric. Queries filter the
+cells (same bitmap index as the raw rows) and roll the partials up, so
+sums, counts and extrema are exact and means are derived as sum / count.
+
+CubeSelection (cube cells) and RawSelection (raw rows) answer the same
+queries through partials(keys, metrics), which is what the aggregation
+planner, the callbacks and the verification mode rely on.
+"""
+import os
+from threading import Lock
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import group_kernel
+import schema
+from filtered_view import filter_view
+
+REDUCERS = ("sum", "count", "mean", "min", "max")
+
+# A cube is only kept when it has at most this many cells per raw row
+MAX_CELL_RATIO = float(os.environ.get("CUBE_MAX_CELL_RATIO", "0.5"))
+VERIFY_ON_BUILD = os.environ.get("CUBE_VERIFY", "0").lower() in ("1", "true", "yes")
+
+ROWS = aggregation.ROWS
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _widen(frame, metrics):
+    """Aggregate float32/int32 metrics in 64-bit so sums and means do not lose precision"""
+    casts = {}
+    for m in metrics:
+        dtype = frame[m].dtype
+        if pd.api.types.is_float_dtype(dtype) and dtype != np.float64:
+            casts[m] = np.float64
+        elif pd.api.types.is_integer_dtype(dtype) and dtype != np.int64:
+            casts[m] = np.int64
+    return frame.astype(casts) if casts else frame
+
+
+def _physical(names):
+    return list(dict.fromkeys(schema.resolve(n) for n in _as_list(names)))
+
+
+def _needs(needs, metric):
+    return aggregation.PARTIALS if needs is None else needs[metric]
+
+
+class Selection:
+    """Queries shared by cube cells and raw rows, all answered from partials(keys, metrics)"""
+
+    def partials(self, keys, metrics, needs=None):
+        raise NotImplementedError
+
+    def _query(self, by, metric, how):
+        metrics = _physical(metric) if how != "size" else []
+        needs = {m: aggregation.NEEDS[how] for m in metrics}
+        return aggregation.finalize(self.partials(_physical(by), metrics, needs), by, metric, how)
+
+    def total(self, metric, how):
+        return self._query([], metric, how)
+
+    def group(self, by, metric, how):
+        return self._query(by, metric, how)
+
+
+class RawSelection(Selection):
+    """Query interface over a FilteredView of raw rows"""
+
+    def __init__(self, view):
+        self._view = view
+
+    def __len__(self):
+        """Selected rows"""
+        return len(self._view)
+
+    @property
+    def empty(self):
+        return self._view.empty
+
+    def rows(self):
+        return len(self._view)
+
+    def nunique(self, dim):
+        return self._view[schema.resolve(dim)].nunique()
+
+    def partials(self, keys, metrics, needs=None):
+        """Row count plus the partials of each metric per keys (all four unless needs says otherwise).
+
+        Groupings run through the bincount kernel over the key codes.
+        """
+        if not keys:
+            frame = _widen(self._view.frame()[metrics], metrics)
+            row = {ROWS: len(frame)}
+            for m in metrics:
+                for how in _needs(needs, m):
+                    row[aggregation.partial_column(m, how)] = frame[m].agg(how)
+            return pd.DataFrame({c: [v] for c, v in row.items()})
+        columns = {ROWS: (None, "size")}
+        for m in metrics:
+            for how in _needs(needs, m):
+                columns[aggregation.partial_column(m, how)] = (self._view[m], how)
+        return group_kernel.aggregate([self._view[k] for k in keys], columns, keys).frame()
+
+
+class CubeSelection(Selection):
+    """Query interface over the filtered cells of a Cube"""
+
+    def __init__(self, view):
+        self._view = view
+        self._cells = None
+
+    @property
+    def cells(self):
+        if self._cells is None:
+            self._cells = self._view.frame()
+        return self._cells
+
+    def __len__(self):
+        """Selected cells"""
+        return len(self._view)
+
+    @property
+    def empty(self):
+        return self._view.empty
+
+    def rows(self):
+        return int(self.cells[ROWS].sum())
+
+    def nunique(self, dim):
+        return self.cells[schema.resolve(dim)].nunique()
+
+    def partials(self, keys, metrics, needs=None):
+        """Roll the cell partials up to keys"""
+        columns = [ROWS] + [aggregation.partial_column(m, how) for m in metrics for how in _needs(needs, m)]
+        return aggregation.combine(self.cells, keys, columns)
+
+
+class Cube:
+    """Additive partial aggregates of `metrics` per cell of the `dims` grid"""
+
+    def __init__(self, df, name, dims, metrics):
+        self.name = name
+        self.dims = [schema.resolve(d) for d in dims]
+        self.metrics = [schema.resolve(m) for m in metrics]
+        self.cells = RawSelection(filter_view(df, {}, self.dims + self.metrics)).partials(
+            self.dims, self.metrics).reset_index()
+        self.cells.attrs["dataset_version"] = f"{df.attrs.get('dataset_version')}#cube:{name}"
+        self.n_rows = len(df)
+
+    def answers(self, filters):
+        """True when every non-empty filter is on a cube dimension"""
+        return all(schema.resolve(f) in self.dims for f, v in filters.items() if v)
+
+    def select(self, filters):
+        if not self.answers(filters):
+            raise ValueError(f"Cube '{self.name}' cannot answer filters {sorted(filters)}")
+        physical = {schema.resolve(f): v for f, v in filters.items()}
+        return CubeSelection(filter_view(self.cells, physical))
+
+
+def raw_selection(df, filters, columns):
+    """RawSelection over the rows of df matching filters"""
+    return RawSelection(filter_view(df, filters, [schema.resolve(c) for c in columns]))
+
+
+def _random_filters(cube, rng):
+    """Random filter combination over the cube dimensions (some fields empty)"""
+    filters = {}
+    for dim in cube.dims:
+        if rng.random() < 0.5:
+            continue
+        values = pd.unique(cube.cells[dim]).tolist()
+        size = int(rng.integers(1, min(3, len(values)) + 1))
+        filters[dim] = [v.item() if hasattr(v, "item") else v
+                        for v in rng.choice(np.array(values, dtype=object), size=size, replace=False)]
+    return filters
+
+
+def _same(a, b, rtol):
+    if isinstance(a, (pd.Series, pd.DataFrame)):
+        if not a.index.equals(b.index):
+            return False
+        return np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), rtol=rtol, equal_nan=True)
+    return bool(np.isclose(float(a), float(b), rtol=rtol, equal_nan=True))
+
+
+def verify(df, cube, trials=50, seed=0, rtol=1e-9):
+    """Check cube answers against the raw-scan path for randomized filters.
+
+    Returns a list of (filters, query) mismatches; an empty list means the
+    cube agreed with the raw rows on every total and every one-dimension
+    grouping of every metric and reducer.
+    """
+    rng = np.random.default_rng(seed)
+    mismatches = []
+    for _ in range(trials):
+        filters = _random_filters(cube, rng)
+        cube_sel = cube.select(filters)
+        raw_sel = raw_selection(df, filters, cube.dims + cube.metrics)
+        if cube_sel.rows() != raw_sel.rows():
+            mismatches.append((filters, "rows"))
+            continue
+        if raw_sel.empty:
+            continue
+        for dim in cube.dims:
+            if cube_sel.nunique(dim) != raw_sel.nunique(dim):
+                mismatches.append((filters, ("nunique", dim)))
+        for metric in cube.metrics:
+            for how in REDUCERS:
+                if not _same(cube_sel.total(metric, how), raw_sel.total(metric, how), rtol):
+                    mismatches.append((filters, (None, metric, how)))
+                for dim in cube.dims:
+                    if not _same(cube_sel.group(dim, metric, how), raw_sel.group(dim, metric, how), rtol):
+                        mismatches.append((filters, (dim, metric, how)))
+    return mismatches
+
+
+_cube_lock = Lock()
+_cube_cache = {}
+
+
+def cube_for(df, dims, metrics):
+    """Cube over dims, built once per dataset version; None when it would not compress the data.
+
+    Cubes are keyed by their dimensions, so pages that filter and group on
+    the same dimensions share one cube (and its cached cell selections).
+    """
+    version = df.attrs.get("dataset_version")
+    name = "+".join(schema.resolve(d) for d in dims)
+    key = (version, name)
+    if key in _cube_cache:
+        return _cube_cache[key]
+    with _cube_lock:
+        if key not in _cube_cache:
+            cube = Cube(df, name, dims, metrics)
+            if len(cube.cells) > MAX_CELL_RATIO * len(df):
+                print(f"[INFO] Cube '{name}' skipped: {len(cube.cells):,} cells for {len(df):,} rows")
+                cube = None
+            elif VERIFY_ON_BUILD:
+                mismatches = verify(df, cube)
+                status = "[OK]" if not mismatches else f"[ERROR] {len(mismatches)} mismatches in"
+                print(f"{status} cube '{name}' verification against raw rows")
+            _cube_cache[key] = cube
+        return _cube_cache[key]
+
+
+def drop_versions(stale):
+    """Drop the cubes of dataset versions for which stale(version) is true"""
+    with _cube_lock:
+        for key in [k for k in _cube_cache if stale(k[0])]:
+            del _cube_cache[key]
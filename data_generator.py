@@ -0,0 +1,235 @@
+"""
+Vectorized vaccine market data generator based on Data-Vaccine.xlsx structure
+"""
+import numpy as np
+import pandas as pd
+
+# Bump whenever the generated values or the column layout change
+GENERATOR_VERSION = 2
+SEED = 42
+
+YEARS = list(range(2021, 2036))
+REGIONS = ["North America", "Europe", "APAC", "Latin America", "Middle East", "Africa"]
+
+# Diseases/Markets from actual Excel data
+DISEASES = ["HBV", "Herpes", "TCV", "HPV", "Influenza", "Pneumococcal", "MMR", "Rotavirus",
+            "Meningococcal", "Varicella"]
+
+# Brands by disease (from actual data + extensions)
+BRAND_MAP = {
+    "HBV": ["Engerix-B", "Heplisav-B", "Recombivax HB", "Twinrix"],
+    "Herpes": ["Shingrix", "Zostavax"],
+    "TCV": ["Typbar TCV", "Typhim Vi", "Vivotif"],
+    "HPV": ["Gardasil 9", "Cervarix"],
+    "Influenza": ["Fluzone", "Flucelvax", "FluMist", "Fluad"],
+    "Pneumococcal": ["Prevnar 13", "Prevnar 20", "Pneumovax 23", "Synflorix"],
+    "MMR": ["M-M-R II", "Priorix"],
+    "Rotavirus": ["RotaTeq", "Rotarix"],
+    "Meningococcal": ["Bexsero", "Trumenba", "MenACWY"],
+    "Varicella": ["Varivax", "ProQuad"]
+}
+
+# Companies
+COMPANIES = ["Pfizer", "GSK", "Merck", "Sanofi", "AstraZeneca", "Moderna", "Bharat Biotech",
+             "Serum Institute"]
+
+# Income classification with countries (from Excel structure)
+COUNTRY_INCOME_MAP = {
+    "North America": {
+        "USA": "High Income", "Canada": "High Income", "Mexico": "Middle Income"
+    },
+    "Europe": {
+        "Germany": "High Income", "UK": "High Income", "France": "High Income",
+        "Spain": "High Income", "Italy": "High Income", "Poland": "Middle Income",
+        "Romania": "Middle Income"
+    },
+    "APAC": {
+        "Japan": "High Income", "Australia": "High Income", "Singapore": "High Income",
+        "China": "Middle Income", "India": "Middle Income", "Thailand": "Middle Income",
+        "Pakistan": "Low Income", "Bangladesh": "Low Income", "Nepal": "Low Income"
+    },
+    "Latin America": {
+        "Brazil": "Middle Income", "Argentina": "Middle Income", "Chile": "Middle Income",
+        "Colombia": "Middle Income", "Peru": "Middle Income"
+    },
+    "Middle East": {
+        "UAE": "High Income", "Saudi Arabia": "High Income", "Israel": "High Income",
+        "Egypt": "Middle Income", "Iraq": "Middle Income"
+    },
+    "Africa": {
+        "South Africa": "Middle Income", "Nigeria": "Low Income", "Kenya": "Low Income",
+        "Ethiopia": "Low Income", "Ghana": "Low Income"
+    }
+}
+
+# Additional fields from Excel
+AGE_GROUPS = ["Pediatric", "Adult", "Elderly", "All Ages"]
+GENDERS = ["Male", "Female"]
+SEGMENTS = ["Gender", "Brand", "Age", "ROA", "FDF"]
+ROA_TYPES = ["IM", "SC", "Oral", "Intranasal"]  # IM from Excel
+FDF_TYPES = ["Vial", "Prefilled Syringe", "Multi-dose Vial", "Oral Solution"]
+PROCUREMENT_TYPES = ["UNICEF", "GAVI", "PAHO", "Hospital", "Private Clinic", "Government"]
+PUBLIC_PROCUREMENT = ["UNICEF", "GAVI", "PAHO", "Government"]
+
+# One row of the uniform draw matrix per entry: (name, low, high, integer).
+# Integer draws are inclusive on both ends, like random.randint.
+UNIFORM_DRAWS = [
+    ("prevalence", 10000, 500000, True),
+    ("incidence", 20000, 800000, True),
+    ("vaccination_rate", 5, 95, False),
+    ("price", 2, 150, False),
+    ("price_elasticity", 5, 50, False),
+    ("volume_units", 1000, 2000000, True),
+    ("value_factor", 0.8, 1.2, False),
+    ("market_share_pct", 1, 25, False),
+    ("cagr", -2, 15, False),
+    ("yoy_growth", -5, 20, False),
+    ("qty", 100, 100000, True),
+    ("coverage_factor", 0.8, 1.1, False),
+    ("efficacy_pct", 60, 98, False),
+    ("roa", 0, len(ROA_TYPES) - 1, True),
+    ("fdf", 0, len(FDF_TYPES) - 1, True),
+    ("procurement", 0, len(PROCUREMENT_TYPES) - 1, True),
+    ("company", 0, len(COMPANIES) - 1, True),
+    ("segment", 0, len(SEGMENTS) - 1, True),
+    ("segment_by", 0, 3, True),
+]
+
+
+def dimension_tables():
+    """Flatten the nested region/country and disease/brand maps into parallel arrays"""
+    country_rows = [(region, country, income)
+                    for region in REGIONS
+                    for country, income in COUNTRY_INCOME_MAP[region].items()]
+    brand_rows = [(disease, brand) for disease in DISEASES for brand in BRAND_MAP[disease]]
+    countries = {
+        "region": np.array([r[0] for r in country_rows], dtype=object),
+        "country": np.array([r[1] for r in country_rows], dtype=object),
+        "income_type": np.array([r[2] for r in country_rows], dtype=object),
+    }
+    brands = {
+        "disease": np.array([r[0] for r in brand_rows], dtype=object),
+        "brand": np.array([r[1] for r in brand_rows], dtype=object),
+    }
+    return countries, brands
+
+
+def draw_uniform_metrics(rng, n_rows):
+    """Draw every random column for n_rows in a single vectorized call"""
+    u = rng.random((len(UNIFORM_DRAWS), n_rows))
+    draws = {}
+    for i, (name, low, high, integer) in enumerate(UNIFORM_DRAWS):
+        if integer:
+            draws[name] = low + np.floor(u[i] * (high - low + 1)).astype(np.int64)
+        else:
+            draws[name] = low + u[i] * (high - low)
+    return draws
+
+
+def build_frame(years, countries, brands, draws, record_offset=0):
+    """Assemble the dashboard schema from the dimension grid and the raw draws"""
+    n_years = len(years)
+    n_countries = len(countries["country"])
+    n_brands = len(brands["brand"])
+    shape = (n_years, n_countries, n_brands, len(AGE_GROUPS), len(GENDERS))
+
+    # Broadcast each axis of the cartesian product to the full grid, loop order year-major
+    axes = np.ix_(*[np.arange(n, dtype=np.intp) for n in shape])
+    year_idx, country_idx, brand_idx, age_idx, gender_idx = [
+        np.broadcast_to(axis, shape).ravel() for axis in axes
+    ]
+    n_rows = year_idx.size
+
+    year = np.asarray(years, dtype=np.int64)[year_idx]
+    growth = year - 2021
+    price = draws["price"]
+    volume_units = draws["volume_units"]
+    revenue = price * volume_units
+    market_value_usd = revenue * draws["value_factor"]
+    vaccination_rate = draws["vaccination_rate"]
+
+    brand = brands["brand"][brand_idx]
+    age_group = np.array(AGE_GROUPS, dtype=object)[age_idx]
+    procurement = np.array(PROCUREMENT_TYPES, dtype=object)[draws["procurement"]]
+    fdf = np.array(FDF_TYPES, dtype=object)[draws["fdf"]]
+    disease = brands["disease"][brand_idx]
+
+    segment_by_code = draws["segment_by"]
+    segment_by = np.where(segment_by_code == 0, "male",
+                          np.where(segment_by_code == 1, "female",
+                                   np.where(segment_by_code == 2, brand, age_group))).astype(object)
+
+    market_value_usd = np.round(market_value_usd, 2)
+    market_share_pct = np.round(draws["market_share_pct"], 2)
+    yoy_growth = np.round(draws["yoy_growth"], 2)
+
+    data = {
+        "record_id": 100000 + record_offset + np.arange(n_rows, dtype=np.int64),
+        "year": year,
+        "region": countries["region"][country_idx],
+        "country": countries["country"][country_idx],
+        "income_type": countries["income_type"][country_idx],
+        "disease": disease,
+        "market": disease,  # Same as disease
+        "brand": brand,
+        "company": np.array(COMPANIES, dtype=object)[draws["company"]],
+        "age_group": age_group,
+        "gender": np.array(GENDERS, dtype=object)[gender_idx],
+        "segment": np.array(SEGMENTS, dtype=object)[draws["segment"]],
+        "segment_by": segment_by,
+        "roa": np.array(ROA_TYPES, dtype=object)[draws["roa"]],
+        "fdf": fdf,
+        "formulation": fdf,  # Alias
+        "procurement": procurement,
+        "public_private": np.where(np.isin(procurement, PUBLIC_PROCUREMENT), "Public", "Private").astype(object),
+        # Epidemiology metrics
+        "prevalence": (draws["prevalence"] * (1 + growth * 0.05)).astype(np.int64),
+        "incidence": (draws["incidence"] * (1 + growth * 0.03)).astype(np.int64),
+        # Vaccination metrics
+        "vaccination_rate": np.round(vaccination_rate, 2),
+        "coverage_rate": np.round(vaccination_rate * draws["coverage_factor"], 2),
+        # Pricing metrics
+        "price": np.round(price, 2),
+        "price_elasticity": np.round(draws["price_elasticity"], 2),
+        "price_class": np.where(price > 50, "Premium", np.where(price > 20, "Standard", "Budget")).astype(object),
+        # Volume and Value metrics
+        "volume_units": volume_units,
+        "qty": draws["qty"],
+        "revenue": np.round(revenue, 2),
+        "market_value_usd": market_value_usd,
+        "value": market_value_usd,  # Alias
+        # Market share metrics
+        "market_share_pct": market_share_pct,
+        "share": market_share_pct,  # Alias
+        # Growth metrics
+        "cagr": np.round(draws["cagr"], 2),
+        "yoy_growth": yoy_growth,
+        "yoy": yoy_growth,  # Alias
+        # Additional metrics
+        "efficacy_pct": np.round(draws["efficacy_pct"], 2),
+    }
+    return pd.DataFrame(data)
+
+
+def column_names():
+    """Generated column order (stored aliases included), from a one-country, one-brand sample frame"""
+    countries, brands = dimension_tables()
+    countries = {key: values[:1] for key, values in countries.items()}
+    brands = {key: values[:1] for key, values in brands.items()}
+    draws = draw_uniform_metrics(np.random.default_rng(0), len(AGE_GROUPS) * len(GENDERS))
+    return list(build_frame(YEARS[:1], countries, brands, draws).columns)
+
+
+def generate_comprehensive_data(seed=SEED):
+    """Generate vaccine market data matching Excel file structure.
+
+    Builds the year x region x country x disease x brand x age x gender
+    cartesian product with NumPy broadcasting and draws all metrics from a
+    single seeded np.random.Generator, so every worker gets identical data.
+    """
+    rng = np.random.default_rng(seed)
+    countries, brands = dimension_tables()
+    n_rows = (len(YEARS) * len(countries["country"]) * len(brands["brand"])
+              * len(AGE_GROUPS) * len(GENDERS))
+    draws = draw_uniform_metrics(rng, n_rows)
+    return build_frame(YEARS, countries, brands, draws)
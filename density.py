@@ -0,0 +1,212 @@
+"""
+Density-binned and stratified-sample scatter data (SCATTER_MODE).
+
+The Price vs Elasticity and CAGR vs Volume charts summarize every selected
+point instead of drawing a random sample. All points are binned into one
+SCATTER_BINS x SCATTER_BINS grid spanning the selection's x/y range, with a
+row count and a size-metric sum per (color value, x bin, y bin). The figure
+then draws the occupied bins (see figures.density):
+
+    scattergl  (default) WebGL markers at the bin centers, area by row count
+    heatmap    one translucent heatmap per color value
+    sample     the SCATTER_SAMPLE_ROWS-row stratified sample below, drawn as
+               the original bubble chart
+
+Every color value adds its own markers (or heatmap cells), so the grid is
+then coarsened to fit SCATTER_POINTS drawn points across all colors: blocks
+of f x f neighbouring bins are merged, for the smallest factor f dividing
+SCATTER_BINS that fits (pick SCATTER_BINS with many divisors, like the
+default 30). The payload is thus bounded by SCATTER_POINTS whatever the
+number of rows, and by the number of colors only past SCATTER_POINTS colors.
+
+Binning matches np.histogram2d with equal-width bins (the last bin includes
+the upper edge) and runs as a single np.bincount over the combined
+(color, x bin, y bin) code. The stratified sample gives every color value a
+share of the rows proportional to its size, at least one, and takes that
+many rows evenly spaced in record_id order within the value, so it is the
+same on every refresh and on every backend.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+SCATTER_MODE = os.environ.get("SCATTER_MODE", "scattergl").lower()
+SCATTER_BINS = int(os.environ.get("SCATTER_BINS", "30"))
+SCATTER_SAMPLE_ROWS = int(os.environ.get("SCATTER_SAMPLE_ROWS", "100"))
+# Most markers (scattergl) or heatmap cells a density chart draws, over all colors
+SCATTER_POINTS = int(os.environ.get("SCATTER_POINTS", "400"))
+
+MODES = ("scattergl", "heatmap", "sample")
+if SCATTER_MODE not in MODES:
+    print(f"[ERROR] Unknown SCATTER_MODE '{SCATTER_MODE}', using scattergl")
+    SCATTER_MODE = "scattergl"
+
+
+class Grid:
+    """Row counts and size sums of the selected points per (color value, x bin, y bin).
+
+    counts and sums have shape (len(labels), bins, bins), indexed [color, x bin, y bin];
+    labels holds the color values that have rows, in category order.
+    """
+
+    def __init__(self, x_edges, y_edges, labels, counts, sums):
+        self.x_edges, self.y_edges = x_edges, y_edges
+        self.labels, self.counts, self.sums = labels, counts, sums
+
+    @property
+    def x_centers(self):
+        return (self.x_edges[:-1] + self.x_edges[1:]) / 2
+
+    @property
+    def y_centers(self):
+        return (self.y_edges[:-1] + self.y_edges[1:]) / 2
+
+    @property
+    def rows(self):
+        return int(self.counts.sum())
+
+    @property
+    def bins(self):
+        return len(self.x_edges) - 1
+
+
+def extent(low, high):
+    """(origin, width) of a grid axis over [low, high]; a single value gets a unit-wide span around it"""
+    low, high = float(low), float(high)
+    if not high > low:
+        return low - 0.5, 1.0
+    return low, high - low
+
+
+def edges(origin, width, bins):
+    return origin + width * np.arange(bins + 1) / bins
+
+
+def bin_codes(values, origin, width, bins):
+    """Bin of each value on an equal-width axis, the upper edge falling in the last bin"""
+    positions = (np.asarray(values, dtype=np.float64) - origin) / (width / bins)
+    return np.clip(np.floor(positions), 0, bins - 1).astype(np.intp)
+
+
+def empty_grid(bins):
+    shape = (0, bins, bins)
+    return Grid(np.arange(bins + 1, dtype=np.float64), np.arange(bins + 1, dtype=np.float64),
+                [], np.zeros(shape, dtype=np.int64), np.zeros(shape))
+
+
+def from_cells(x_axis, y_axis, categories, color_codes, x_bins, y_bins, counts, sums, bins):
+    """Grid from the occupied (color code, x bin, y bin) cells and their counts and sums"""
+    present = np.unique(color_codes)
+    slot = np.full(len(categories), -1, dtype=np.intp)
+    slot[present] = np.arange(len(present))
+    grid_counts = np.zeros((len(present), bins, bins), dtype=np.int64)
+    grid_sums = np.zeros((len(present), bins, bins))
+    cell = (slot[color_codes], x_bins, y_bins)
+    grid_counts[cell] = counts
+    grid_sums[cell] = sums
+    return Grid(edges(*x_axis, bins), edges(*y_axis, bins), [categories[c] for c in present],
+                grid_counts, grid_sums)
+
+
+def bin_points(x, y, color, size, bins=SCATTER_BINS):
+    """Grid of the points (x, y, color, size arrays or Series of equal length).
+
+    Points with a missing x, y or color value are left out; a missing size
+    adds nothing to the bin's sum.
+    """
+    codes, categories = _color_codes(color)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = (codes >= 0) & ~np.isnan(x) & ~np.isnan(y)
+    if not keep.all():
+        codes, x, y, size = codes[keep], x[keep], y[keep], np.asarray(size)[keep]
+    if not len(codes):
+        return empty_grid(bins)
+    x_axis, y_axis = extent(x.min(), x.max()), extent(y.min(), y.max())
+    cells = (codes * bins + bin_codes(x, *x_axis, bins)) * bins + bin_codes(y, *y_axis, bins)
+    n_cells = len(categories) * bins * bins
+    counts = np.bincount(cells, minlength=n_cells)
+    weights = np.nan_to_num(np.asarray(size, dtype=np.float64))
+    sums = np.bincount(cells, weights=weights, minlength=n_cells)
+    occupied = np.flatnonzero(counts)
+    color_codes, rest = np.divmod(occupied, bins * bins)
+    x_bins, y_bins = np.divmod(rest, bins)
+    return from_cells(x_axis, y_axis, categories, color_codes, x_bins, y_bins,
+                      counts[occupied], sums[occupied], bins)
+
+
+def coarsen(grid, factor):
+    """Grid with every block of factor x factor neighbouring bins merged (factor divides grid.bins)"""
+    if factor == 1:
+        return grid
+    labels, bins = len(grid.labels), grid.bins // factor
+    merge = lambda a: a.reshape(labels, bins, factor, bins, factor).sum(axis=(2, 4))  # noqa: E731
+    return Grid(grid.x_edges[::factor], grid.y_edges[::factor], grid.labels,
+                merge(grid.counts), merge(grid.sums))
+
+
+def drawn_points(grid, kind):
+    """Markers (occupied bins) or heatmap cells (every bin of every color) figures.density draws"""
+    if kind == "heatmap":
+        return len(grid.labels) * grid.bins * grid.bins
+    return int(np.count_nonzero(grid.counts))
+
+
+def fit(grid, kind=SCATTER_MODE, points=SCATTER_POINTS):
+    """The finest coarsening of grid drawing at most `points` points over all colors
+    (a single bin per axis when even that draws more)"""
+    factors = [f for f in range(1, grid.bins + 1) if grid.bins % f == 0]
+    for factor in factors:
+        coarse = coarsen(grid, factor)
+        if drawn_points(coarse, kind) <= points:
+            return coarse
+    return coarse
+
+
+def _color_codes(color):
+    values = color.array if hasattr(color, "array") else color
+    if isinstance(values, pd.Categorical):
+        return np.asarray(values.codes, dtype=np.intp), list(values.categories)
+    codes, uniques = pd.factorize(np.asarray(values), sort=True)
+    return codes.astype(np.intp), list(uniques)
+
+
+def allocate(group_rows, n=SCATTER_SAMPLE_ROWS):
+    """Sample rows per color value: proportional to its rows, at least one, at most all of them"""
+    group_rows = np.asarray(group_rows, dtype=np.int64)
+    total = int(group_rows.sum())
+    if total == 0:
+        return np.zeros_like(group_rows)
+    share = np.maximum(1, n * group_rows // total)
+    return np.where(group_rows > 0, np.minimum(share, group_rows), 0)
+
+
+def is_picked(rank, take, rows):
+    """Whether the rank-th row (0-based) of a value with `rows` rows is among its `take` evenly spaced picks.
+
+    Picks are ranks ceil(j * rows / take) for j < take, i.e. the ranks where
+    floor(rank * take / rows) steps up (the same arithmetic runs in SQL).
+    """
+    rows = np.maximum(rows, 1)
+    return (rank == 0) & (take > 0) | ((rank * take) // rows > ((rank - 1) * take) // rows)
+
+
+def stratified_positions(color, order, n=SCATTER_SAMPLE_ROWS):
+    """Positions of the stratified sample rows, in row order.
+
+    color holds each row's color value and order its record_id; rows with a
+    missing color value are never picked.
+    """
+    codes, categories = _color_codes(color)
+    valid = np.flatnonzero(codes >= 0)
+    codes = codes[valid]
+    group_rows = np.bincount(codes, minlength=len(categories))
+    take = allocate(group_rows, n)
+    # Rank of every row within its color value, in record_id order
+    by_group = valid[np.lexsort((np.asarray(order)[valid], codes))]
+    sorted_codes = np.sort(codes, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(group_rows)[:-1]])
+    rank = np.arange(len(by_group)) - starts[sorted_codes]
+    picked = is_picked(rank, take[sorted_codes], group_rows[sorted_codes])
+    return np.sort(by_group[picked])
@@ -0,0 +1,267 @@
+"""
+Streaming ingestion of a Data-Vaccine.xlsx workbook with a columnar cache.
+
+The workbook is opened with openpyxl in read_only mode and streamed sheet
+by sheet, row by row; only one sheet's raw values are held at a time. In
+each sheet the first non-empty row is the header. Header cells are mapped
+to the dashboard columns by name, with the synonyms in HEADERS. A sheet
+with one column per year (2021, 2022, ...) is unpivoted into year rows,
+and its values go to the metric the sheet title names. Sheets with no
+year column or no known metric are skipped. Rows of all sheets are
+appended, the dimensions the sheets leave out are derived where the
+generator's maps allow it (region from country, disease from brand, ...)
+or set to "Unknown", and the frame is converted to the compact schema.
+
+The result is written as a snapshot (see snapshot.py) under
+EXCEL_CACHE_DIR in a directory keyed by the workbook's size, mtime and
+SHA-256, so later startups open it memory-mapped and never parse Excel.
+
+Usage: python excel_ingest.py WORKBOOK [--rebuild]
+"""
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_generator as dg
+import schema
+import snapshot
+
+# Bump whenever the header mapping or the derived columns change
+INGEST_VERSION = 1
+
+EXCEL_PATH = os.environ.get("DATA_EXCEL_PATH")
+EXCEL_CACHE_DIR = os.environ.get("EXCEL_CACHE_DIR",
+                                 os.path.join(tempfile.gettempdir(), "vaccine-dashboard-excel-cache"))
+
+# Normalized header (see normalize) -> dashboard column, beyond the column names themselves
+HEADERS = {
+    "income": "income_type",
+    "income_group": "income_type",
+    "vaccine": "brand",
+    "brand_name": "brand",
+    "manufacturer": "company",
+    "age": "age_group",
+    "sex": "gender",
+    "route_of_administration": "roa",
+    "route": "roa",
+    "formulation_type": "fdf",
+    "dosage_form": "fdf",
+    "procurement_type": "procurement",
+    "procurement_channel": "procurement",
+    "public_private_split": "public_private",
+    "vaccination_rate_pct": "vaccination_rate",
+    "coverage": "coverage_rate",
+    "coverage_rate_pct": "coverage_rate",
+    "price_usd": "price",
+    "price_per_dose": "price",
+    "elasticity": "price_elasticity",
+    "volume": "volume_units",
+    "units": "volume_units",
+    "quantity": "qty",
+    "revenue_usd": "revenue",
+    "market_value": "market_value_usd",
+    "value_usd": "market_value_usd",
+    "market_share": "market_share_pct",
+    "cagr_pct": "cagr",
+    "yoy_growth_pct": "yoy_growth",
+    "efficacy": "efficacy_pct",
+}
+
+COLUMNS = [name for name in dg.column_names() if name not in schema.ALIASES]
+METRICS = [name for name in COLUMNS if name not in schema.DIMENSIONS and name not in ("record_id", "year")]
+
+COUNTRY_REGION = {c: r for r, countries in dg.COUNTRY_INCOME_MAP.items() for c in countries}
+COUNTRY_INCOME = {c: i for countries in dg.COUNTRY_INCOME_MAP.values() for c, i in countries.items()}
+BRAND_DISEASE = {b: d for d, brands in dg.BRAND_MAP.items() for b in brands}
+# Dimensions complete() derives from other columns when a sheet leaves them out
+DERIVED = ("region", "income_type", "disease", "public_private", "price_class")
+
+
+def normalize(header):
+    """'Market Share (%)' -> 'market_share'"""
+    return re.sub(r"[^0-9a-z]+", "_", str(header).strip().lower()).strip("_")
+
+
+def column_for(header):
+    """Dashboard column a header cell maps to, or None"""
+    name = normalize(header)
+    name = schema.resolve(HEADERS.get(name, name))
+    return name if name in COLUMNS else None
+
+
+def _year(header):
+    try:
+        year = int(float(header))
+    except (TypeError, ValueError):
+        return None
+    return year if 1900 <= year <= 2100 else None
+
+
+def read_sheet(sheet):
+    """Stream one worksheet into a frame of dashboard columns, or None if it does not map"""
+    rows = sheet.iter_rows(values_only=True)
+    header = None
+    for row in rows:
+        if any(cell is not None for cell in row):
+            header = row
+            break
+    if header is None:
+        return None
+
+    mapped = [column_for(h) if h is not None else None for h in header]
+    years = [_year(h) if m is None else None for h, m in zip(header, mapped)]
+    wide = "year" not in mapped and any(y is not None for y in years)
+    metric = column_for(sheet.title) if wide else None
+    if wide and metric not in METRICS:
+        return None
+    keep = [i for i, m in enumerate(mapped) if m is not None and m not in mapped[:i]]
+    year_cols = [i for i, y in enumerate(years) if y is not None] if wide else []
+
+    values = {mapped[i]: [] for i in keep}
+    if wide:
+        values["year"], values[metric] = [], []
+    for row in rows:
+        if not any(cell is not None for cell in row):
+            continue
+        row = tuple(row) + (None,) * (len(header) - len(row))
+        if wide:
+            # One output row per year column
+            for i in keep:
+                values[mapped[i]].extend([row[i]] * len(year_cols))
+            values["year"].extend(years[i] for i in year_cols)
+            values[metric].extend(row[i] for i in year_cols)
+        else:
+            for i in keep:
+                values[mapped[i]].append(row[i])
+    if "year" not in values or not any(m in values for m in METRICS):
+        return None
+    return pd.DataFrame(values)
+
+
+def complete(df):
+    """Add the dimensions and derived metrics the sheets left out, in generated column order"""
+    df["year"] = pd.to_numeric(df["year"], errors="coerce")
+    df = df[df["year"].notna()].reset_index(drop=True)
+    for name in METRICS:
+        df[name] = pd.to_numeric(df[name], errors="coerce") if name in df.columns else np.nan
+
+    def fill(name, derived=None):
+        current = df[name].astype(object) if name in df.columns else pd.Series(None, index=df.index, dtype=object)
+        if derived is not None:
+            current = current.where(current.notna(), derived)
+        df[name] = current.where(current.notna(), "Unknown").astype(str)
+
+    fill("country")
+    fill("brand")
+    fill("procurement")
+    fill("region", df["country"].map(COUNTRY_REGION))
+    fill("income_type", df["country"].map(COUNTRY_INCOME))
+    fill("disease", df["brand"].map(BRAND_DISEASE))
+    fill("public_private", pd.Series(np.where(df["procurement"].isin(dg.PUBLIC_PROCUREMENT), "Public", "Private"),
+                                     index=df.index).where(df["procurement"] != "Unknown"))
+    price = df["price"]
+    fill("price_class", pd.Series(np.where(price > 50, "Premium", np.where(price > 20, "Standard", "Budget")),
+                                  index=df.index).where(price.notna()))
+    for name in COLUMNS:
+        if name in schema.DIMENSIONS and name not in DERIVED:
+            fill(name)
+    df["revenue"] = df["revenue"].fillna(df["price"] * df["volume_units"])
+    df["year"] = df["year"].astype(np.int64)
+    df["record_id"] = 100000 + np.arange(len(df), dtype=np.int64)
+    return df[COLUMNS]
+
+
+def parse_workbook(path):
+    """Stream every sheet of the workbook and return the compact dataset"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    frames = []
+    try:
+        for sheet in workbook.worksheets:
+            frame = read_sheet(sheet)
+            if frame is None:
+                print(f"[INFO] Skipped sheet '{sheet.title}': no year column or known metric")
+                continue
+            print(f"[INFO] Read sheet '{sheet.title}': {len(frame):,} rows")
+            frames.append(frame)
+    finally:
+        workbook.close()
+    if not frames:
+        raise ValueError(f"No sheet of {path} maps to the dashboard schema")
+    return schema.compact(complete(pd.concat(frames, ignore_index=True)))
+
+
+def file_sha256(path, block=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_version(path):
+    """Cache key of the workbook: size, mtime and content hash, plus the ingest/schema/format versions"""
+    stat = os.stat(path)
+    return (f"xlsx-{stat.st_size}-{stat.st_mtime_ns}-{file_sha256(path)[:16]}"
+            f"-ing{INGEST_VERSION}-schema{schema.SCHEMA_VERSION}-fmt{snapshot.SNAPSHOT_FORMAT}")
+
+
+def load(path, root=EXCEL_CACHE_DIR):
+    """Return (dataset, timings) for the workbook, parsing it only when its cache is missing.
+
+    timings holds the seconds spent hashing, parsing (0 on a cache hit) and
+    opening the cache, and whether it was a hit. The dataset is versioned by
+    its cache key.
+    """
+    start = time.perf_counter()
+    version = cache_version(path)
+    hashed = time.perf_counter()
+    parsed = []
+
+    def build():
+        begin = time.perf_counter()
+        df = parse_workbook(path)
+        parsed.append(time.perf_counter() - begin)
+        return df
+
+    df = snapshot.load_or_build(build, root=root, version=version)
+    df.attrs["dataset_version"] = version
+    total = time.perf_counter() - start
+    parse = parsed[0] if parsed else 0.0
+    timings = {"cache_hit": not parsed, "hash": round(hashed - start, 3), "parse": round(parse, 3),
+               "load": round(total - (hashed - start) - parse, 3), "total": round(total, 3)}
+    return df, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("workbook")
+    parser.add_argument("--rebuild", action="store_true", help="drop the cache first to time a cold parse")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        shutil.rmtree(EXCEL_CACHE_DIR, ignore_errors=True)
+    try:
+        df, cold = load(args.workbook)
+        _, warm = load(args.workbook)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    print(f"[OK] {len(df):,} rows, version {df.attrs['dataset_version']}")
+    for label, timings in (("first load", cold), ("second load", warm)):
+        kind = "cache hit" if timings["cache_hit"] else "cold parse"
+        print(f"{label:12} {kind:10} total {timings['total']:.3f}s (hash {timings['hash']:.3f}s, "
+              f"parse {timings['parse']:.3f}s, load {timings['load']:.3f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
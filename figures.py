@@ -0,0 +1,244 @@
+"""
+Figure factory for the page callbacks.
+
+Builds the bar, pie, line, scatter and density figures the pages use as plain
+dicts, producing the same figure JSON plotly express / graph_objects emit
+for the callbacks' calls, without re-validating the figure tree on every
+request. The theme template and the static layout pieces are validated
+through plotly once at import; each request only fills in titles and the
+x/y/labels/values arrays.
+
+as_patch() turns a built figure into a dash.Patch carrying only the parts
+that depend on the data (traces, title, legend, category order), for
+updating a figure the browser already has.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from dash import Patch
+
+# Pre-validated once: the default theme and the cartesian layout pieces px emits
+TEMPLATE = pio.templates[pio.templates.default].to_plotly_json()
+COLORWAY = TEMPLATE["layout"]["colorway"]
+COLORSCALE = [list(stop) for stop in TEMPLATE["layout"]["colorscale"]["sequential"]]
+_AXES = go.Layout(xaxis={"anchor": "y", "domain": [0.0, 1.0]},
+                  yaxis={"anchor": "x", "domain": [0.0, 1.0]}).to_plotly_json()
+
+HEIGHT = 350
+PLOT_BGCOLOR = "white"
+SIZE_MAX = 20
+# Smallest marker of a density bin, so bins with a few rows stay visible
+DENSITY_SIZE_MIN = 3
+# Transparent at zero rows, so overlapping per-color heatmaps show through
+TRANSPARENT = "rgba(255,255,255,0)"
+
+
+def _values(values):
+    """Plain array of labels/values (categoricals decoded to their labels)"""
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        return np.asarray(values, dtype=object)
+    return np.asarray(values)
+
+
+def _rounded(values, digits):
+    """values rounded to `digits` significant digits of the largest magnitude (shorter JSON)"""
+    values = np.asarray(values, dtype=np.float64)
+    peak = float(np.abs(values).max()) if len(values) else 0.0
+    if not np.isfinite(peak) or peak == 0:
+        return values
+    return np.round(values, max(0, digits - 1 - int(np.floor(np.log10(peak)))))
+
+
+def _color(i):
+    return COLORWAY[i % len(COLORWAY)]
+
+
+def _groups(color_values):
+    """Distinct color values in order of first appearance with their row positions"""
+    codes, uniques = pd.factorize(color_values, sort=False)
+    return [(value, np.flatnonzero(codes == i)) for i, value in enumerate(uniques)]
+
+
+def _cartesian_layout(title, x, y, legend_title=None, **extra):
+    layout = {
+        "template": TEMPLATE,
+        "xaxis": dict(_AXES["xaxis"], title={"text": x}),
+        "yaxis": dict(_AXES["yaxis"], title={"text": y}),
+        "legend": {"tracegroupgap": 0},
+        "title": {"text": title},
+    }
+    if legend_title is not None:
+        layout["legend"] = {"title": {"text": legend_title}, "tracegroupgap": 0}
+    layout.update(extra)
+    return layout
+
+
+def _bar_trace(name, x_values, y_values, hovertemplate, marker, showlegend):
+    return {"alignmentgroup": "True", "hovertemplate": hovertemplate, "legendgroup": name,
+            "marker": marker, "name": name, "offsetgroup": name, "orientation": "v",
+            "showlegend": showlegend, "textposition": "auto", "x": x_values, "xaxis": "x",
+            "y": y_values, "yaxis": "y", "type": "bar"}
+
+
+def bar_by_category(labels, values, x, y, title):
+    """One colored bar per category, legend hidden (px.bar(x=x, y=y, color=x))"""
+    labels, values = _values(labels), _values(values)
+    hover = f"{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>"
+    data = [_bar_trace(label, labels[i:i + 1], values[i:i + 1], hover,
+                       {"color": _color(i), "pattern": {"shape": ""}}, True)
+            for i, label in enumerate(labels.tolist())]
+    layout = _cartesian_layout(title, x, y, legend_title=x if len(labels) else None,
+                               barmode="relative", showlegend=False, plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    layout["xaxis"].update(categoryorder="array", categoryarray=labels.tolist())
+    return {"data": data, "layout": layout}
+
+
+def bar_continuous(labels, values, x, y, title):
+    """Bars colored on a continuous scale by their value (px.bar(x=x, y=y, color=y))"""
+    labels, values = _values(labels), _values(values)
+    hover = f"{x}=%{{x}}<br>{y}=%{{marker.color}}<extra></extra>"
+    trace = _bar_trace("", labels, values, hover,
+                       {"color": values, "coloraxis": "coloraxis", "pattern": {"shape": ""}}, False)
+    layout = _cartesian_layout(title, x, y, coloraxis={"colorbar": {"title": {"text": y}}, "colorscale": COLORSCALE},
+                               barmode="relative", showlegend=False, plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    return {"data": [trace], "layout": layout}
+
+
+def bar_by_color(frame, x, y, color, title, barmode):
+    """Bars split into one trace per color value (px.bar(x=x, y=y, color=color, barmode=barmode))"""
+    x_values, y_values = _values(frame[x]), _values(frame[y])
+    data = []
+    for i, (value, rows) in enumerate(_groups(_values(frame[color]))):
+        hover = f"{color}={value}<br>{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>"
+        data.append(_bar_trace(value, x_values[rows], y_values[rows], hover,
+                               {"color": _color(i), "pattern": {"shape": ""}}, True))
+    layout = _cartesian_layout(title, x, y, legend_title=color if data else None,
+                               barmode=barmode, plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    return {"data": data, "layout": layout}
+
+
+def _line_trace(name, x_values, y_values, hovertemplate, color, showlegend):
+    return {"hovertemplate": hovertemplate, "legendgroup": name, "line": {"color": color, "dash": "solid"},
+            "marker": {"symbol": "circle"}, "mode": "lines+markers", "name": name, "orientation": "v",
+            "showlegend": showlegend, "x": x_values, "xaxis": "x", "y": y_values, "yaxis": "y", "type": "scatter"}
+
+
+def line(x_values, y_values, x, y, title):
+    """Single line with markers (px.line(x=x, y=y, markers=True))"""
+    hover = f"{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>"
+    trace = _line_trace("", _values(x_values), _values(y_values), hover, _color(0), False)
+    layout = _cartesian_layout(title, x, y, plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    return {"data": [trace], "layout": layout}
+
+
+def line_by_color(frame, x, y, color, title):
+    """One line with markers per color value (px.line(x=x, y=y, color=color, markers=True))"""
+    x_values, y_values = _values(frame[x]), _values(frame[y])
+    data = []
+    for i, (value, rows) in enumerate(_groups(_values(frame[color]))):
+        hover = f"{color}={value}<br>{x}=%{{x}}<br>{y}=%{{y}}<extra></extra>"
+        data.append(_line_trace(value, x_values[rows], y_values[rows], hover, _color(i), True))
+    layout = _cartesian_layout(title, x, y, legend_title=color if data else None,
+                               plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    return {"data": data, "layout": layout}
+
+
+def lines(x_values, series, title):
+    """Named lines with markers sharing one x axis (go.Scatter traces)"""
+    x_values = _values(x_values)
+    data = [{"mode": "lines+markers", "name": name, "x": x_values, "y": _values(y_values), "type": "scatter"}
+            for name, y_values in series]
+    return {"data": data, "layout": {"template": TEMPLATE, "title": {"text": title},
+                                     "plot_bgcolor": PLOT_BGCOLOR, "height": HEIGHT}}
+
+
+def pie(labels, values, title, hole=0.4, pull=None, **layout):
+    """Donut chart (go.Pie); extra keyword arguments go to the layout"""
+    trace = {"hole": hole, "labels": _values(labels)}
+    if pull is not None:
+        trace["pull"] = pull
+    trace.update(values=_values(values), type="pie")
+    return {"data": [trace], "layout": dict({"template": TEMPLATE, "title": {"text": title}, "height": HEIGHT},
+                                            **layout)}
+
+
+def scatter(frame, x, y, color, size, title):
+    """Bubble chart with one trace per color value (px.scatter(x=x, y=y, color=color, size=size))"""
+    x_values, y_values, sizes = _values(frame[x]), _values(frame[y]), _values(frame[size])
+    sizeref = float(sizes.max()) / SIZE_MAX ** 2 if len(sizes) else None
+    data = []
+    for i, (value, rows) in enumerate(_groups(_values(frame[color]))):
+        hover = f"{color}={value}<br>{x}=%{{x}}<br>{y}=%{{y}}<br>{size}=%{{marker.size}}<extra></extra>"
+        marker = {"color": _color(i), "size": sizes[rows], "sizemode": "area", "sizeref": sizeref, "symbol": "circle"}
+        data.append({"hovertemplate": hover, "legendgroup": value, "marker": marker, "mode": "markers",
+                     "name": value, "orientation": "v", "showlegend": True, "x": x_values[rows], "xaxis": "x",
+                     "y": y_values[rows], "yaxis": "y", "type": "scatter"})
+    layout = _cartesian_layout(title, x, y, legend_title=color if data else None,
+                               plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    layout["legend"]["itemsizing"] = "constant"
+    return {"data": data, "layout": layout}
+
+
+def density(grid, x, y, color, size, title, kind="scattergl"):
+    """Density-binned scatter of a density.Grid, one trace per color value.
+
+    kind "scattergl" draws a WebGL marker at the center of every occupied
+    bin, its area proportional to the bin's rows; "heatmap" draws one
+    translucent heatmap of the row counts per color value. The hover shows
+    the rows and the mean size metric of the bin.
+    """
+    # Centers to 3 significant digits of a bin's width, which still tells every bin apart
+    x_centers = _rounded(grid.x_centers, 3 + int(np.log10(len(grid.x_centers))))
+    y_centers = _rounded(grid.y_centers, 3 + int(np.log10(len(grid.y_centers))))
+    peak = float(grid.counts.max()) if len(grid.labels) else None
+    rows_field = "z" if kind == "heatmap" else "marker.size"
+    data = []
+    for i, value in enumerate(grid.labels):
+        counts, sums = grid.counts[i], grid.sums[i]
+        hover = (f"{color}={value}<br>{x}≈%{{x:.4g}}<br>{y}≈%{{y:.4g}}<br>rows=%{{{rows_field}}}"
+                 f"<br>mean {size}=%{{customdata:.4g}}<extra></extra>")
+        trace = {"hovertemplate": hover, "legendgroup": value, "name": value, "showlegend": True,
+                 "xaxis": "x", "yaxis": "y"}
+        if kind == "heatmap":
+            # Heatmap z is indexed [y bin][x bin]; empty bins are gaps
+            z = counts.T.astype(object)
+            z[counts.T == 0] = None
+            mean = np.divide(sums.T, counts.T, out=np.zeros_like(sums.T), where=counts.T > 0)
+            trace.update(colorscale=[[0, TRANSPARENT], [1, _color(i)]], customdata=_rounded(mean, 4), opacity=0.75,
+                         showscale=False, x=x_centers, y=y_centers, z=z, zmin=0, zmax=peak, type="heatmap")
+        else:
+            x_bins, y_bins = np.nonzero(counts)
+            rows = counts[x_bins, y_bins]
+            marker = {"color": _color(i), "size": rows, "sizemin": DENSITY_SIZE_MIN, "sizemode": "area",
+                      "sizeref": peak / SIZE_MAX ** 2, "symbol": "circle"}
+            trace.update(customdata=_rounded(sums[x_bins, y_bins] / rows, 4), marker=marker, mode="markers",
+                         x=x_centers[x_bins], y=y_centers[y_bins], type="scattergl")
+        data.append(trace)
+    layout = _cartesian_layout(title, x, y, legend_title=color if data else None,
+                               plot_bgcolor=PLOT_BGCOLOR, height=HEIGHT)
+    layout["legend"]["itemsizing"] = "constant"
+    return {"data": data, "layout": layout}
+
+
+def as_patch(figure):
+    """dash.Patch replacing the traces and data-dependent layout of an already rendered figure.
+
+    The template, axes and other static layout stay in the browser. An empty
+    figure ({}) clears the traces and keeps the previous layout.
+    """
+    patch = Patch()
+    patch["data"] = figure.get("data", [])
+    layout = figure.get("layout", {})
+    for key in ("title", "legend"):
+        if key in layout:
+            patch["layout"][key] = layout[key]
+    if "categoryarray" in layout.get("xaxis", {}):
+        patch["layout"]["xaxis"]["categoryarray"] = layout["xaxis"]["categoryarray"]
+    return patch
+
+
+def patch_outputs(outputs):
+    """Callback outputs with every figure replaced by its as_patch()"""
+    return tuple(as_patch(o) if isinstance(o, dict) else o for o in outputs)
+
@@ -0,0 +1,107 @@
+"""
+Zero-copy filtered views with per-callback column projection.
+
+filter_view() combines every filter into one boolean row mask (bitmap index
+for the dimensions, isin for anything else, shared through the mask cache)
+and returns a FilteredView. The view materializes only the columns the
+callback declared, each one on first access; with no filters set the
+columns are the shared dataset's own arrays and nothing is copied.
+"""
+import numpy as np
+import pandas as pd
+
+import bitmap_index
+import schema
+from mask_cache import MASK_CACHE, canonical_filters
+
+
+def combined_mask(df, filters):
+    """One boolean row mask for all non-empty filters, or None when nothing is filtered.
+
+    The packed selection comes from the shared mask cache; only filters not
+    covered by a cached subset are evaluated (bitmap index for dimensions,
+    isin for anything else).
+    """
+    physical = {schema.resolve(f): v for f, v in filters.items() if v}
+    if not physical:
+        return None
+    index = bitmap_index.index_for(df)
+
+    def field_words(field, values):
+        if index.covers(field):
+            return index.field_bitmap(field, values)
+        return bitmap_index.pack_mask(df[field].isin(values).to_numpy())
+
+    version = (df.attrs.get("dataset_version"), len(df))
+    words = MASK_CACHE.get_or_build(version, canonical_filters(physical), field_words)
+    return bitmap_index.unpack_words(words, len(df))
+
+
+class FilteredView:
+    """Read-only projection of the rows selected by a filter.
+
+    Supports the subset of the DataFrame API the callbacks use: column
+    access, boolean row selection, len/empty, groupby and sample.
+    """
+
+    def __init__(self, df, positions, columns=None):
+        self._df = df
+        self._positions = positions
+        if columns is None:
+            columns = list(df.columns) + [a for a, src in schema.ALIASES.items() if src in df.columns]
+        self.columns = list(dict.fromkeys(columns))
+        self._series = {}
+        self._frame = None
+
+    def __len__(self):
+        return len(self._df) if self._positions is None else len(self._positions)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def shape(self):
+        return (len(self), len(self.columns))
+
+    @property
+    def positions(self):
+        """Row positions into the base frame, or None for all rows"""
+        return self._positions
+
+    def column(self, name):
+        """Materialize one declared column (alias names resolve to their physical column)"""
+        if name not in self.columns:
+            raise KeyError(f"Column '{name}' was not declared for this view")
+        series = self._series.get(name)
+        if series is None:
+            base = self._df[schema.resolve(name)]
+            if self._positions is not None:
+                base = base.take(self._positions)
+            series = pd.Series(base.array, index=base.index, name=name, copy=False)
+            self._series[name] = series
+        return series
+
+    def frame(self):
+        """DataFrame holding only the declared columns"""
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: self.column(name) for name in self.columns}, copy=False)
+        return self._frame
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.column(key)
+        return self.frame()[key]
+
+    def groupby(self, *args, **kwargs):
+        return self.frame().groupby(*args, **kwargs)
+
+    def sample(self, *args, **kwargs):
+        return self.frame().sample(*args, **kwargs)
+
+
+def filter_view(df, filters, columns=None):
+    """Filter df with one combined mask and return a lazy FilteredView of the declared columns"""
+    mask = combined_mask(df, filters)
+    positions = np.flatnonzero(mask) if mask is not None else None
+    return FilteredView(df, positions, columns)
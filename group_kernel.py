@@ -0,0 +1,183 @@
+"""
+Grouped aggregation kernel over dictionary codes.
+
+The dashboard groups on a handful of low-cardinality dimensions, where the
+fixed per-call overhead of pandas groupby dominates. This kernel takes the
+integer codes of the key columns (categorical codes, or small integer
+ranges such as year), combines them into one dense group code and reduces
+every metric with a single numpy call:
+
+    sum    np.bincount(codes, weights=values)
+    count  np.bincount(codes) over the non-missing values
+    min    np.minimum.at / max np.maximum.at
+
+When the key grid is much larger than the number of rows (many keys), the
+combined codes are compacted with np.unique first. Only groups that contain
+rows are returned (observed=True semantics), in sorted key order, as one
+label array per key plus one value array per output column, ready to hand
+to a figure or to wrap in a frame.
+"""
+import numpy as np
+import pandas as pd
+
+# Integer keys spanning at most this many values are coded as value - min
+MAX_INT_RANGE = 4096
+# Key grids larger than this many slots per row are compacted with np.unique
+MAX_GRID_RATIO = 4
+
+
+def key_codes(key):
+    """(codes, labels) of one key column; codes index into labels, -1 marks a missing key.
+
+    Categorical keys return their Categorical dtype as labels so the groups
+    decode back to the same categories.
+    """
+    array = key.array if hasattr(key, "array") else key
+    if isinstance(array, pd.Categorical):
+        return np.asarray(array.codes, dtype=np.intp), array.dtype
+    values = np.asarray(key)
+    if pd.api.types.is_integer_dtype(values.dtype) and len(values):
+        low, high = int(values.min()), int(values.max())
+        if high - low < MAX_INT_RANGE:
+            return (values - low).astype(np.intp), np.arange(low, high + 1, dtype=values.dtype)
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype(np.intp), labels
+
+
+def _cardinality(labels):
+    return len(labels.categories) if isinstance(labels, pd.CategoricalDtype) else len(labels)
+
+
+def _decode(labels, positions):
+    if isinstance(labels, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(positions, dtype=labels)
+    return np.asarray(labels)[positions]
+
+
+def group_codes(keys):
+    """Combined code per row (-1 for rows with a missing key), the grid size and each key's (codes, labels)"""
+    parts = [key_codes(k) for k in keys]
+    combined = np.zeros(len(parts[0][0]), dtype=np.intp)
+    size = 1
+    for codes, labels in parts:
+        n = _cardinality(labels)
+        combined *= n
+        combined += codes
+        size *= n
+    missing = [codes < 0 for codes, _ in parts if (codes < 0).any()]
+    if missing:
+        combined[np.logical_or.reduce(missing)] = -1
+    return combined, size, parts
+
+
+def reduce(codes, size, values, how):
+    """Per-group sum/count/min/max of values (groups without values get NaN for min/max)"""
+    values = np.asarray(values)
+    is_float = values.dtype.kind == "f"
+    if is_float:
+        valid = ~np.isnan(values)
+        if not valid.all():
+            codes, values = codes[valid], values[valid]
+    if how == "count":
+        return np.bincount(codes, minlength=size)
+    if how == "sum":
+        sums = np.bincount(codes, weights=values, minlength=size)
+        return sums if is_float else np.rint(sums).astype(np.int64)
+    if how in ("min", "max"):
+        # ufunc.at only takes its fast path when values already match the output dtype
+        ufunc = np.minimum if how == "min" else np.maximum
+        if not is_float:
+            # Every observed group has a value; unobserved slots keep the sentinel and are dropped
+            info = np.iinfo(np.int64)
+            out = np.full(size, info.max if how == "min" else info.min, dtype=np.int64)
+            ufunc.at(out, codes, values.astype(np.int64, copy=False))
+            return out
+        out = np.full(size, np.inf if how == "min" else -np.inf)
+        ufunc.at(out, codes, values.astype(np.float64, copy=False))
+        out[np.isinf(out)] = np.nan
+        return out
+    raise ValueError(f"Unknown reducer '{how}'")
+
+
+class GroupResult:
+    """Observed groups of a kernel run: one label array per key and one value array per column"""
+
+    def __init__(self, names, labels, columns):
+        self.names = names
+        self.labels = labels
+        self.columns = columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def arrays(self, column):
+        """(labels, values) of one column for a single-key grouping, ready to plot"""
+        return np.asarray(self.labels[0]), self.columns[column]
+
+    def frame(self):
+        """DataFrame indexed by the keys (CategoricalIndex/MultiIndex like a pandas groupby)"""
+        if len(self.names) == 1:
+            index = pd.Index(self.labels[0], name=self.names[0])
+        else:
+            index = pd.MultiIndex.from_arrays(self.labels, names=self.names)
+        return pd.DataFrame(self.columns, index=index, copy=False)
+
+
+def aggregate(keys, columns, names=None):
+    """Group rows by keys and reduce columns.
+
+    keys: list of key Series/arrays (categoricals use their codes directly).
+    columns: dict of output name -> (values, how) with how in sum, count,
+    min, max, or (None, "size") for the row count per group.
+    """
+    names = names or [getattr(k, "name", None) for k in keys]
+    codes, size, parts = group_codes(keys)
+    if (codes < 0).any():
+        keep = codes >= 0
+        codes = codes[keep]
+        columns = {c: (v if v is None else np.asarray(v)[keep], how) for c, (v, how) in columns.items()}
+
+    if size > MAX_GRID_RATIO * len(codes) + 1024:
+        cells, codes = np.unique(codes, return_inverse=True)
+        slots = len(cells)
+    else:
+        cells, slots = None, size
+    rows = np.bincount(codes, minlength=slots)
+    observed = np.flatnonzero(rows)
+
+    out = {}
+    for column, (values, how) in columns.items():
+        result = rows if how == "size" else reduce(codes, slots, values, how)
+        out[column] = result[observed]
+
+    # Decode the mixed-radix group codes back to one label array per key
+    remainder = observed if cells is None else cells[observed]
+    labels = []
+    for _, key_labels in reversed(parts):
+        n = _cardinality(key_labels)
+        labels.append(_decode(key_labels, remainder % n))
+        remainder = remainder // n
+    labels.reverse()
+    return GroupResult(list(names), labels, out)
+
+
+def verify(frame, keys, metrics, reducers=("sum", "count", "min", "max"), rtol=1e-9):
+    """Compare the kernel with pandas groupby(observed=True) for every metric and reducer.
+
+    Returns a list of (metric, how) mismatches; empty when the kernel agrees.
+    pandas runs on float64 copies of float metrics, as the kernel sums in float64.
+    """
+    frame = frame.astype({m: np.float64 for m in metrics if frame[m].dtype.kind == "f"})
+    columns = {f"{m}__{how}": (frame[m], how) for m in metrics for how in reducers}
+    result = aggregate([frame[k] for k in keys], columns, keys).frame()
+    mismatches = []
+    grouped = frame.groupby(keys, observed=True)
+    for m in metrics:
+        for how in reducers:
+            expected = grouped[m].agg(how)
+            got = result[f"{m}__{how}"]
+            if not (expected.index.equals(got.index) and
+                    np.allclose(got.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=rtol,
+                                equal_nan=True)):
+                mismatches.append((m, how))
+    return mismatches
@@ -0,0 +1,14 @@
+"""
+Gunicorn settings, read automatically from the working directory by the
+start commands in Procfile, render.yaml and the Dockerfile.
+"""
+
+# Import the app once in the master so workers share its modules copy-on-write.
+# The master builds no data and starts no threads, so forking stays safe.
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Each worker warms its own dataset, indexes and caches in the background"""
+    import app
+    app.WARM_UP.start()
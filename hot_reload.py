@@ -0,0 +1,208 @@
+"""
+Atomic hot reload of the dataset.
+
+A reload builds the new dataset off to the side, versions it by its
+content hash, prepares its indexes, cubes, layouts and default page results
+while the live dataset keeps serving, and then swaps the dataset reference
+in one assignment. Every cache keyed on the dataset version then drops the
+entries of older versions (see on_swap). Page callbacks pin the dataset
+they started with (see pin), so a callback running across a swap finishes
+against its own snapshot and caches its result under that snapshot's
+version. A reload whose data hashes to the live version changes nothing.
+
+Reloads are triggered by:
+
+    POST /admin/reload  with the RELOAD_TOKEN in an X-Reload-Token header;
+                        reloads this worker and touches the trigger file
+                        so the other workers follow
+    a file watch        every worker polls the dataset source files
+                        (DATA_EXCEL_PATH, DATA_SNAPSHOT_PATH) and the
+                        trigger file every RELOAD_WATCH_SECONDS
+
+GET /admin/reload reports the live version and the last reload.
+"""
+import functools
+import hmac
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from threading import Lock, Thread, local
+
+from flask import jsonify, request
+
+RELOAD_TOKEN = os.environ.get("RELOAD_TOKEN", "")
+RELOAD_WATCH_SECONDS = float(os.environ.get("RELOAD_WATCH_SECONDS", "5"))
+RELOAD_TRIGGER = os.environ.get("RELOAD_TRIGGER",
+                                os.path.join(tempfile.gettempdir(), "vaccine-dashboard-reload"))
+
+
+# 1. SNAPSHOT PINNING
+_pinned = local()
+
+
+@contextmanager
+def use(df):
+    """Make df the dataset of the current thread (see current)"""
+    previous = getattr(_pinned, "df", None)
+    _pinned.df = df
+    try:
+        yield df
+    finally:
+        _pinned.df = previous
+
+
+def current(get_live):
+    """The dataset pinned on this thread, or the live one"""
+    df = getattr(_pinned, "df", None)
+    return df if df is not None else get_live()
+
+
+def pin(get_live):
+    """Decorator running a callback against the dataset that was live when it started"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            if getattr(_pinned, "df", None) is not None:
+                return func(*args)
+            with use(get_live()):
+                return func(*args)
+        return wrapper
+    return decorator
+
+
+# 2. VERSIONED CACHE INVALIDATION
+_invalidators = []
+
+
+def on_swap(drop):
+    """Register drop(stale) to remove a cache's entries whose dataset version stale(version) rejects"""
+    _invalidators.append(drop)
+    return drop
+
+
+def base_version(version):
+    """Dataset version a derived version (e.g. a cube's "<version>#cube:<name>") belongs to"""
+    return version.split("#", 1)[0] if isinstance(version, str) else version
+
+
+def invalidate(live_version):
+    """Drop every registered cache's entries of versions other than live_version"""
+    def stale(version):
+        return base_version(version) != live_version
+    for drop in _invalidators:
+        drop(stale)
+
+
+# 3. RELOADER
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Reloader:
+    """Build, prepare and swap in a new dataset, one reload at a time.
+
+    load() returns the new dataset with attrs["dataset_version"] set,
+    prepare(df) builds its derived structures, swap(df) publishes it and
+    calls invalidate(), and get_live() returns the live dataset.
+    """
+
+    def __init__(self, load, prepare, swap, get_live, sources=()):
+        self.load, self.prepare, self.swap, self.get_live = load, prepare, swap, get_live
+        self.sources = [path for path in sources if path] + [RELOAD_TRIGGER]
+        self.signature = self.watch_signature()
+        self.running = False
+        self.last = None
+        self._lock = Lock()
+        self._watcher = None
+
+    def watch_signature(self):
+        return tuple(file_signature(path) for path in self.sources)
+
+    def reload(self, reason):
+        """Reload now; returns the report, or None when another reload is running"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        self.running = True
+        try:
+            self.signature = self.watch_signature()
+            start = time.perf_counter()
+            report = {"reason": reason, "started": time.time()}
+            try:
+                df = self.load()
+                loaded = time.perf_counter()
+                version = df.attrs.get("dataset_version")
+                if df.empty:
+                    raise RuntimeError("dataset is empty")
+                if version == self.get_live().attrs.get("dataset_version"):
+                    report.update(result="unchanged", version=version,
+                                  timings={"load": round(loaded - start, 3)})
+                else:
+                    self.prepare(df)
+                    prepared = time.perf_counter()
+                    self.swap(df)
+                    report.update(result="swapped", version=version, rows=len(df), timings={
+                        "load": round(loaded - start, 3), "prepare": round(prepared - loaded, 3),
+                        "swap": round(time.perf_counter() - prepared, 3)})
+                    print(f"[OK] Reloaded dataset {version} ({len(df):,} rows, {reason}): {report['timings']}")
+            except Exception as e:
+                report.update(result="failed", error=str(e))
+                print(f"[ERROR] Dataset reload ({reason}) failed, keeping the live dataset: {e}")
+            self.last = report
+            return report
+        finally:
+            self.running = False
+            self._lock.release()
+
+    def start(self, reason):
+        """Reload in a background thread; False when a reload is already running"""
+        if self.running:
+            return False
+        self.signature = self.watch_signature()
+        Thread(target=self.reload, args=(reason,), name="reload", daemon=True).start()
+        return True
+
+    def watch(self):
+        """Start polling the source and trigger files (once per process; RELOAD_WATCH_SECONDS=0 disables)"""
+        if self._watcher is not None or RELOAD_WATCH_SECONDS <= 0:
+            return
+        self.signature = self.watch_signature()
+        self._watcher = Thread(target=self._watch, name="reload-watch", daemon=True)
+        self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(RELOAD_WATCH_SECONDS)
+            if self.watch_signature() != self.signature:
+                self.reload("file change")
+
+    def status(self):
+        return {"status": "running" if self.running else "idle",
+                "version": self.get_live().attrs.get("dataset_version"),
+                "last": self.last}
+
+
+def touch_trigger():
+    """Signal the other workers' file watches to reload"""
+    with open(RELOAD_TRIGGER, "a"):
+        os.utime(RELOAD_TRIGGER)
+
+
+def add_reload_route(server, reloader):
+    """Register GET/POST /admin/reload on the Flask server"""
+
+    @server.route("/admin/reload", methods=["GET", "POST"])
+    def admin_reload():
+        if request.method == "GET":
+            return jsonify(reloader.status())
+        if not RELOAD_TOKEN:
+            return jsonify(error="reload endpoint disabled: set RELOAD_TOKEN"), 403
+        if not hmac.compare_digest(request.headers.get("X-Reload-Token", ""), RELOAD_TOKEN):
+            return jsonify(error="invalid reload token"), 403
+        touch_trigger()
+        started = reloader.start("admin endpoint")
+        return jsonify(dict(reloader.status(), accepted=started)), 202
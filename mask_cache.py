@@ -0,0 +1,147 @@
+"""
+Row-selection cache shared by every page.
+
+Selections are stored as packed row bitmaps (see bitmap_index) keyed on the
+frame's dataset version and the canonical set of (field, values) filters,
+so two pages filtering on the same fields share one entry. A query that
+adds filters to a cached selection starts from the largest cached subset
+and only ANDs in the remaining fields. Entries are evicted LRU under an
+entry and byte budget.
+"""
+import os
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+MAX_ENTRIES = int(os.environ.get("MASK_CACHE_ENTRIES", "512"))
+MAX_BYTES = int(float(os.environ.get("MASK_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def canonical_filters(filters):
+    """frozenset of (field, sorted values) for the non-empty filters"""
+    return frozenset(
+        (field, tuple(sorted(set(values), key=lambda v: (type(v).__name__, v))))
+        for field, values in filters.items() if values
+    )
+
+
+class MaskCache:
+    """LRU cache of packed selection bitmaps with subset reuse"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _best_subset(self, version, key):
+        """Largest cached proper subset of key for the same version, or (None, None)"""
+        best_key, best_words = None, None
+        for (entry_version, entry_key), words in self._entries.items():
+            if entry_version == version and entry_key < key:
+                if best_key is None or len(entry_key) > len(best_key):
+                    best_key, best_words = entry_key, words
+        return best_key, best_words
+
+    def get_or_build(self, version, key, field_words):
+        """Packed bitmap for the filter set `key`.
+
+        field_words(field, values) returns the packed bitmap of one filter;
+        it is only called for the filters not covered by a cached entry.
+        The returned array is shared and must not be modified.
+        """
+        with self._lock:
+            words = self._entries.get((version, key))
+            if words is not None:
+                self._entries.move_to_end((version, key))
+                self.hits += 1
+                return words
+            base_key, base_words = self._best_subset(version, key)
+            if base_key is not None:
+                self._entries.move_to_end((version, base_key))
+                self.partial_hits += 1
+            else:
+                self.misses += 1
+
+        remaining = sorted(key - base_key if base_key is not None else key, key=lambda item: item[0])
+        words = None if base_words is None else base_words.copy()
+        for field, values in remaining:
+            bitmap = field_words(field, list(values))
+            words = bitmap if words is None else np.bitwise_and(words, bitmap, out=words)
+        words.flags.writeable = False
+        self._put(version, key, words)
+        return words
+
+    def _put(self, version, key, words):
+        with self._lock:
+            if words.nbytes > self.max_bytes or self.max_entries <= 0:
+                return
+            old = self._entries.pop((version, key), None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._entries[(version, key)] = words
+            self.bytes += words.nbytes
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def drop_versions(self, stale):
+        """Drop the entries of dataset versions for which stale(version) is true"""
+        with self._lock:
+            # Keys are ((dataset version, rows), filters)
+            for key in [k for k in self._entries if stale(k[0][0])]:
+                self.bytes -= self._entries.pop(key).nbytes
+
+    def snapshot(self):
+        """Counters and entry keys, for changes() in a background job process"""
+        with self._lock:
+            return self.hits, self.partial_hits, self.misses, set(self._entries)
+
+    def changes(self, snapshot):
+        """Hits, partial hits, misses and ((version, key), bitmap) entries added since snapshot"""
+        hits, partial_hits, misses, keys = snapshot
+        with self._lock:
+            entries = [(k, words) for k, words in self._entries.items() if k not in keys]
+            return self.hits - hits, self.partial_hits - partial_hits, self.misses - misses, entries
+
+    def merge(self, changes):
+        """Add the counters and entries another process's changes() returned"""
+        hits, partial_hits, misses, entries = changes
+        with self._lock:
+            self.hits += hits
+            self.partial_hits += partial_hits
+            self.misses += misses
+        for (version, key), words in entries:
+            words.flags.writeable = False
+            self._put(version, key, words)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.partial_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "partial_hits": self.partial_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": (self.hits + self.partial_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every page and every frame (keys include the dataset version)
+MASK_CACHE = MaskCache()
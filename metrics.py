@@ -0,0 +1,312 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Page callbacks are timed per phase without any external service:
+
+    filter     resolving the selection (select_page, filter_dataframe)
+    aggregate  running the page's aggregation plan
+    figure     the rest of the callback body: KPI formatting, figure building
+    serialize  from the callback's return to the finished Dash response
+
+Phases are attributed to the callback running on the current thread; a
+result-cache hit records its latency but no filter/aggregate/figure phases.
+/metrics (a plain Flask route on app.server) renders the histograms and
+counters together with gauges read at scrape time: result/selection cache
+hit ratios, dataset build time and the worker's resident memory.
+
+A page callback running as a background job (background.py) records into
+the job process's registry; the worker that collects the job's result
+merges the increments into its own and records the serialize phase and
+payload size on that response. Every gunicorn worker keeps its own
+registry; series carry no worker label, so scrape each worker or
+aggregate across them.
+"""
+import functools
+import os
+import sys
+import time
+from contextlib import contextmanager
+from threading import Lock, local
+
+from flask import Response, g, has_request_context
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labelnames, k), v) for k, v in sorted(self._values.items())]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def changes(self, before):
+        with self._lock:
+            return {k: v - before.get(k, 0) for k, v in self._values.items() if v != before.get(k, 0)}
+
+    def merge(self, changes):
+        with self._lock:
+            for k, amount in changes.items():
+                self._values[k] = self._values.get(k, 0) + amount
+
+
+class Gauge:
+    """Value read at scrape time from a function returning {label values: value}, or set directly.
+
+    kind="counter" exposes a read value that only grows (e.g. a cache's hit count) as a counter.
+    """
+
+    def __init__(self, name, help, labels=(), read=None, kind="gauge"):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.kind = kind
+        self._read = read
+        self._values = {}
+
+    def set(self, value, **labels):
+        self._values[tuple(labels[n] for n in self.labelnames)] = value
+
+    def samples(self):
+        values = self._read() if self._read is not None else dict(self._values)
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in sorted(values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, counts):
+                    out.append((f"{self.name}_bucket", _labels(self.labelnames + ("le",), key + (_number(bound),)), n))
+                out.append((f"{self.name}_sum", _labels(self.labelnames, key), total))
+                out.append((f"{self.name}_count", _labels(self.labelnames, key), count))
+        return out
+
+    def snapshot(self):
+        with self._lock:
+            return {k: (list(counts), total, count) for k, (counts, total, count) in self._series.items()}
+
+    def changes(self, before):
+        empty = ([0] * len(self.buckets), 0.0, 0)
+        out = {}
+        with self._lock:
+            for k, (counts, total, count) in self._series.items():
+                old_counts, old_total, old_count = before.get(k, empty)
+                if count != old_count:
+                    out[k] = ([n - o for n, o in zip(counts, old_counts)], total - old_total, count - old_count)
+        return out
+
+    def merge(self, changes):
+        with self._lock:
+            for k, (counts, total, count) in changes.items():
+                series = self._series.setdefault(k, [[0] * len(self.buckets), 0.0, 0])
+                series[0] = [n + c for n, c in zip(series[0], counts)]
+                series[1] += total
+                series[2] += count
+
+
+REGISTRY = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def _recorded():
+    return [m for m in REGISTRY if isinstance(m, (Counter, Histogram))]
+
+
+def snapshot():
+    """State of the counters and histograms, for changes() in a background job process"""
+    return [m.snapshot() for m in _recorded()]
+
+
+def changes(before):
+    """Counter and histogram increments since snapshot() returned before"""
+    return [m.changes(b) for m, b in zip(_recorded(), before)]
+
+
+def merge(increments):
+    """Add the increments another process's changes() returned"""
+    for m, c in zip(_recorded(), increments):
+        m.merge(c)
+
+
+def render():
+    """All registered metrics in the Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# 1. CALLBACK METRICS
+CALLBACK_SECONDS = register(Histogram(
+    "dashboard_callback_seconds", "Page callback latency (result cache hits included)", ["callback"]))
+PHASE_SECONDS = register(Histogram(
+    "dashboard_callback_phase_seconds", "Page callback latency per phase", ["callback", "phase"]))
+PAYLOAD_BYTES = register(Histogram(
+    "dashboard_callback_payload_bytes", "Page callback response size", ["callback"], BYTES_BUCKETS))
+ROWS_SCANNED = register(Counter(
+    "dashboard_rows_scanned_total", "Rows (cube cells for cube pages) the selections were drawn from",
+    ["callback", "source"]))
+ROWS_SELECTED = register(Counter(
+    "dashboard_rows_selected_total", "Rows (cube cells for cube pages) the filters selected", ["callback", "source"]))
+
+_current = local()
+
+
+def current_callback():
+    return getattr(_current, "callback", None)
+
+
+def instrument(func):
+    """Time a page callback and its phases; mark the request for the serialize phase and payload size"""
+    @functools.wraps(func)
+    def wrapper(*args):
+        name = func.__name__
+        _current.callback, _current.phases = name, {}
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            end = time.perf_counter()
+            phases, _current.callback, _current.phases = _current.phases, None, None
+            CALLBACK_SECONDS.observe(end - start, callback=name)
+            if phases:
+                for phase, seconds in phases.items():
+                    PHASE_SECONDS.observe(seconds, callback=name, phase=phase)
+                PHASE_SECONDS.observe(max(end - start - sum(phases.values()), 0.0), callback=name, phase="figure")
+            mark_response(name, end)
+    return wrapper
+
+
+def mark_response(name, returned=None):
+    """Record the serialize phase and payload size of callback name on the current response"""
+    if has_request_context():
+        g.metrics_callback = (name, time.perf_counter() if returned is None else returned)
+
+
+@contextmanager
+def phase(name):
+    """Add the enclosed time to a phase of the callback running on this thread (no-op outside one)"""
+    phases = getattr(_current, "phases", None)
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_rows(scanned, selected, source):
+    """Count the rows a callback's selection was drawn from and the rows it kept"""
+    name = current_callback()
+    if name is not None:
+        ROWS_SCANNED.inc(scanned, callback=name, source=source)
+        ROWS_SELECTED.inc(selected, callback=name, source=source)
+
+
+# 2. PROCESS METRICS
+def resident_bytes():
+    """Current resident set size (peak RSS where /proc is unavailable, 0 on Windows)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+DATASET_BUILD_SECONDS = register(Gauge(
+    "dashboard_dataset_build_seconds", "Time the last dataset build (or snapshot load) took"))
+register(Gauge("process_resident_memory_bytes", "Worker resident set size", read=lambda: {(): resident_bytes()}))
+
+
+def add_cache_gauges(caches):
+    """Hit ratio, hit/miss counts and sizes of named caches exposing stats()"""
+    def read(field):
+        return lambda: {(name,): cache.stats()[field] for name, cache in caches.items()}
+    register(Gauge("dashboard_cache_hit_ratio", "Cache hit ratio since start", ["cache"], read("hit_ratio")))
+    register(Gauge("dashboard_cache_hits_total", "Cache hits", ["cache"], read("hits"), kind="counter"))
+    register(Gauge("dashboard_cache_misses_total", "Cache misses", ["cache"], read("misses"), kind="counter"))
+    register(Gauge("dashboard_cache_entries", "Cache entries", ["cache"], read("entries")))
+    register(Gauge("dashboard_cache_bytes", "Cache size in bytes", ["cache"], read("bytes")))
+
+
+# 3. ENDPOINT
+def add_metrics_route(server):
+    """Register /metrics and the response hook that records the serialize phase and payload size"""
+
+    @server.after_request
+    def record_response(response):
+        marked = g.pop("metrics_callback", None)
+        if marked is not None:
+            name, returned = marked
+            PHASE_SECONDS.observe(time.perf_counter() - returned, callback=name, phase="serialize")
+            PAYLOAD_BYTES.observe(response.calculate_content_length() or 0, callback=name)
+        return response
+
+    @server.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype=None, content_type=CONTENT_TYPE)
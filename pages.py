@@ -3,6 +3,10 @@ All page layouts for the dashboard based on Data-Vaccine.xlsx structure
 """
 from dash import dcc, html
 import dash_bootstrap_components as dbc
+import approx
+import background
+import bitmap_index
+import callbacks
 
 def create_filter_row(page_prefix, df, filter_configs):
     """Create a row of filters based on configuration"""
@@ -12,11 +16,13 @@ def create_filter_row(page_prefix, df, filter_configs):
         label = config['label']
         placeholder = config.get('placeholder', f"Select {label.lower()}...")
         
+        # Dimension dictionary built once per dataset version, no scan of the rows
+        values = bitmap_index.index_for(df).values(field)
         # Special handling for year field - need to sort numerically
         if field == 'year':
-            options = [{"label": str(int(val)), "value": val} for val in sorted(df[field].unique())]
+            options = [{"label": str(int(val)), "value": int(val)} for val in values]
         else:
-            options = [{"label": val, "value": val} for val in sorted(df[field].unique())]
+            options = [{"label": val, "value": val} for val in values]
         
         col = dbc.Col([
             html.Label(f"{label}:", className="filter-label"),
@@ -60,6 +66,9 @@ def epidemiology_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("epi"),
+            *approx.components("epi"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Total Prevalence", className="kpi-label"),
@@ -91,6 +100,9 @@ def epidemiology_page(df):
             ])
         ], style={"padding": "20px"}),
         
+        # Client-side mode: pre-aggregated cells answered in the browser
+        *callbacks.client_stores("epi", "epidemiology", df),
+        
         html.Div(className="footer")
     ])
 
@@ -121,6 +133,9 @@ def vaccination_rate_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("vax"),
+            *approx.components("vax"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Avg Vaccination Rate", className="kpi-label"),
@@ -152,6 +167,9 @@ def vaccination_rate_page(df):
             ])
         ], style={"padding": "20px"}),
         
+        # Client-side mode: pre-aggregated cells answered in the browser
+        *callbacks.client_stores("vax", "vaccination_rate", df),
+        
         html.Div(className="footer")
     ])
 
@@ -184,6 +202,9 @@ def pricing_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("price"),
+            *approx.components("price"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Avg Price (USD)", className="kpi-label"),
@@ -247,6 +268,9 @@ def cagr_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("cagr"),
+            *approx.components("cagr"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Avg CAGR %", className="kpi-label"),
@@ -310,6 +334,9 @@ def msa_comparison_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("msa"),
+            *approx.components("msa"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Total Value (USD)", className="kpi-label"),
@@ -373,6 +400,9 @@ def procurement_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("proc"),
+            *approx.components("proc"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Total Qty Procured", className="kpi-label"),
@@ -437,6 +467,9 @@ def brand_demographic_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("brand-demo"),
+            *approx.components("brand-demo"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Total Revenue (USD)", className="kpi-label"),
@@ -501,6 +534,9 @@ def fdf_page(df):
         
         # KPI Cards
         html.Div([
+            # Status badges: background job running, approximate accuracy
+            *background.components("fdf"),
+            *approx.components("fdf"),
             dbc.Row([
                 dbc.Col([html.Div([
                     html.P("Total Revenue (USD)", className="kpi-label"),
@@ -0,0 +1,301 @@
+"""
+Pluggable query backends for the page callbacks (QUERY_BACKEND).
+
+Every update_* callback resolves its filters through the configured backend
+and gets back a selection answering the cube.Selection interface:
+partials(keys, metrics, needs) for the aggregation plans, plus len/empty,
+rows() and nunique(dim). The scatter charts' density grids and stratified
+samples (see density.py) come from the backend too. Two backends are
+available:
+
+    pandas  (default) the in-process path: the page's OLAP cube when it
+            answers the filters, bitmap-indexed raw rows otherwise, grouped
+            by the bincount kernel
+    duckdb  an embedded DuckDB engine (optional `duckdb` package, no server)
+            scanning the dataset's columns in place - the memory-mapped
+            snapshot columns when the dataset comes from a snapshot - with
+            filter + group + aggregate pushed into one multithreaded SQL
+            query per base grouping
+
+verify() runs the page callbacks on both backends over a filter corpus and
+reports every output that differs (benchmarks/bench_backends.py).
+"""
+import math
+import os
+from threading import local
+
+import numpy as np
+import pandas as pd
+
+import aggregation
+import cube
+import density
+import filtered_view
+import metrics
+import schema
+
+QUERY_BACKEND = os.environ.get("QUERY_BACKEND", "pandas").lower()
+# DuckDB worker threads per query (default: DuckDB's own, the CPU count)
+DUCKDB_THREADS = int(os.environ.get("DUCKDB_THREADS", "0"))
+
+
+class PandasBackend:
+    """Cube cells when the page's cube answers the filters, raw rows otherwise"""
+
+    name = "pandas"
+
+    def select(self, df, filters, dims, metric_names):
+        page_cube = cube.cube_for(df, dims, metric_names)
+        if page_cube is not None and page_cube.answers(filters):
+            selection = page_cube.select(filters)
+            metrics.record_rows(len(page_cube.cells), len(selection), "cube")
+        else:
+            selection = cube.raw_selection(df, filters, dims + metric_names)
+            metrics.record_rows(len(df), len(selection), "raw")
+        return selection
+
+    def density(self, df, filters, x, y, color, size, bins):
+        """density.Grid of the matching rows"""
+        points = filtered_view.filter_view(df, filters, [x, y, color, size])
+        return density.bin_points(points[x], points[y], points[color], points[size], bins)
+
+    def stratified_sample(self, df, filters, columns, color, n):
+        """Frame of the matching rows' stratified sample by color (see density.stratified_positions)"""
+        points = filtered_view.filter_view(df, filters, [color, "record_id"])
+        picked = density.stratified_positions(points[color], points["record_id"], n)
+        if points.positions is not None:
+            picked = points.positions[picked]
+        return filtered_view.FilteredView(df, picked, columns).frame()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+class DuckDBSelection(cube.Selection):
+    """Selection whose queries run as SQL over the registered dataset"""
+
+    def __init__(self, backend, df, where, params):
+        self._backend = backend
+        self._df = df
+        self._where = where
+        self._params = params
+        self._rows = None
+
+    def _query(self, sql, params=()):
+        return self._backend.query(self._df, sql, list(params) + self._params)
+
+    def __len__(self):
+        """Selected rows"""
+        if self._rows is None:
+            self._rows = int(self._query(f"SELECT COUNT(*) AS n FROM dataset{self._where}")["n"].iloc[0])
+        return self._rows
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def rows(self):
+        return len(self)
+
+    def nunique(self, dim):
+        column = _quote(schema.resolve(dim))
+        return int(self._query(f"SELECT COUNT(DISTINCT {column}) AS n FROM dataset{self._where}")["n"].iloc[0])
+
+    def partials(self, keys, metrics, needs=None):
+        """Row count plus the partials of each metric per keys, in one GROUP BY"""
+        select = [f"COUNT(*) AS {_quote(aggregation.ROWS)}"]
+        for m in metrics:
+            integer = pd.api.types.is_integer_dtype(self._df[m].dtype)
+            value = f"CAST({_quote(m)} AS {'BIGINT' if integer else 'DOUBLE'})"
+            for how in (aggregation.PARTIALS if needs is None else needs[m]):
+                column = _quote(aggregation.partial_column(m, how))
+                if how == "sum":
+                    total = f"CAST(SUM({value}) AS BIGINT)" if integer else f"SUM({value})"
+                    select.append(f"COALESCE({total}, 0) AS {column}")
+                elif how == "count":
+                    select.append(f"COUNT({value}) AS {column}")
+                else:
+                    select.append(f"{how.upper()}({value}) AS {column}")
+        if not keys:
+            return self._query(f"SELECT {', '.join(select)} FROM dataset{self._where}")
+        # Categoricals are registered as their codes, so the groups come back in category order
+        group = ", ".join(_quote(k) for k in keys)
+        frame = self._query(f"SELECT {group}, {', '.join(select)} FROM dataset{self._where} "
+                            f"GROUP BY {group} ORDER BY {group}")
+        categorical = [k for k in keys if isinstance(self._df[k].dtype, pd.CategoricalDtype)]
+        if categorical:
+            # Missing labels (code -1) form no group, as in the bincount kernel
+            keep = np.logical_and.reduce([frame[k].to_numpy() >= 0 for k in categorical])
+            if not keep.all():
+                frame = frame[keep].copy()
+            for k in categorical:
+                frame[k] = np.asarray(self._df[k].cat.categories)[frame[k].to_numpy()]
+        return frame.set_index(keys)
+
+
+class DuckDBBackend:
+    """Filter + group + aggregate in an embedded, in-process DuckDB engine"""
+
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self._duckdb = duckdb
+        self._local = local()
+
+    def _connection(self, df):
+        """This thread's connection, with df registered as the `dataset` view (zero-copy scan)"""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._local.con = self._duckdb.connect()
+            if DUCKDB_THREADS > 0:
+                con.execute(f"SET threads TO {DUCKDB_THREADS}")
+            self._local.df = None
+        if self._local.df is not df:
+            con.register("dataset", self.scan_frame(df))
+            self._local.df = df
+        return con
+
+    @staticmethod
+    def scan_frame(df):
+        """df with each categorical replaced by its integer codes (DuckDB scans numeric arrays in place)"""
+        columns = {}
+        for name in df.columns:
+            series = df[name]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                series = pd.Series(series.cat.codes.to_numpy(), name=name, copy=False)
+            columns[name] = series
+        return pd.DataFrame(columns, copy=False)
+
+    def query(self, df, sql, params):
+        return self._connection(df).execute(sql, params).df()
+
+    def where(self, df, filters):
+        """SQL WHERE clause and parameters of the non-empty filters (categoricals compare codes)"""
+        clauses, params = [], []
+        for field, values in filters.items():
+            if not values:
+                continue
+            name = schema.resolve(field)
+            if isinstance(df[name].dtype, pd.CategoricalDtype):
+                categories = df[name].cat.categories
+                values = [int(code) for code in categories.get_indexer(list(values)) if code >= 0]
+            else:
+                values = [v.item() if isinstance(v, np.generic) else v for v in values]
+            if not values:
+                clauses.append("FALSE")
+                continue
+            clauses.append(f"{_quote(name)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def select(self, df, filters, dims, metric_names):
+        where, params = self.where(df, filters)
+        selection = DuckDBSelection(self, df, where, params)
+        metrics.record_rows(len(df), len(selection), "duckdb")
+        return selection
+
+    @staticmethod
+    def _and(where, clause):
+        return f"{where} AND {clause}" if where else f" WHERE {clause}"
+
+    def density(self, df, filters, x, y, color, size, bins):
+        """density.Grid of the matching rows, binned by one GROUP BY (same bin arithmetic as numpy)"""
+        x, y, color, size = (schema.resolve(c) for c in (x, y, color, size))
+        cx, cy = (f"CAST({_quote(c)} AS DOUBLE)" for c in (x, y))
+        where, params = self.where(df, filters)
+        # NaN is scanned as NULL, and isnan(NULL) leaves the row out
+        where = self._and(where, f"NOT isnan({cx}) AND NOT isnan({cy}) AND {_quote(color)} >= 0")
+        bounds = self.query(df, f"SELECT COUNT(*) AS n, MIN({cx}) AS x0, MAX({cx}) AS x1, "
+                                f"MIN({cy}) AS y0, MAX({cy}) AS y1 FROM dataset{where}", params).iloc[0]
+        if bounds["n"] == 0:
+            return density.empty_grid(bins)
+        x_axis, y_axis = density.extent(bounds["x0"], bounds["x1"]), density.extent(bounds["y0"], bounds["y1"])
+
+        def bin_of(column):
+            return f"LEAST(GREATEST(CAST(FLOOR(({column} - ?) / ?) AS BIGINT), 0), {int(bins) - 1})"
+
+        cells = self.query(df, f"SELECT {_quote(color)} AS c, {bin_of(cx)} AS x_bin, {bin_of(cy)} AS y_bin, "
+                               f"COUNT(*) AS n, COALESCE(SUM(CAST({_quote(size)} AS DOUBLE)), 0) AS s "
+                               f"FROM dataset{where} GROUP BY ALL",
+                           [x_axis[0], x_axis[1] / bins, y_axis[0], y_axis[1] / bins] + params)
+        return density.from_cells(x_axis, y_axis, list(df[color].cat.categories), cells["c"].to_numpy(),
+                                  cells["x_bin"].to_numpy(), cells["y_bin"].to_numpy(), cells["n"].to_numpy(),
+                                  cells["s"].to_numpy(), bins)
+
+    def stratified_sample(self, df, filters, columns, color, n):
+        """Frame of the matching rows' stratified sample by color, picked with a window query"""
+        physical = [schema.resolve(c) for c in columns]
+        name = schema.resolve(color)
+        color = _quote(name)
+        where, params = self.where(df, filters)
+        where = self._and(where, f"{color} >= 0")
+        counts = self.query(df, f"SELECT {color} AS c, COUNT(*) AS n FROM dataset{where} GROUP BY ALL", params)
+        group_rows = np.zeros(len(df[name].cat.categories), dtype=np.int64)
+        group_rows[counts["c"].to_numpy()] = counts["n"].to_numpy()
+        take = [int(t) for t in density.allocate(group_rows, n)]
+        # density.is_picked on each row's rank within its color value, in record_id order
+        selected = ", ".join(_quote(c) for c in dict.fromkeys(physical))
+        frame = self.query(df, f"SELECT {selected} FROM (SELECT {selected}, record_id AS _order, "
+                               f"row_number() OVER (PARTITION BY {color} ORDER BY record_id) - 1 AS _rank, "
+                               f"COUNT(*) OVER (PARTITION BY {color}) AS _rows, "
+                               f"list_extract(?::BIGINT[], {color} + 1) AS _take FROM dataset{where}) "
+                               f"WHERE (_rank = 0 AND _take > 0) "
+                               f"OR (_rank * _take) // _rows > ((_rank - 1) * _take) // _rows "
+                               f"ORDER BY _order", [take] + params)
+        for name in frame.columns:
+            if isinstance(df[name].dtype, pd.CategoricalDtype):
+                frame[name] = pd.Categorical.from_codes(frame[name].to_numpy(), dtype=df[name].dtype)
+        for alias, name in zip(columns, physical):
+            if alias != name:
+                frame[alias] = frame[name]
+        return frame
+
+
+BACKENDS = {"pandas": PandasBackend, "duckdb": DuckDBBackend}
+
+
+def backend_for(name):
+    """Backend instance by name; pandas when the name is unknown or duckdb is not installed"""
+    if name not in BACKENDS:
+        print(f"[ERROR] Unknown QUERY_BACKEND '{name}', using pandas")
+        name = "pandas"
+    try:
+        return BACKENDS[name]()
+    except ImportError:
+        print(f"[ERROR] QUERY_BACKEND={name} needs the '{name}' package; using pandas")
+        return PandasBackend()
+
+
+def _differs(a, b, rtol):
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() != b.keys() or any(_differs(a[k], b[k], rtol) for k in a)
+    if isinstance(a, (list, tuple, np.ndarray)) and isinstance(b, (list, tuple, np.ndarray)):
+        return len(a) != len(b) or any(_differs(x, y, rtol) for x, y in zip(a, b))
+    if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)) \
+            and not isinstance(a, bool) and not isinstance(b, bool):
+        if math.isnan(a) or math.isnan(b):
+            return not (math.isnan(a) and math.isnan(b))
+        return not math.isclose(a, b, rel_tol=rtol, abs_tol=1e-9)
+    return a != b
+
+
+def verify(runs, reference="pandas", rtol=1e-9):
+    """Compare callback outputs across backends.
+
+    runs: {backend name: {(callback, case label): outputs}}. Returns
+    (callback, case, output index, backend) for every output that differs
+    from the reference backend's.
+    """
+    mismatches = []
+    for name, outputs in runs.items():
+        if name == reference:
+            continue
+        for (callback, case), values in outputs.items():
+            expected = runs[reference][(callback, case)]
+            for i, (got, want) in enumerate(zip(values, expected)):
+                if _differs(got, want, rtol):
+                    mismatches.append((callback, case, i, name))
+    return mismatches
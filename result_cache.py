@@ -0,0 +1,147 @@
+"""
+Bounded LRU result cache for the page callbacks.
+
+Callback results are keyed on the callback name, the dataset version and a
+canonical form of the filter inputs (sorted, de-duplicated value lists with
+None and [] treated the same). The cache evicts least recently used entries
+when either the entry budget or the byte budget is exceeded, and keeps hit,
+miss and eviction counters for sizing it in production.
+"""
+import functools
+import os
+from collections import OrderedDict
+from threading import Lock
+
+from plotly.io.json import to_json_plotly
+
+MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_ENTRIES", "256"))
+MAX_BYTES = int(float(os.environ.get("RESULT_CACHE_MB", "64")) * 1024 * 1024)
+
+
+def canonical_value(value):
+    """Canonical, hashable form of one callback input"""
+    if value is None or value == []:
+        return None
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(set(value), key=lambda v: (type(v).__name__, v)))
+    return value
+
+
+def canonical_args(args):
+    return tuple(canonical_value(a) for a in args)
+
+
+def result_nbytes(result):
+    """Size of a callback result as Dash would serialize it"""
+    try:
+        return len(to_json_plotly(result))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ResultCache:
+    """Thread-safe LRU cache with an entry budget and a byte budget"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (True, value) on a hit and (False, None) on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value, nbytes):
+        with self._lock:
+            if nbytes > self.max_bytes or self.max_entries <= 0:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, nbytes)
+            self.bytes += nbytes
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.bytes -= evicted_bytes
+                self.evictions += 1
+
+    def contains(self, key):
+        """True when key is cached (not counted as a hit or a miss)"""
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def drop_versions(self, stale):
+        """Drop the entries of dataset versions for which stale(version) is true"""
+        with self._lock:
+            for key in [k for k in self._entries if stale(k[1])]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def snapshot(self):
+        """Counters and entry keys, for changes() in a background job process"""
+        with self._lock:
+            return self.hits, self.misses, set(self._entries)
+
+    def changes(self, snapshot):
+        """Hits, misses and (key, value, nbytes) entries added since snapshot"""
+        hits, misses, keys = snapshot
+        with self._lock:
+            entries = [(k, value, nbytes) for k, (value, nbytes) in self._entries.items() if k not in keys]
+            return self.hits - hits, self.misses - misses, entries
+
+    def merge(self, changes):
+        """Add the hits, misses and entries another process's changes() returned"""
+        hits, misses, entries = changes
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+        for key, value, nbytes in entries:
+            self.put(key, value, nbytes)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def memoize(cache, get_version):
+    """Decorator caching a callback's outputs per (name, dataset version, canonical inputs)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = (func.__name__, get_version(), canonical_args(args))
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            value = func(*args)
+            cache.put(key, value, result_nbytes(value))
+            return value
+        # Carried through functools.wraps by the outer decorators
+        wrapper.is_cached = lambda *args: cache.contains((func.__name__, get_version(), canonical_args(args)))
+        return wrapper
+    return decorator
@@ -0,0 +1,118 @@
+"""
+Compact in-memory schema for the vaccine market dataset.
+
+Dimension columns are stored as pd.Categorical with fixed (sorted) category
+orders, numeric columns are downcast to the smallest width that round-trips
+their values, and the alias columns the callbacks use (market, formulation,
+value, share, yoy) are resolved by name instead of being stored twice.
+"""
+import numpy as np
+import pandas as pd
+
+import data_generator as dg
+
+# Bump whenever the category orders, dtypes or alias set change
+SCHEMA_VERSION = 1
+
+# Alias name -> physical column
+ALIASES = {
+    "market": "disease",
+    "formulation": "fdf",
+    "value": "market_value_usd",
+    "share": "market_share_pct",
+    "yoy": "yoy_growth",
+}
+
+# Categories are sorted so groupby output keeps the same order as the old object columns
+DIMENSIONS = {
+    "region": sorted(dg.REGIONS),
+    "country": sorted(c for countries in dg.COUNTRY_INCOME_MAP.values() for c in countries),
+    "income_type": sorted({i for countries in dg.COUNTRY_INCOME_MAP.values() for i in countries.values()}),
+    "disease": sorted(dg.DISEASES),
+    "brand": sorted(b for brands in dg.BRAND_MAP.values() for b in brands),
+    "company": sorted(dg.COMPANIES),
+    "age_group": sorted(dg.AGE_GROUPS),
+    "gender": sorted(dg.GENDERS),
+    "segment": sorted(dg.SEGMENTS),
+    "segment_by": sorted({"male", "female"}
+                         | {b for brands in dg.BRAND_MAP.values() for b in brands}
+                         | set(dg.AGE_GROUPS)),
+    "roa": sorted(dg.ROA_TYPES),
+    "fdf": sorted(dg.FDF_TYPES),
+    "procurement": sorted(dg.PROCUREMENT_TYPES),
+    "public_private": ["Private", "Public"],
+    "price_class": ["Budget", "Premium", "Standard"],
+}
+
+# Decimal places the float metrics are rounded to; used to check a downcast is lossless
+FLOAT_DECIMALS = 2
+
+
+def resolve(name):
+    """Map an alias column name to the physical column that stores it"""
+    return ALIASES.get(name, name)
+
+
+def category_dtype(column, values=None):
+    """Fixed CategoricalDtype for a dimension, falling back to the sorted observed values"""
+    categories = DIMENSIONS.get(column)
+    if categories is None or (values is not None and not set(pd.unique(values)) <= set(categories)):
+        categories = sorted(pd.unique(values))
+    return pd.CategoricalDtype(categories, ordered=False)
+
+
+def downcast_numeric(series):
+    """Return series in the smallest numeric dtype that holds its values exactly"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series.dtype) and series.dtype != np.float32:
+        values = series.to_numpy()
+        narrow = values.astype(np.float32)
+        if np.array_equal(np.round(narrow.astype(np.float64), FLOAT_DECIMALS), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def compact(df):
+    """Convert a generated/ingested frame to the compact schema (drops stored aliases)"""
+    columns = {}
+    for name in df.columns:
+        if name in ALIASES and ALIASES[name] in df.columns:
+            continue
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[name] = series
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            columns[name] = downcast_numeric(series)
+        else:
+            columns[name] = series.astype(category_dtype(name, series))
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def with_aliases(frame):
+    """Add alias columns to a private per-request frame; never call on the shared dataset"""
+    for alias, source in ALIASES.items():
+        if source in frame.columns and alias not in frame.columns:
+            frame[alias] = frame[source]
+    return frame
+
+
+def memory_report(before, after):
+    """Per-column deep memory usage of two frames, with aliases resolved in `after`"""
+    rows = []
+    for name in before.columns:
+        physical = resolve(name) if name not in after.columns else name
+        stored = name in after.columns
+        before_bytes = int(before[name].memory_usage(index=False, deep=True))
+        after_bytes = int(after[physical].memory_usage(index=False, deep=True)) if stored else 0
+        rows.append({
+            "column": name,
+            "dtype_before": str(before[name].dtype),
+            "dtype_after": str(after[physical].dtype) if stored else f"alias of {physical}",
+            "bytes_before": before_bytes,
+            "bytes_after": after_bytes,
+        })
+    report = pd.DataFrame(rows)
+    report.loc[len(report)] = ["TOTAL", "", "", report["bytes_before"].sum(), report["bytes_after"].sum()]
+    report["ratio"] = (report["bytes_before"] / report["bytes_after"].where(report["bytes_after"] > 0)).round(1)
+    return report
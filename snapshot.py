@@ -0,0 +1,153 @@
+"""
+Columnar on-disk dataset snapshot shared by all gunicorn workers.
+
+The dataset is built once and written as one .npy file per column plus a
+manifest.json. Every worker then opens the numeric columns with
+np.load(mmap_mode='r'), so the OS page cache holds a single shared copy
+instead of one private DataFrame per worker. Dimension columns are stored
+as their categorical codes with the categories listed in the manifest, so
+they are memory-mapped too.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from data_generator import GENERATOR_VERSION, SEED
+from schema import SCHEMA_VERSION
+
+# Bump whenever the on-disk layout changes
+SNAPSHOT_FORMAT = 2
+
+SNAPSHOT_ENABLED = os.environ.get("DATA_SNAPSHOT", "1").lower() not in ("0", "false", "no")
+SNAPSHOT_DIR = os.environ.get("DATA_SNAPSHOT_DIR",
+                              os.path.join(tempfile.gettempdir(), "vaccine-dashboard-snapshot"))
+# A prebuilt snapshot (e.g. from chunked_generator.py) served instead of the generated dataset
+SNAPSHOT_PATH = os.environ.get("DATA_SNAPSHOT_PATH")
+
+MANIFEST = "manifest.json"
+
+
+def snapshot_version():
+    """Version key of the snapshot; a new generator, schema or format means a new snapshot directory"""
+    return f"gen{GENERATOR_VERSION}-seed{SEED}-schema{SCHEMA_VERSION}-fmt{SNAPSHOT_FORMAT}"
+
+
+def content_version(df):
+    """Dataset version derived from the data itself: equal contents, equal version"""
+    digest = hashlib.blake2b(digest_size=8)
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            digest.update(json.dumps([name, series.cat.categories.tolist()]).encode())
+            values = series.cat.codes.to_numpy()
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            digest.update(json.dumps([name, str(series.dtype)]).encode())
+            values = series.to_numpy()
+        else:
+            digest.update(json.dumps([name, "object"]).encode())
+            values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        digest.update(np.ascontiguousarray(values).data)
+    return f"data-{digest.hexdigest()}"
+
+
+def _codes_dtype(n_categories):
+    """Smallest signed integer type that holds the category codes (-1 is reserved for missing)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def write_snapshot(df, path, version):
+    """Write df to path as one .npy file per column plus a manifest"""
+    os.makedirs(path, exist_ok=True)
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        filename = f"{i:03d}.npy"
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes, categories = series.cat.codes.to_numpy(), series.cat.categories
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            np.save(os.path.join(path, filename), np.ascontiguousarray(series.to_numpy()))
+            columns.append({"name": name, "file": filename, "kind": "numeric"})
+            continue
+        else:
+            codes, categories = pd.factorize(series, sort=True)
+        np.save(os.path.join(path, filename), codes.astype(_codes_dtype(len(categories)), copy=False))
+        columns.append({"name": name, "file": filename, "kind": "categorical",
+                        "categories": categories.tolist()})
+    manifest = {"version": version, "rows": len(df), "columns": columns}
+    # Manifest last: a directory without one is an incomplete write
+    with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def read_manifest(path):
+    """Return the manifest of the snapshot at path, or None if it is missing or unreadable"""
+    try:
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_snapshot(path):
+    """Open the snapshot at path; numeric columns stay memory-mapped and read-only"""
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {path}")
+    data = {}
+    for column in manifest["columns"]:
+        values = np.load(os.path.join(path, column["file"]), mmap_mode="r")
+        if column["kind"] == "categorical":
+            # from_codes keeps the memory-mapped codes array as-is
+            values = pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(column["categories"]))
+        data[column["name"]] = values
+    # copy=False keeps one block per column so the memory maps are not consolidated into a private copy
+    return pd.DataFrame(data, copy=False)
+
+
+def _remove_stale(root, keep):
+    """Best-effort cleanup of snapshots written by older generator/format versions"""
+    try:
+        entries = os.listdir(root)
+    except OSError:
+        return
+    for entry in entries:
+        if entry != keep and not entry.startswith("."):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def load_or_build(build_func, root=SNAPSHOT_DIR, version=None):
+    """Load the current snapshot from root, building and publishing it first if needed.
+
+    Workers race safely without a lock: each one that finds no snapshot
+    writes into a private temporary directory and renames it into place.
+    The first rename wins and the others discard their copy.
+    """
+    version = version or snapshot_version()
+    path = os.path.join(root, version)
+    manifest = read_manifest(path)
+    if manifest is None or manifest.get("version") != version:
+        df = build_func()
+        os.makedirs(root, exist_ok=True)
+        tmp_path = os.path.join(root, f".tmp-{version}-{uuid.uuid4().hex}")
+        try:
+            write_snapshot(df, tmp_path, version)
+            if os.path.isdir(path) and read_manifest(path) is None:
+                shutil.rmtree(path, ignore_errors=True)
+            os.rename(tmp_path, path)
+            print(f"[OK] Wrote dataset snapshot {version} to {path}")
+        except OSError:
+            # Another worker published first (or the rename failed); use whatever is in place
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        _remove_stale(root, version)
+        if read_manifest(path) is None:
+            return df
+    return load_snapshot(path)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Query Backend Parity Check
+Runs every update_* page callback over the benchmark filter corpus on the
+pandas and DuckDB backends and fails on any output that differs; skipped
+(exit 0) when duckdb is not installed
+
+Usage: python verify_backends.py [--scale N]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1, help="tile the dataset this many times")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("QUERY BACKEND PARITY CHECK")
+    print("=" * 70)
+    if importlib.util.find_spec("duckdb") is None:
+        print("[SKIPPED] duckdb is not installed (pip install duckdb); only the pandas backend is available")
+        return True
+
+    import app
+    import query_backend
+    from bench_backends import run_backends
+    from bench_callbacks import scaled
+
+    base = app.get_data()
+    if base.empty:
+        print("[FAILED] Dataset could not be generated")
+        return False
+    df = scaled(base, args.scale) if args.scale > 1 else base
+    app.swap_data(df)
+    result = run_backends(df, ["pandas", "duckdb"], repeat=1)
+    app.swap_data(base)
+    if result is None:
+        print("[FAILED] The duckdb backend could not be created")
+        return False
+    runs, _ = result
+
+    mismatches = query_backend.verify(runs, reference="pandas")
+    for callback, case, output, backend in mismatches:
+        print(f"[MISMATCH] {callback} output {output} ({case}): {backend} differs from pandas")
+    print("=" * 70)
+    if mismatches:
+        print(f"[FAILED] {len(mismatches)} outputs differ between pandas and duckdb")
+        return False
+    print(f"[SUCCESS] {len(runs['pandas']):,} callback calls identical on pandas and duckdb")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
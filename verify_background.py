@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Background Callback Check
+Drives the pricing page callback through Dash's background-callback protocol
+(/_dash-update-component, then polls for the job's result) and fails unless
+the worker's result cache, selection cache and /metrics still see the calls
+that ran in job processes; skipped (exit 0) when background callbacks are off
+
+Usage: python verify_background.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Exact answers only: the approximate pass is a separate callback
+os.environ.setdefault("APPROX_MODE", "0")
+
+PREFIX = "price"
+FILTER = "price-year-filter"
+POLL_SECONDS = 30
+
+
+def callback_key(callback_map):
+    return next(k for k in callback_map if k.startswith(f"..{PREFIX}-kpi-1.children"))
+
+
+def request_body(callback_map, key, years):
+    spec = callback_map[key]
+    outputs = [{"id": o.split(".")[0], "property": o.split(".")[1]} for o in key.strip(".").split("...")]
+    inputs = [dict(i, value=years if i["id"] == FILTER else None) for i in spec["inputs"]]
+    return {"output": key, "outputs": outputs, "inputs": inputs, "state": [],
+            "changedPropIds": [f"{FILTER}.value"]}
+
+
+def call(client, body):
+    """(job id, outputs) of one background call, polling like the browser does"""
+    start = client.post("/_dash-update-component", json=body).get_json()
+    deadline = time.time() + POLL_SECONDS
+    while time.time() < deadline:
+        url = f"/_dash-update-component?cacheKey={start['cacheKey']}&job={start['job']}"
+        data = client.post(url, json=body).get_json()
+        if data and "response" in data:
+            return start["job"], data["response"]
+        time.sleep(0.05)
+    raise TimeoutError(f"no result for job {start['job']} after {POLL_SECONDS}s")
+
+
+def scrape(client, callback):
+    text = client.get("/metrics").get_data(as_text=True)
+
+    def value(series):
+        match = re.search(r"^" + re.escape(series) + r" (\S+)$", text, re.M)
+        return float(match.group(1)) if match else 0.0
+    return {
+        "calls": value(f'dashboard_callback_seconds_count{{callback="{callback}"}}'),
+        "filter_phases": value(f'dashboard_callback_phase_seconds_count{{callback="{callback}",phase="filter"}}'),
+        "payloads": value(f'dashboard_callback_payload_bytes_count{{callback="{callback}"}}'),
+        "result_hits": value('dashboard_cache_hits_total{cache="result"}'),
+        "result_misses": value('dashboard_cache_misses_total{cache="result"}'),
+        "selection_lookups": value('dashboard_cache_hits_total{cache="selection"}')
+                             + value('dashboard_cache_misses_total{cache="selection"}'),
+    }
+
+
+def check(label, ok):
+    print(f"{'[OK]' if ok else '[FAILED]'} {label}")
+    return ok
+
+
+def main():
+    print("=" * 70)
+    print("BACKGROUND CALLBACK CHECK")
+    print("=" * 70)
+    import background
+    if not background.enabled():
+        print("[SKIPPED] Background callbacks are off (BACKGROUND_CALLBACKS=0 or dash[diskcache] missing)")
+        return True
+
+    import app
+    if app.get_data().empty:
+        print("[FAILED] Dataset could not be generated")
+        return False
+    background._disk_cache().clear()
+    client = app.server.test_client()
+    callback_map = app.app.callback_map
+    key = callback_key(callback_map)
+    callback = "update_pricing"
+    body = request_body(callback_map, key, [2024, 2025])
+
+    before = scrape(client, callback)
+    job, first = call(client, body)
+    after_job = scrape(client, callback)
+    answered, second = call(client, body)
+    after_hit = scrape(client, callback)
+
+    delta = lambda a, b, field: b[field] - a[field]  # noqa: E731
+    results = [
+        check("first call ran as a background job", int(job) > 0),
+        check("the job's result-cache miss reached the worker", delta(before, after_job, "result_misses") == 1),
+        check("the job's selection-cache lookups reached the worker", delta(before, after_job, "selection_lookups") > 0),
+        check("the job's callback_seconds and phases reached /metrics",
+              delta(before, after_job, "calls") == 1 and delta(before, after_job, "filter_phases") == 1),
+        check("repeat call answered from the result cache without a job",
+              int(answered) == background.ANSWERED and delta(after_job, after_hit, "result_hits") == 1),
+        check("repeat call counted in callback_seconds", delta(after_job, after_hit, "calls") == 1),
+        check("payload size recorded for both responses", delta(before, after_hit, "payloads") == 2),
+        check("repeat call returned the job's outputs", first == second),
+    ]
+    print("=" * 70)
+    if all(results):
+        print("[SUCCESS] Background jobs keep the worker's caches and metrics in use")
+        return True
+    print("[FAILED] Background jobs lose state the worker should keep")
+    return False
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
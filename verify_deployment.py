@@ -94,7 +94,7 @@ def main():
     print("Checking requirements.txt:")
     print("-" * 70)
     req_checks = check_file_content('requirements.txt', [
-        'dash==',
+        'dash[diskcache]==',
         'dash-bootstrap-components==',
         'plotly==',
         'pandas==',
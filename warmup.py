@@ -0,0 +1,108 @@
+"""
+Background warm-up and the liveness/readiness endpoints.
+
+A fresh process builds the dataset, its bitmap index, the page cubes and
+the page layouts in a background thread, so the first analysis request
+does not pay for them. The warm-up starts from gunicorn's post_fork hook
+(gunicorn.conf.py), from app.py's __main__, or on the first /readyz probe,
+whichever comes first; it runs once per process.
+
+    /healthz  200 as soon as the process serves HTTP (constant time)
+    /readyz   200 with the per-step build timings once every step finished,
+              503 while warming up or retrying a failed step
+
+A failed step (e.g. a transient error reading the data source) is retried
+in the same thread with exponential backoff, from WARMUP_RETRY_SECONDS
+doubling up to WARMUP_RETRY_MAX_SECONDS, until it succeeds; the steps
+before it are not rerun. /readyz reports the last error and the attempts
+meanwhile, so the process becomes ready on its own once the cause clears.
+
+Both are plain Flask routes on app.server: they bypass the Dash index page
+and callbacks and never touch the dataset themselves.
+"""
+import os
+import time
+from threading import Lock, Thread
+
+from flask import jsonify
+
+WARMUP_RETRY_SECONDS = float(os.environ.get("WARMUP_RETRY_SECONDS", "1"))
+WARMUP_RETRY_MAX_SECONDS = float(os.environ.get("WARMUP_RETRY_MAX_SECONDS", "60"))
+
+
+class WarmUp:
+    """Named build steps run once, in order, in a daemon thread; failed steps are retried"""
+
+    def __init__(self, steps, retry_seconds=WARMUP_RETRY_SECONDS, retry_max_seconds=WARMUP_RETRY_MAX_SECONDS):
+        self.steps = list(steps)
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.timings = {}
+        self.error = None
+        self.attempts = 0
+        self.ready = False
+        self._started = None
+        self._finished = None
+        self._thread = None
+        self._lock = Lock()
+
+    def start(self):
+        """Start the warm-up thread unless it already runs in this process"""
+        with self._lock:
+            if self._thread is None:
+                self._started = time.perf_counter()
+                self._thread = Thread(target=self._run, name="warm-up", daemon=True)
+                self._thread.start()
+        return self._thread
+
+    def _run(self):
+        print(f"[INFO] Warm-up started in process {os.getpid()}")
+        for name, step in self.steps:
+            delay = self.retry_seconds
+            while True:
+                start = time.perf_counter()
+                try:
+                    step()
+                    break
+                except Exception as e:
+                    self.error = f"{name}: {e}"
+                    self.attempts += 1
+                    print(f"[ERROR] Warm-up step '{name}' failed: {e}; retrying in {delay:g}s")
+                time.sleep(delay)
+                delay = min(delay * 2, self.retry_max_seconds)
+            self.timings[name] = round(time.perf_counter() - start, 3)
+        self.error = None
+        self._finished = time.perf_counter()
+        self.ready = True
+        print(f"[OK] Warm-up finished in {self._finished - self._started:.2f}s: {self.timings}")
+
+    def status(self):
+        """Readiness report: state, per-step timings in seconds and the elapsed/total time"""
+        if self.ready:
+            state = "ready"
+        elif self.error:
+            state = "retrying"
+        else:
+            state = "warming" if self._thread is not None else "idle"
+        report = {"status": state, "timings": dict(self.timings)}
+        if self._started is not None:
+            end = self._finished if self._finished is not None else time.perf_counter()
+            report["total" if self.ready else "elapsed"] = round(end - self._started, 3)
+        if self.error:
+            report["error"] = self.error
+            report["failed_attempts"] = self.attempts
+        return report
+
+
+def add_health_routes(server, warm_up):
+    """Register /healthz and /readyz on the Flask server"""
+
+    @server.route("/healthz")
+    def healthz():
+        return jsonify(status="alive", pid=os.getpid())
+
+    @server.route("/readyz")
+    def readyz():
+        # A readiness probe also starts the warm-up when nothing else has
+        warm_up.start()
+        return jsonify(warm_up.status()), 200 if warm_up.ready else 503